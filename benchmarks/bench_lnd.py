@@ -0,0 +1,95 @@
+"""
+********************************************************************************
+* Name: Link Node Dataset Read Benchmark
+* License: BSD 3-Clause
+********************************************************************************
+Times LinkNodeDatasetFile.read with ORM objects and with bulkInsert=True on
+the link node dataset file of tests/standard, with its time steps repeated to
+make a longer run.
+
+    python benchmarks/bench_lnd.py --repeat 100
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+from timeit import default_timer as timer
+
+from gsshapy.lib import db_tools as dbt
+from gsshapy.orm import LinkNodeDatasetFile
+from gsshapy.orm.lnd import LinkDataset, LinkNodeTimeStep, NodeDataset
+
+STANDARD_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  os.pardir, 'tests', 'standard')
+
+
+def write_repeated_file(directory, repeat):
+    """
+    Write the standard link node dataset file with its time steps repeated
+    """
+    with open(os.path.join(STANDARD_DIRECTORY, 'standard.cdp')) as f:
+        lines = f.readlines()
+
+    header = [line for line in lines[:5]]
+    time_steps = lines[5:]
+    num_time_steps = sum(1 for line in time_steps if line.startswith('TS'))
+    header[3] = 'NUM_TS        {0}\n'.format(num_time_steps * repeat)
+
+    file_path = os.path.join(directory, 'benchmark.cdp')
+    with open(file_path, 'w') as f:
+        f.writelines(header)
+        step = 0
+        for _ in range(repeat):
+            for line in time_steps:
+                if line.startswith('TS'):
+                    line = 'TS    {0}\n'.format(step)
+                    step += 1
+                f.write(line)
+    return file_path
+
+
+def time_read(directory, **kwargs):
+    """
+    Read the file into a new in-memory SQLite database
+    and return the elapsed time and the number of rows
+    """
+    sqlalchemy_url, sql_engine = dbt.init_sqlite_memory()
+    session = dbt.get_sessionmaker(sqlalchemy_url, sql_engine)()
+
+    start = timer()
+    lnd = LinkNodeDatasetFile()
+    lnd.read(directory=directory,
+             filename='benchmark.cdp',
+             session=session,
+             **kwargs)
+    session.commit()
+    elapsed = timer() - start
+
+    num_rows = sum(session.query(table).count()
+                   for table in (LinkNodeTimeStep, LinkDataset, NodeDataset))
+    session.close()
+    return elapsed, num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the read of link node dataset files.')
+    parser.add_argument('--repeat', type=int, default=100,
+                        help='Number of times the time steps of the standard file are repeated.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        write_repeated_file(directory, args.repeat)
+        print('{0:>12} {1:>10} {2:>10} {3:>12}'.format('mode', 'rows', 'time (s)', 'rows/s'))
+        for mode, kwargs in (('objects', {}), ('bulkInsert', {'bulkInsert': True})):
+            elapsed, num_rows = time_read(directory, **kwargs)
+            print('{0:>12} {1:>10} {2:>10.3f} {3:>12.0f}'.format(mode, num_rows, elapsed,
+                                                                 num_rows / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+********************************************************************************
+* Name: Pivot Benchmark
+* License: BSD 3-Clause
+********************************************************************************
+Times gsshapy.lib.pivot.pivot on time series tables of 1e3 to 1e6 records
+against the list based implementation it replaced.
+
+    python benchmarks/bench_pivot.py
+"""
+from __future__ import print_function
+
+import argparse
+import random
+from timeit import default_timer as timer
+
+from gsshapy.lib.pivot import pivot
+
+
+def pivot_lists(table, left, top, value):
+    """
+    List based pivot that was used before the dictionary based pivot
+    """
+    rs = {}
+    ysort = []
+    xsort = []
+    for row in table:
+        yaxis = tuple([row[c] for c in left])
+        if yaxis not in ysort: ysort.append(yaxis)
+        xaxis = tuple([row[c] for c in top])
+        if xaxis not in xsort: xsort.append(xaxis)
+        try:
+            rs[yaxis]
+        except KeyError:
+            rs[yaxis] = {}
+        if xaxis not in rs[yaxis]:
+            rs[yaxis][xaxis] = 0
+        rs[yaxis][xaxis] += row[value]
+
+    for key in rs:
+        if len(rs[key]) - len(xsort):
+            for var in xsort:
+                if var not in rs[key].keys():
+                    rs[key][var] = ''
+
+    headings = list(left)
+    headings.extend(sorted(xsort))
+
+    t = []
+    for left in ysort:
+        row = list(left)
+        sortedkeys = sorted(rs[left].keys())
+        row.extend(map(rs[left].get, sortedkeys))
+        t.append(dict(zip(headings, row)))
+
+    return t
+
+
+def time_series_table(num_records, num_series):
+    """
+    Time series records in the format written by TimeSeriesFile
+    """
+    rand = random.Random(0)
+    return [{'time': index // num_series * 0.25,
+             'tsNum': index % num_series,
+             'value': rand.random()}
+            for index in range(num_records)]
+
+
+def best_time(function, repeat):
+    """
+    Best wall clock time of the function in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        function()
+        times.append(timer() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the pivot of time series tables.')
+    parser.add_argument('--series', type=int, default=5,
+                        help='Number of time series (columns of the pivot table).')
+    parser.add_argument('--max-baseline-records', type=int, default=10000,
+                        help='Largest table timed with the list based pivot.')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{0:>10} {1:>12} {2:>12}'.format('records', 'lists (s)', 'pivot (s)'))
+    for num_records in (1000, 10000, 100000, 1000000):
+        table = time_series_table(num_records, args.series)
+        baseline = float('nan')
+        if num_records <= args.max_baseline_records:
+            baseline = best_time(lambda: pivot_lists(table, ('time',), ('tsNum',), 'value'),
+                                 args.repeat)
+        elapsed = best_time(lambda: pivot(table, ('time',), ('tsNum',), 'value'),
+                            args.repeat)
+        print('{0:>10} {1:>12.4f} {2:>12.4f}'.format(num_records, baseline, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+********************************************************************************
+* Name: WMS Dataset Benchmark
+* License: BSD 3-Clause
+********************************************************************************
+Times gsshapy.lib.wms_dataset_chunk.datasetScalarTimeStepChunk on a synthetic
+scalar dataset (500 x 500 cells and 200 time steps by default) against the
+string based parser it replaced.
+
+    python benchmarks/bench_wms_dataset.py --rows 500 --columns 500 --steps 200
+"""
+from __future__ import print_function
+
+import argparse
+import random
+from timeit import default_timer as timer
+
+import numpy as np
+
+from gsshapy.lib import parsetools as pt
+from gsshapy.lib.wms_dataset_chunk import datasetScalarTimeStepChunk
+
+
+def time_step_chunk_strings(lines, numberColumns, numberCells):
+    """
+    String based parser that was used before the NumPy based parser
+    """
+    END_DATASET_TAG = 'ENDDS'
+
+    result = {'iStatus': None,
+              'timestamp': None,
+              'cellArray': None,
+              'rasterText': None}
+
+    lines = list(lines)
+    timeStep = pt.splitLine(lines.pop(0))
+
+    startCellsIndex = numberCells
+
+    iStatus = int(timeStep[1])
+
+    if iStatus == 0:
+        startCellsIndex = 0
+
+    if END_DATASET_TAG in lines[-1]:
+        lines.pop(-1)
+
+    arrayString = '[['
+    columnCounter = 1
+    lenLines = len(lines) - 1
+
+    rasterText = ''
+
+    for index in range(startCellsIndex, len(lines)):
+        if columnCounter % numberColumns != 0 and index != lenLines:
+            arrayString += lines[index].strip() + ', '
+        elif columnCounter % numberColumns == 0 and index != lenLines:
+            arrayString += lines[index].strip() + '], ['
+        elif index == lenLines:
+            arrayString += lines[index].strip() + ']]'
+
+        columnCounter += 1
+
+        rasterText += lines[index]
+
+    result['cellArray'] = arrayString
+    result['rasterText'] = rasterText
+    result['iStatus'] = iStatus
+    result['timestamp'] = float(timeStep[2])
+
+    return result
+
+
+def time_step_lines(num_cells, seed):
+    """
+    Lines of a time step with status flags, in the format written by WMSDatasetFile
+    """
+    rand = random.Random(seed)
+    lines = ['TS 1 {0:.6f}\n'.format(seed * 15.0)]
+    lines.extend('1\n' for _ in range(num_cells))
+    lines.extend('{0:.6f}\n'.format(rand.random() * 100) for _ in range(num_cells))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the parsing of WMS dataset time steps.')
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--columns', type=int, default=500)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--distinct-steps', type=int, default=4,
+                        help='Number of distinct time steps generated and cycled through.')
+    args = parser.parse_args()
+
+    num_cells = args.rows * args.columns
+    steps = [time_step_lines(num_cells, seed) for seed in range(args.distinct_steps)]
+
+    # The parsers must agree before they are timed
+    new = datasetScalarTimeStepChunk(steps[0], args.columns, num_cells)
+    old = time_step_chunk_strings(steps[0], args.columns, num_cells)
+    assert new['rasterText'] == old['rasterText']
+    assert np.array_equal(new['cellArray'], np.array(eval(old['cellArray'])))
+
+    print('{0:>10} {1:>10} {2:>12} {3:>14}'.format('parser', 'steps', 'time (s)', 'per step (s)'))
+    for name, function in (('strings', time_step_chunk_strings),
+                           ('numpy', datasetScalarTimeStepChunk)):
+        start = timer()
+        for index in range(args.steps):
+            function(steps[index % len(steps)], args.columns, num_cells)
+        elapsed = timer() - start
+        print('{0:>10} {1:>10} {2:>12.3f} {3:>14.4f}'.format(name, args.steps, elapsed,
+                                                            elapsed / args.steps))
+
+
+if __name__ == '__main__':
+    main()
@@ -200,6 +200,26 @@ class GsshaPyFileObjectBase:
                 handle these.
         """
 
+    @staticmethod
+    def _parse(path):
+        """
+        Private file parse method. Classes that inherit from this base class may implement this method.
+
+        The purpose of the ``_parse()`` method is to parse the contents of a file into plain Python structures without
+        creating any file objects or using the database, so that files can be parsed in worker processes when a project
+        is read in parallel (see the ``workers`` argument of :meth:`gsshapy.orm.ProjectFile.readProject`). The result is
+        passed on to the ``_read()`` method as the ``parsed`` keyword argument, which must then use it instead of
+        parsing the file again.
+
+        Args:
+            path (str): Path to the file to be parsed.
+
+        Returns:
+            The parsed contents of the file. Must be picklable. Returns None if the file type does not support parsing
+            ahead of reading.
+        """
+        return None
+
     def _namePreprocessor(self, name):
         """
         Override this method to preprocess the filename during writing.
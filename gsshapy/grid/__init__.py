@@ -2,3 +2,4 @@ from .grid_to_gssha import GRIDtoGSSHA
 from .hrrr_to_gssha import HRRRtoGSSHA
 from .era_to_gssha import ERAtoGSSHA
 from .nwm_to_gssha import NWMtoGSSHA
+from .batch import GRIDtoGSSHABatch
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+#  arc_ascii.py
+#  GSSHApy
+#
+#  License BSD 3-Clause
+
+from io import open as io_open
+
+import numpy as np
+
+
+# ------------------------------------------------------------------------------
+# MAIN CLASS
+# ------------------------------------------------------------------------------
+class ArcAsciiWriter(object):
+    """This class writes grids with the same geometry to Arc ASCII files.
+
+    The header is computed once from the geotransform, so writing each
+    grid is a single formatting operation without creating a GDAL dataset.
+
+    Attributes:
+        geotransform(:obj:`tuple`): GDAL geotransform of the grids.
+        shape(:obj:`tuple`): Shape (y, x) of the grids.
+        nodata_value(Optional[:obj:`float`]): Value written for missing (NaN) cells. Default is -9999.
+        value_format(Optional[:obj:`str`]): Format string for the cell values. Default is '%.8g'.
+
+    Example::
+
+        from gsshapy.grid.arc_ascii import ArcAsciiWriter
+
+        writer = ArcAsciiWriter(geotransform, grids.shape[1:])
+        for grid, ascii_file_path in zip(grids, ascii_file_paths):
+            writer.write(ascii_file_path, grid)
+
+    """
+    def __init__(self, geotransform, shape, nodata_value=-9999, value_format='%.8g'):
+        """
+        Initializer function for the ArcAsciiWriter class
+        """
+        x_origin, dx, _, y_origin, _, dy = geotransform
+        nrows, ncols = shape
+
+        # grids stored from south to north are flipped when written
+        self.flip = dy > 0
+        if self.flip:
+            yllcorner = y_origin
+        else:
+            yllcorner = y_origin + dy * nrows
+
+        header = [u"ncols {0}".format(ncols),
+                  u"nrows {0}".format(nrows),
+                  u"xllcorner {0!r}".format(float(x_origin)),
+                  u"yllcorner {0!r}".format(float(yllcorner))]
+        if abs(dx) == abs(dy):
+            header.append(u"cellsize {0!r}".format(float(abs(dx))))
+        else:
+            header.append(u"dx {0!r}".format(float(abs(dx))))
+            header.append(u"dy {0!r}".format(float(abs(dy))))
+        header.append(u"NODATA_value {0}".format(nodata_value))
+
+        self.header = u"\n".join(header) + u"\n"
+        self.shape = (nrows, ncols)
+        self.nodata_value = nodata_value
+        self.grid_format = (u" ".join([value_format] * ncols) + u"\n") * nrows
+
+    def write(self, out_file_path, grid):
+        """Writes a grid to an Arc ASCII file.
+
+        Parameters:
+            out_file_path(str): Location of ASCII file to generate.
+            grid(:obj:`numpy.ndarray`): Grid with shape (y, x) in the row order of the geotransform.
+        """
+        grid = np.asarray(grid, dtype=np.float64)
+        if grid.shape != self.shape:
+            raise ValueError("Grid shape {0} does not match the writer shape {1}."
+                             .format(grid.shape, self.shape))
+
+        if self.flip:
+            grid = grid[::-1]
+
+        grid = np.where(np.isnan(grid), self.nodata_value, grid)
+
+        with io_open(out_file_path, 'w') as out_ascii_grid:
+            out_ascii_grid.write(self.header)
+            out_ascii_grid.write(self.grid_format % tuple(grid.ravel().tolist()))
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+#
+#  batch.py
+#  GSSHApy
+#
+#  License BSD 3-Clause
+
+import logging
+from multiprocessing.pool import ThreadPool
+from os import path
+from past.builtins import basestring
+from threading import Lock
+
+from .grid_to_gssha import GRIDtoGSSHA
+
+log = logging.getLogger(__name__)
+
+
+def _merge_windows(window, other_window):
+    """
+    This function returns the (yslice, xslice) window covering both windows
+    """
+    return (slice(min(window[0].start, other_window[0].start),
+                  max(window[0].stop, other_window[0].stop)),
+            slice(min(window[1].start, other_window[1].start),
+                  max(window[1].stop, other_window[1].stop)))
+
+
+def _sweep_windows(windows, indices, axis):
+    """
+    This function groups the windows that overlap or touch along
+    the axis (0 for y, 1 for x) by sweeping over their start
+    """
+    groups = []
+    stop = None
+    for index in sorted(indices, key=lambda index: windows[index][axis].start):
+        interval = windows[index][axis]
+        if groups and interval.start <= stop:
+            groups[-1].append(index)
+            stop = max(stop, interval.stop)
+        else:
+            groups.append([index])
+            stop = interval.stop
+    return groups
+
+
+def _cluster_windows(windows):
+    """
+    This function groups the (yslice, xslice) windows of the projects
+    so that each group is loaded with a single window. The windows are
+    split into groups along y and then x with an interval sweep until
+    the windows of each group overlap or touch along both axes, so far
+    apart projects are kept apart.
+
+    Returns:
+        list: List of (window, list of the indices of the windows in the group).
+    """
+    clusters = []
+    if not windows:
+        return clusters
+    # (indices of the windows, axis to sweep, True if the other axis does not split them)
+    pending = [(list(range(len(windows))), 0, False)]
+    while pending:
+        indices, axis, other_axis_grouped = pending.pop()
+        groups = _sweep_windows(windows, indices, axis)
+        if len(groups) > 1:
+            pending.extend((group, 1 - axis, False) for group in groups)
+        elif not other_axis_grouped:
+            pending.append((indices, 1 - axis, True))
+        else:
+            window = windows[indices[0]]
+            for index in indices[1:]:
+                window = _merge_windows(window, windows[index])
+            clusters.append((window, sorted(indices)))
+    return clusters
+
+
+class LSMDataCache(object):
+    """This class loads each LSM variable once for a window
+    covering several GSSHA projects and returns the subset
+    of each project from the loaded data.
+
+    The loaded variables are kept until :func:`LSMDataCache.clear`
+    is called, so the memory used is the size of the window times
+    the number of time steps for each variable.
+
+    The variables are read from the LSM dataset while holding the lock,
+    so caches sharing a lock never read the dataset at the same time.
+
+    Attributes:
+        lsm_dataset(:obj:`xarray.Dataset`): LSM dataset opened with pangaea.
+        yslice(:obj:`slice`): Rows of the LSM grid covering the projects.
+        xslice(:obj:`slice`): Columns of the LSM grid covering the projects.
+        load(Optional[bool]): If True, the variables are loaded into memory. Default is True.
+        lock(Optional[:obj:`threading.Lock`]): Lock held while reading the LSM dataset. Default is a new lock.
+    """
+    def __init__(self, lsm_dataset, yslice, xslice, load=True, lock=None):
+        """
+        Initializer function for the LSMDataCache class
+        """
+        self.lsm_dataset = lsm_dataset
+        self.yslice = yslice
+        self.xslice = xslice
+        self.load = load
+        self._data = {}
+        self._lock = lock if lock is not None else Lock()
+
+    def getvar(self, data_var, yslice, xslice, calc_4d_method=None, calc_4d_dim=None):
+        """Returns the LSM variable within the slices of a project.
+
+        Parameters:
+            data_var(str or list): Name of the variable(s) in the LSM files.
+            yslice(:obj:`slice`): Rows of the LSM grid for the project.
+            xslice(:obj:`slice`): Columns of the LSM grid for the project.
+            calc_4d_method(Optional[str]): Method to reduce 4D variables (Ex. 'max').
+            calc_4d_dim(Optional[str]): Dimension to reduce 4D variables along.
+
+        Returns:
+            :obj:`xarray.Dataset`
+        """
+        data_key = data_var
+        if not isinstance(data_var, basestring):
+            data_key = tuple(data_var)
+        data_key = (data_key, calc_4d_method, calc_4d_dim)
+
+        with self._lock:
+            if data_key not in self._data:
+                data = self.lsm_dataset.lsm.getvar(data_var,
+                                                   yslice=self.yslice,
+                                                   xslice=self.xslice,
+                                                   calc_4d_method=calc_4d_method,
+                                                   calc_4d_dim=calc_4d_dim)
+                if self.load:
+                    data = data.load()
+                self._data[data_key] = data
+
+        data = self._data[data_key]
+        y_dim = getattr(self.lsm_dataset.lsm, 'y_dim', 'y')
+        x_dim = getattr(self.lsm_dataset.lsm, 'x_dim', 'x')
+        if y_dim not in data.dims or x_dim not in data.dims:
+            y_dim, x_dim = 'y', 'x'
+        return data.isel({y_dim: slice(yslice.start - self.yslice.start,
+                                       yslice.stop - self.yslice.start),
+                          x_dim: slice(xslice.start - self.xslice.start,
+                                       xslice.stop - self.xslice.start)})
+
+    def clear(self):
+        """Releases the loaded variables."""
+        with self._lock:
+            self._data = {}
+
+
+# ------------------------------------------------------------------------------
+# MAIN CLASS
+# ------------------------------------------------------------------------------
+class GRIDtoGSSHABatch(object):
+    """This class converts one LSM dataset to GSSHA input for many GSSHA projects.
+
+    The LSM files are opened once and shared by all of the projects.
+    The projects are grouped by location and each variable is loaded
+    once for the window covering each group of projects. Every project
+    uses its own subset of the window of its group. Projects far apart
+    are in different groups, so the pixels between them are not loaded.
+
+    The memory used is the number of pixels in the windows of the groups
+    times the number of time steps for each variable converted. The loaded
+    variables are released after each conversion method.
+
+    .. warning:: The projects share one netCDF4/HDF5 dataset, which is not
+                 thread-safe. The projects are converted one at a time by
+                 default. With project_workers, all of the reads of the LSM
+                 data go through the caches under a single lock, so the
+                 variables must be cached and loaded into memory
+                 (cache_lsm_data=True and no chunks).
+
+    Attributes:
+        gssha_projects(list): List of (gssha_project_folder, gssha_project_file_name) of the GSSHA projects.
+        grid_class(Optional[class]): Class used to convert the data of each project (Ex. HRRRtoGSSHA). Default is GRIDtoGSSHA.
+        cache_lsm_data(Optional[bool]): If True, each variable is loaded once for all of the projects. Default is True.
+        project_workers(Optional[int]): Number of threads converting the projects in parallel. Requires cache_lsm_data=True without chunks. Default is None (one project at a time).
+        **kwargs: Other arguments passed to the grid_class (Ex. lsm_input_folder_path, lsm_search_card).
+
+    Example::
+
+        from gsshapy.grid.batch import GRIDtoGSSHABatch
+
+        g2g_batch = GRIDtoGSSHABatch([('E:/GSSHA/project_1', 'project_1.prj'),
+                                      ('E:/GSSHA/project_2', 'project_2.prj')],
+                                     lsm_input_folder_path='E:/GSSHA/lsm-data',
+                                     lsm_search_card="*.nc",
+                                     )
+
+        g2g_batch.lsm_data_to_arc_ascii(data_var_map_array)
+        g2g_batch.close()
+
+    """
+    def __init__(self,
+                 gssha_projects,
+                 grid_class=GRIDtoGSSHA,
+                 cache_lsm_data=True,
+                 project_workers=None,
+                 **kwargs):
+        """
+        Initializer function for the GRIDtoGSSHABatch class
+        """
+        if project_workers and project_workers > 1 and \
+                (not cache_lsm_data or kwargs.get('chunks')):
+            raise ValueError("project_workers requires cache_lsm_data=True without chunks, "
+                             "as the LSM dataset is not thread-safe ...")
+
+        self.project_workers = project_workers
+        self.converters = []
+
+        lsm_dataset = None
+        for gssha_project_folder, gssha_project_file_name in gssha_projects:
+            log.info("Loading GSSHA project {0} ...".format(gssha_project_file_name))
+            converter = grid_class(gssha_project_folder=gssha_project_folder,
+                                   gssha_project_file_name=gssha_project_file_name,
+                                   lsm_dataset=lsm_dataset,
+                                   **kwargs)
+            lsm_dataset = converter.xd
+            self.converters.append(converter)
+
+        self.lsm_data_caches = []
+        if cache_lsm_data and self.converters:
+            # one lock for all of the reads of the shared LSM dataset
+            lsm_dataset_lock = Lock()
+            windows = [(converter.yslice, converter.xslice) for converter in self.converters]
+            for (yslice, xslice), converter_indices in _cluster_windows(windows):
+                lsm_data_cache = LSMDataCache(lsm_dataset, yslice, xslice,
+                                              load=not kwargs.get('chunks'),
+                                              lock=lsm_dataset_lock)
+                for converter_index in converter_indices:
+                    self.converters[converter_index].lsm_data_cache = lsm_data_cache
+                self.lsm_data_caches.append(lsm_data_cache)
+
+    def _run(self, method_name, project_kwargs):
+        """
+        This function runs the method of the converter of
+        each project with the keyword arguments of the project
+        """
+        def run_project(converter_kwargs):
+            converter, method_kwargs = converter_kwargs
+            log.info("Converting LSM data for {0} ..."
+                     .format(converter.gssha_project_file_name))
+            return getattr(converter, method_name)(**method_kwargs)
+
+        jobs = list(zip(self.converters, project_kwargs))
+        try:
+            if self.project_workers and self.project_workers > 1:
+                pool = ThreadPool(self.project_workers)
+                try:
+                    return pool.map(run_project, jobs)
+                finally:
+                    pool.close()
+                    pool.join()
+            return [run_project(job) for job in jobs]
+        finally:
+            for lsm_data_cache in self.lsm_data_caches:
+                lsm_data_cache.clear()
+
+    def lsm_data_to_arc_ascii(self, data_var_map_array, **kwargs):
+        """Writes the HMET Arc ASCII files of each project into
+        the "hmet_ascii_data" folder of the project.
+
+        Parameters:
+            data_var_map_array(list): Array to map the variables in the LSM file to the
+                                      matching required GSSHA data.
+            **kwargs: Other arguments passed to :func:`GRIDtoGSSHA.lsm_data_to_arc_ascii` (Ex. workers).
+        """
+        self._run('lsm_data_to_arc_ascii',
+                  [dict(data_var_map_array=data_var_map_array, **kwargs)
+                   for _ in self.converters])
+
+    def lsm_data_to_subset_netcdf(self, netcdf_file_name, data_var_map_array, **kwargs):
+        """Writes the subset NetCDF file of each project into the project folder.
+
+        Parameters:
+            netcdf_file_name(str): Name of the NetCDF file to generate in each project folder.
+            data_var_map_array(list): Array to map the variables in the LSM file to the
+                                      matching required GSSHA data.
+            **kwargs: Other arguments passed to :func:`GRIDtoGSSHA.lsm_data_to_subset_netcdf`.
+        """
+        self._run('lsm_data_to_subset_netcdf',
+                  [dict(netcdf_file_path=path.join(converter.gssha_project_folder,
+                                                   netcdf_file_name),
+                        data_var_map_array=data_var_map_array,
+                        **kwargs)
+                   for converter in self.converters])
+
+    def lsm_precip_to_gssha_precip_gage(self, out_gage_file_name, lsm_data_var, **kwargs):
+        """Writes the precipitation gage file of each project into the project folder.
+
+        Parameters:
+            out_gage_file_name(str): Name of the gage file to generate in each project folder.
+            lsm_data_var(str or list): This is the variable name for precipitation in the LSM files.
+            **kwargs: Other arguments passed to :func:`GRIDtoGSSHA.lsm_precip_to_gssha_precip_gage` (Ex. precip_type).
+        """
+        self._run('lsm_precip_to_gssha_precip_gage',
+                  [dict(out_gage_file=path.join(converter.gssha_project_folder,
+                                                out_gage_file_name),
+                        lsm_data_var=lsm_data_var,
+                        **kwargs)
+                   for converter in self.converters])
+
+    def close(self):
+        """Closes the LSM dataset shared by the projects."""
+        if self.converters:
+            self.converters[0].xd.close()
@@ -307,6 +307,9 @@ class ERAtoGSSHA(GRIDtoGSSHA):
         download_start_datetime(Optional[:obj:`datetime.datetime`]): Datetime to start download.
         download_end_datetime(Optional[:obj:`datetime.datetime`]): Datetime to end download.
         era_download_data(Optional[:obj:`str`]): You can choose 'era5' or 'interim'. Defaults to 'era5'.
+        chunks(Optional[:obj:`dict`]): Chunk sizes along the dimensions of the LSM data (Ex. {'time': 24}). If given, the data is kept lazy (dask) and is processed one chunk of time steps at a time. Requires dask. Default is None.
+        cache_regrid_weights(Optional[bool]): If True, the data is regridded to the GSSHA grid with weights that are computed once and stored in the GSSHA project folder (see :func:`GRIDtoGSSHA`). The output is on the GSSHA grid instead of the grid at the LSM resolution in the GSSHA projection. Default is False.
+        lsm_dataset(Optional[:obj:`xarray.Dataset`]): LSM dataset already opened by another instance to use instead of opening the LSM files again. Default is None.
 
     Example::
 
@@ -355,6 +358,9 @@ class ERAtoGSSHA(GRIDtoGSSHA):
                  download_start_datetime=None,
                  download_end_datetime=None,
                  era_download_data='era5',
+                 chunks=None,
+                 cache_regrid_weights=False,
+                 lsm_dataset=None,
                  ):
         """
         Initializer function for the HRRRtoGSSHA class
@@ -376,7 +382,10 @@ class ERAtoGSSHA(GRIDtoGSSHA):
                                          lsm_lat_dim,
                                          lsm_lon_dim,
                                          lsm_time_dim,
-                                         output_timezone)
+                                         output_timezone,
+                                         chunks=chunks,
+                                         cache_regrid_weights=cache_regrid_weights,
+                                         lsm_dataset=lsm_dataset)
 
     def _download(self):
         """download ERA5 data for GSSHA domain"""
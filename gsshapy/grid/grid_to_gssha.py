@@ -7,9 +7,11 @@
 #  License BSD 3-Clause
 
 from builtins import range
+from collections import OrderedDict
 from datetime import datetime
 from io import open as io_open
 import logging
+from multiprocessing import Pool
 import numpy as np
 from os import mkdir, path, remove, rename
 import pangaea as pa
@@ -17,14 +19,26 @@ import pandas as pd
 from past.builtins import basestring
 from pytz import utc
 from shutil import copy
+from timeit import default_timer as timer
 import xarray as xr
 import xarray.ufuncs as xu
 
 from gazar.grid import ArrayGrid
+from osgeo import gdalconst
+from .arc_ascii import ArcAsciiWriter
+from .regrid import RegridWeights, axis_fraction
+from .spatial_index import LSMGridIndex
 from ..lib import db_tools as dbt
 
 log = logging.getLogger(__name__)
 
+# regridding methods of the cached weights for the resample methods
+REGRID_METHODS = {
+    None: 'bilinear',
+    gdalconst.GRA_Bilinear: 'bilinear',
+    gdalconst.GRA_NearestNeighbour: 'nearest',
+}
+
 
 # ------------------------------------------------------------------------------
 # HELPER FUNCTIONS
@@ -90,6 +104,22 @@ def array_binary_percent_10(in_array):
     in_array[in_array > 0] = 10
     return in_array
 
+
+def write_arc_ascii_grids(job):
+    """
+    Writes a stack of grids to Arc ASCII files.
+    Used by the worker processes of GRIDtoGSSHA.lsm_data_to_arc_ascii.
+
+    Parameters:
+        job(tuple): Array of grids with shape (time, y, x), list of
+                    output file paths for each grid, and geotransform
+                    of the grids.
+    """
+    grids, ascii_file_paths, geotransform = job
+    writer = ArcAsciiWriter(geotransform, grids.shape[1:], nodata_value=-9999)
+    for grid, ascii_file_path in zip(grids, ascii_file_paths):
+        writer.write(ascii_file_path, grid)
+
 # ------------------------------------------------------------------------------
 # MAIN CLASS
 # ------------------------------------------------------------------------------
@@ -109,6 +139,9 @@ class GRIDtoGSSHA(object):
         lsm_time_dim(Optional[:obj:`str`]): Name of the time dimension in the LSM netCDF files. Defaults to 'time'.
         output_timezone(Optional[:obj:`tzinfo`]): This is the timezone to output the dates for the data. Default is the timezone of your GSSHA model. This option does NOT currently work for NetCDF output.
         pangaea_loader(Optional[:obj:`str`]): String to define loader used when opening pangaea dataset (Ex. 'hrrr'). Default is None.
+        chunks(Optional[:obj:`dict`]): Chunk sizes along the dimensions of the LSM data (Ex. {'time': 24}). If given, the data is kept lazy (dask) and is converted, reprojected, and written one chunk of time steps at a time. Requires dask. Default is None (load all time steps into memory).
+        cache_regrid_weights(Optional[bool]): If True, the data is regridded with weights that are computed once and stored in the GSSHA project folder instead of reprojecting each variable with GDAL. The weights are bilinear unless the resample_method is gdalconst.GRA_NearestNeighbour (other resample methods use GDAL). The output is on the GSSHA grid instead of the grid at the LSM resolution in the GSSHA projection used by default, and GSSHA cells outside of the LSM grid are NaN. Default is False.
+        lsm_dataset(Optional[:obj:`xarray.Dataset`]): LSM dataset already opened with pangaea by another instance (Ex. g2g.xd) to use instead of opening the LSM files again. Default is None.
 
     Example::
 
@@ -549,6 +582,9 @@ class GRIDtoGSSHA(object):
                  lsm_time_dim='time',
                  output_timezone=None,
                  pangaea_loader=None,
+                 chunks=None,
+                 cache_regrid_weights=False,
+                 lsm_dataset=None,
                  ):
         """
         Initializer function for the GRIDtoGSSHA class
@@ -565,7 +601,16 @@ class GRIDtoGSSHA(object):
         self.lsm_time_dim = lsm_time_dim
         self.output_timezone = output_timezone
         self.pangaea_loader = pangaea_loader
-        self._xd = None
+        self.chunks = chunks
+        self.cache_regrid_weights = cache_regrid_weights
+        self._xd = lsm_dataset
+        self._lsm_grid_index = None
+        if lsm_dataset is not None:
+            self.lsm_time_dim = 'time'
+            self.lsm_time_var = 'time'
+        self._regrid_weights = {}
+        # shared LSM data loaded for several GSSHA projects (see GRIDtoGSSHABatch)
+        self.lsm_data_cache = None
 
         # load in GSSHA model files
         project_manager, db_sessionmaker = \
@@ -603,32 +648,33 @@ class GRIDtoGSSHA(object):
 
             self.lsm_time_dim = 'time'
             self.lsm_time_var = 'time'
+
+            if self.chunks:
+                self._xd = self._xd.chunk(dict((dim, size) for dim, size in self.chunks.items()
+                                               if dim in self._xd.dims))
         return self._xd
 
+    @property
+    def lsm_grid_index(self):
+        """get sorted index of the LSM grid coordinates"""
+        if self._lsm_grid_index is None:
+            y_coords, x_coords = self.xd.lsm.coords
+            self._lsm_grid_index = \
+                LSMGridIndex.from_coords(y_coords, x_coords,
+                                         source=path.join(self.lsm_input_folder_path,
+                                                          self.lsm_search_card))
+        return self._lsm_grid_index
+
     def _set_subset_indices(self, y_min, y_max, x_min, x_max):
         """
         load subset based on extent
         """
-        y_coords, x_coords = self.xd.lsm.coords
         dx = self.xd.lsm.dx
         dy = self.xd.lsm.dy
 
-        lsm_y_indices_from_y, lsm_x_indices_from_y = \
-            np.where((y_coords >= (y_min - 2*dy)) &
-                     (y_coords <= (y_max + 2*dy)))
-        lsm_y_indices_from_x, lsm_x_indices_from_x = \
-            np.where((x_coords >= (x_min - 2*dx)) &
-                     (x_coords <= (x_max + 2*dx)))
-
-        lsm_y_indices = np.intersect1d(lsm_y_indices_from_y,
-                                       lsm_y_indices_from_x)
-        lsm_x_indices = np.intersect1d(lsm_x_indices_from_y,
-                                       lsm_x_indices_from_x)
-
-        self.xslice = slice(np.amin(lsm_x_indices),
-                            np.amax(lsm_x_indices)+1)
-        self.yslice = slice(np.amin(lsm_y_indices),
-                            np.amax(lsm_y_indices)+1)
+        self.yslice, self.xslice = \
+            self.lsm_grid_index.subset_slices(y_min - 2*dy, y_max + 2*dy,
+                                              x_min - 2*dx, x_max + 2*dx)
 
     def _load_modeling_extent(self):
         """
@@ -665,17 +711,24 @@ class GRIDtoGSSHA(object):
         """
         This extracts the LSM data from a folder of netcdf files
         """
-        data = self.xd.lsm.getvar(data_var,
-                                  yslice=self.yslice,
-                                  xslice=self.xslice,
-                                  calc_4d_method=calc_4d_method,
-                                  calc_4d_dim=calc_4d_dim)
+        lsm_data_source = self.xd.lsm
+        if self.lsm_data_cache is not None:
+            lsm_data_source = self.lsm_data_cache
+        data = lsm_data_source.getvar(data_var,
+                                      yslice=self.yslice,
+                                      xslice=self.xslice,
+                                      calc_4d_method=calc_4d_method,
+                                      calc_4d_dim=calc_4d_dim)
         if isinstance(time_step, datetime):
             data = data.loc[{self.lsm_time_dim: [pd.to_datetime(time_step)]}]
         elif time_step is not None:
             data = data[{self.lsm_time_dim: [time_step]}]
         data = data.fillna(0)
-        data.values *= conversion_factor
+        if conversion_factor != 1:
+            # keep the data lazy when it is chunked
+            attrs = data.attrs
+            data = data * conversion_factor
+            data.attrs = attrs
         return data
 
     def _load_converted_gssha_data_from_lsm(self, gssha_var, lsm_var, load_type, time_step=None):
@@ -690,7 +743,7 @@ class GRIDtoGSSHA(object):
                 global_radiation = self._load_lsm_data(global_radiation_var, conversion_factor)
                 diffusive_fraction = self._load_lsm_data(diffusive_fraction_var)
                 if gssha_var.endswith("cc"):
-                    diffusive_fraction /= 100.0
+                    diffusive_fraction = diffusive_fraction / 100.0
 
                 self.data = ((1-diffusive_fraction)*global_radiation)
 
@@ -700,7 +753,7 @@ class GRIDtoGSSHA(object):
                 global_radiation = self._load_lsm_data(global_radiation_var, conversion_factor)
                 diffusive_fraction = self._load_lsm_data(diffusive_fraction_var)
                 if gssha_var.endswith("cc"):
-                    diffusive_fraction /= 100
+                    diffusive_fraction = diffusive_fraction / 100
                 self.data = (diffusive_fraction*global_radiation)
 
             elif isinstance(lsm_var, basestring):
@@ -762,7 +815,11 @@ class GRIDtoGSSHA(object):
                                             time_step=time_step)
             conversion_function = self.netcdf_attributes[gssha_var].get('conversion_function')
             if conversion_function:
-                self.data.values = self.netcdf_attributes[gssha_var]['conversion_function'][load_type](self.data.values)
+                self.data = xr.apply_ufunc(conversion_function[load_type],
+                                           self.data,
+                                           dask='parallelized',
+                                           output_dtypes=[self.data.dtype],
+                                           keep_attrs=True)
 
         if 'precipitation' in gssha_var:
             # NOTE: Precipitation is converted from mm/s to mm/hr
@@ -770,21 +827,21 @@ class GRIDtoGSSHA(object):
             if 'units' in self.data.attrs:
                 if self.data.attrs['units'] == 'm':
                     # convert from m to mm
-                    self.data.values *= 1000
+                    self.data = self.data * 1000
 
             if load_type == 'ascii' or load_type == 'netcdf':
                 # CONVERT TO INCREMENTAL
                 if gssha_var == 'precipitation_acc':
-                    self.data.values = np.lib.pad(self.data.diff(self.lsm_time_dim).values,
-                                                  ((1, 0), (0, 0), (0, 0)),
-                                                  'constant',
-                                                  constant_values=0)
+                    # the first time step has no increment
+                    self.data = xr.concat([xr.zeros_like(self.data.isel(**{self.lsm_time_dim: [0]})),
+                                           self.data.diff(self.lsm_time_dim)],
+                                          dim=self.lsm_time_dim)
 
                 # CONVERT PRECIP TO RADAR (mm/hr) IN FILE
                 if gssha_var == 'precipitation_inc' or gssha_var == 'precipitation_acc':
                     # convert from mm to mm/hr
                     time_step_hours = np.diff(self.xd[self.lsm_time_var].values)[0]/np.timedelta64(1, 'h')
-                    self.data.values /= time_step_hours
+                    self.data = self.data / time_step_hours
 
         # convert to dataset
         gssha_data_var_name = self.netcdf_attributes[gssha_var]['gssha_name']
@@ -836,6 +893,117 @@ class GRIDtoGSSHA(object):
         """
         self.data = self.data.lsm.resample(gssha_var, self.gssha_grid)
 
+    def _project_data(self, data, gssha_data_var, resample_method=None):
+        """
+        This function reprojects the data to the GSSHA grid
+        """
+        if self.cache_regrid_weights:
+            regrid_method = REGRID_METHODS.get(resample_method)
+            if regrid_method is not None:
+                return self._regrid_data(data, gssha_data_var, regrid_method)
+            # other resample methods (Ex. average) are done with GDAL
+            return data.lsm.resample(gssha_data_var, self.gssha_grid)
+        if resample_method:
+            return data.lsm.resample(gssha_data_var, self.gssha_grid)
+        return data.lsm.to_projection(gssha_data_var,
+                                      projection=self.gssha_grid.projection)
+
+    def _get_regrid_weights(self, data, method='bilinear'):
+        """
+        This function returns the weights to regrid the data
+        to the GSSHA grid from memory or the GSSHA project folder.
+        The LSM subset is the same for all of the variables, so the
+        weights are kept in memory for each method.
+        """
+        if method not in self._regrid_weights:
+            y_coords, x_coords = data.lsm.coords
+            self._regrid_weights[method] = \
+                RegridWeights.load_or_create(self.gssha_project_folder,
+                                             y_coords, x_coords,
+                                             data.lsm.projection.ExportToWkt(),
+                                             self.gssha_grid.geotransform,
+                                             (self.gssha_grid.y_size, self.gssha_grid.x_size),
+                                             self.gssha_grid.wkt,
+                                             method)
+        return self._regrid_weights[method]
+
+    def _regrid_data(self, data, gssha_data_var, method='bilinear'):
+        """
+        This function regrids the data to the GSSHA grid
+        with the cached regridding weights
+        """
+        data_var = data[gssha_data_var]
+        regrid_weights = self._get_regrid_weights(data, method)
+        lats, lons = self.gssha_grid.latlon
+        dims = data_var.dims[:-2] + ('y', 'x')
+        coords = dict((name, coord) for name, coord in data_var.coords.items()
+                      if not set(coord.dims).intersection(data_var.dims[-2:]))
+        coords['lat'] = (('y', 'x'), lats)
+        coords['lon'] = (('y', 'x'), lons)
+        return xr.Dataset({gssha_data_var: (dims,
+                                            regrid_weights.apply(data_var.values),
+                                            data_var.attrs)},
+                          coords=coords,
+                          attrs={'proj4': self.gssha_grid.proj4,
+                                 'geotransform': self.gssha_grid.geotransform})
+
+    def _project_values(self, data, gssha_data_var, resample_method=None):
+        """
+        This function reprojects the data to the GSSHA grid
+        and returns the values of the variable
+        """
+        return self._project_data(data, gssha_data_var, resample_method)[gssha_data_var].values
+
+    def _time_block_size(self):
+        """
+        This function returns the number of time steps
+        processed at a time
+        """
+        if self.chunks and self.chunks.get('time'):
+            return self.chunks['time']
+        return self.data.dims['time']
+
+    def _project_data_in_time_blocks(self, gssha_data_var, resample_method=None):
+        """
+        This function lazily reprojects the data to the GSSHA grid
+        one block of time steps at a time. Only the first block is
+        reprojected right away to determine the output grid.
+        USED WHEN THE DATA IS CHUNKED
+        """
+        # dask is only required when the data is chunked
+        import dask.array as da
+        from dask import delayed
+
+        source_data = self.data
+        time_block_size = self._time_block_size()
+
+        first_block = self._project_data(source_data.isel(time=slice(0, time_block_size)),
+                                         gssha_data_var,
+                                         resample_method)
+        first_values = first_block[gssha_data_var]
+        time_axis = first_values.dims.index('time')
+
+        blocks = [da.from_array(first_values.values, chunks=first_values.shape)]
+        for block_start in range(time_block_size, source_data.dims['time'], time_block_size):
+            block_data = source_data.isel(time=slice(block_start, block_start + time_block_size))
+            block_shape = list(first_values.shape)
+            block_shape[time_axis] = block_data.dims['time']
+            block_values = delayed(self._project_values, pure=False)(block_data,
+                                                                     gssha_data_var,
+                                                                     resample_method)
+            blocks.append(da.from_delayed(block_values,
+                                          shape=tuple(block_shape),
+                                          dtype=first_values.dtype))
+
+        coords = dict((name, coord) for name, coord in first_block.coords.items()
+                      if 'time' not in coord.dims)
+        coords['time'] = source_data['time'].values
+        self.data = xr.Dataset({gssha_data_var: (first_values.dims,
+                                                 da.concatenate(blocks, axis=time_axis),
+                                                 first_values.attrs)},
+                               coords=coords,
+                               attrs=first_block.attrs)
+
     @staticmethod
     def _get_calc_function(gssha_data_var):
         """
@@ -856,6 +1024,10 @@ class GRIDtoGSSHA(object):
         and then puts it into the data_np_array
         USED WHEN GENERATING HMET DATA ONLY
         """
+        if self.data.time.size < 2:
+            # a single time step has no time step size to convert from
+            return
+
         time_step_hours = np.diff(self.data.time)[0]/np.timedelta64(1, 'h')
         calc_function = self._get_calc_function(gssha_data_var)
         resampled_data = None
@@ -864,40 +1036,25 @@ class GRIDtoGSSHA(object):
                                                 how=calc_function,
                                                 keep_attrs=True)
         elif time_step_hours > 1:
-            resampled_data = self.data.resample('1H', dim='time',
-                                                keep_attrs=True)
-
-            for time_idx in range(self.data.dims['time']):
-                if time_idx+1 < self.data.dims['time']:
-                    # interpolate between time steps
-                    start_time = self.data.time[time_idx].values
-                    end_time = self.data.time[time_idx+1].values
-                    slope_timeslice = slice(str(start_time), str(end_time))
-                    slice_size = resampled_data.sel(time=slope_timeslice).dims['time'] - 1
-                    first_timestep = resampled_data.sel(time=str(start_time))[gssha_data_var]
-                    slope = (resampled_data.sel(time=str(end_time))[gssha_data_var]
-                             - first_timestep)/float(slice_size)
-
-                    data_timeslice = slice(str(start_time+np.timedelta64(1, 'm')),
-                                            str(end_time-np.timedelta64(1, 'm')))
-                    data_subset = resampled_data.sel(time=data_timeslice)
-                    for xidx in range(data_subset.dims['time']):
-                        data_subset[gssha_data_var][xidx] = first_timestep + slope * (xidx+1)
-                else:
-                    # just continue to repeat the timestep
-                    start_time = self.data.time[time_idx].values
-                    end_time = resampled_data.time[-1].values
-                    if end_time > start_time:
-                        first_timestep = resampled_data.sel(time=str(start_time))[gssha_data_var]
-
-                        data_timeslice = slice(str(start_time), str(end_time))
-                        data_subset = resampled_data.sel(time=data_timeslice)
-                        slice_size = 1
-                        if calc_function == "mean":
-                            slice_size = data_subset.dims['time']
-
-                        for xidx in range(data_subset.dims['time']):
-                            data_subset[gssha_data_var][xidx] = first_timestep/float(slice_size)
+            # linearly interpolate the hours between the LSM time steps
+            source_times = self.data.time.values
+            one_hour = np.timedelta64(1, 'h')
+            hourly_times = np.arange(source_times[0], source_times[-1] + one_hour, one_hour)
+
+            # index of the LSM time step at or before each hour
+            lower_idx = np.clip(np.searchsorted(source_times, hourly_times, side='right') - 1,
+                                0, source_times.size - 2)
+            upper_idx = lower_idx + 1
+            weight = xr.DataArray((hourly_times - source_times[lower_idx]) /
+                                  (source_times[upper_idx] - source_times[lower_idx]),
+                                  dims='time')
+
+            lower_data = self.data.isel(time=lower_idx).assign_coords(time=hourly_times)
+            upper_data = self.data.isel(time=upper_idx).assign_coords(time=hourly_times)
+            resampled_data = lower_data + (upper_data - lower_data) * weight
+
+            resampled_data.attrs = self.data.attrs
+            resampled_data[gssha_data_var].attrs = self.data[gssha_data_var].attrs
 
         if resampled_data is not None:
             # make sure coordinates copied
@@ -962,7 +1119,49 @@ class GRIDtoGSSHA(object):
             raise ValueError("Invalid argument for 'ascii_format'. Only 'grass' or 'arc' allowed.")
 
 
-    def lsm_precip_to_gssha_precip_gage(self, out_gage_file, lsm_data_var, precip_type="RADAR"):
+    def _get_gage_mask(self, y_coords, x_coords, gage_filter):
+        """
+        This function returns the mask of the gages to keep
+        based on the GSSHA watershed mask
+        """
+        VALID_FILTERS = ["watershed", "thiessen"]
+        if gage_filter not in VALID_FILTERS:
+            raise ValueError("ERROR: {0} is not a valid gage filter. "
+                             "Valid filters include: {1}".format(gage_filter, VALID_FILTERS))
+
+        watershed_mask = self.gssha_grid.np_array() != 0
+        x_origin, dx, _, y_origin, _, dy = self.gssha_grid.geotransform
+
+        if gage_filter == "thiessen":
+            # the Thiessen cells of gages on a regular grid are the pixels,
+            # so keep the pixels overlapping the active GSSHA cells
+            active_rows, active_cols = np.nonzero(watershed_mask)
+            cell_x = x_origin + active_cols * dx
+            cell_y = y_origin + active_rows * dy
+            gage_cols = np.rint([axis_fraction(x_coords[0, :], cell_x),
+                                 axis_fraction(x_coords[0, :], cell_x + dx)]).astype(np.int64)
+            gage_rows = np.rint([axis_fraction(y_coords[:, 0], cell_y),
+                                 axis_fraction(y_coords[:, 0], cell_y + dy)]).astype(np.int64)
+            gage_cols.sort(axis=0)
+            gage_rows.sort(axis=0)
+
+            gage_mask = np.zeros(x_coords.shape, dtype=bool)
+            for row_offset in range(np.amax(gage_rows[1] - gage_rows[0]) + 1):
+                for col_offset in range(np.amax(gage_cols[1] - gage_cols[0]) + 1):
+                    gage_mask[np.minimum(gage_rows[0] + row_offset, gage_rows[1]),
+                              np.minimum(gage_cols[0] + col_offset, gage_cols[1])] = True
+            return gage_mask
+
+        gage_cols = np.floor((x_coords - x_origin) / dx).astype(np.int64)
+        gage_rows = np.floor((y_coords - y_origin) / dy).astype(np.int64)
+        in_grid = ((gage_rows >= 0) & (gage_rows < watershed_mask.shape[0]) &
+                   (gage_cols >= 0) & (gage_cols < watershed_mask.shape[1]))
+        gage_mask = np.zeros(x_coords.shape, dtype=bool)
+        gage_mask[in_grid] = watershed_mask[gage_rows[in_grid], gage_cols[in_grid]]
+        return gage_mask
+
+    def lsm_precip_to_gssha_precip_gage(self, out_gage_file, lsm_data_var, precip_type="RADAR",
+                                        decimals=None, gage_filter=None):
         """This function takes array data and writes out a GSSHA precip gage file.
         See: http://www.gsshawiki.com/Precipitation:Spatially_and_Temporally_Varied_Precipitation
 
@@ -979,6 +1178,8 @@ class GRIDtoGSSHA(object):
                                           RAINC and the second is for RAINNC
                                           (see: http://www.meteo.unican.es/wiki/cordexwrf/OutputVariables).
             precip_type(Optional[str]): This tells if the data is the ACCUM, RADAR, or GAGES data type. Default is 'RADAR'.
+            decimals(Optional[int]): Number of decimals written for the coordinates and values. Default is None (full precision).
+            gage_filter(Optional[str]): If 'watershed', only the LSM pixels with centers inside of the GSSHA watershed mask are written as gages. If 'thiessen', only the LSM pixels with Thiessen cells that intersect the GSSHA watershed mask are written as gages, which keeps every gage GSSHA uses with RAIN_THIESSEN. Default is None (all pixels).
 
         GRIDtoGSSHA Example:
 
@@ -1036,7 +1237,33 @@ class GRIDtoGSSHA(object):
         self.data = self.data.lsm.to_projection(gssha_data_var_name,
                                                 projection=self.gssha_grid.projection)
 
-        #LOOP THROUGH TIME
+        # get the gages to write
+        y_coords, x_coords = self.data.lsm.coords
+        y_coords = np.asarray(y_coords)
+        x_coords = np.asarray(x_coords)
+        gage_indices = np.arange(x_coords.size)
+        if gage_filter is not None:
+            gage_indices = np.flatnonzero(self._get_gage_mask(y_coords, x_coords, gage_filter))
+        y_coords = y_coords.ravel()
+        x_coords = x_coords.ravel()
+        if gage_indices.size == 0:
+            raise ValueError("ERROR: No LSM pixels remain after applying "
+                             "the gage filter '{0}' ...".format(gage_filter))
+
+        value_format = u"%s"
+        if decimals is not None:
+            value_format = u"%.{0}f".format(decimals)
+
+        def format_values(values):
+            # the shortest text of the native type (Ex. float32) by default
+            if decimals is None:
+                return values.astype(str).tolist()
+            return values.tolist()
+
+        coord_format = u"COORD {0} {0} \"center of pixel #%d\"\n".format(value_format)
+        values_format = u" ".join([value_format] * gage_indices.size)
+
+        # LOOP THROUGH TIME
         with io_open(out_gage_file, 'w') as gage_file:
             if self.data.dims['time']>1:
                 gage_file.write(u"EVENT \"Event of {0} to {1}\"\n".format(self._time_to_string(self.data.lsm.datetime[0]),
@@ -1044,19 +1271,33 @@ class GRIDtoGSSHA(object):
             else:
                 gage_file.write(u"EVENT \"Event of {0}\"\n".format(self._time_to_string(self.data.lsm.datetime[0])))
             gage_file.write(u"NRPDS {0}\n".format(self.data.dims['time']))
-            gage_file.write(u"NRGAG {0}\n".format(self.data.dims['x']*self.data.dims['y']))
-            y_coords, x_coords = self.data.lsm.coords
-            for y_idx in range(self.data.dims['y']):
-                for x_idx in range(self.data.dims['x']):
-                    coord_idx = y_idx*self.data.dims['x'] + x_idx
-                    gage_file.write(u"COORD {0} {1} \"center of pixel #{2}\"\n".format(x_coords[y_idx, x_idx],
-                                                                                       y_coords[y_idx, x_idx],
-                                                                                       coord_idx))
+            gage_file.write(u"NRGAG {0}\n".format(gage_indices.size))
+            coord_values = zip(format_values(x_coords[gage_indices]),
+                               format_values(y_coords[gage_indices]),
+                               gage_indices.tolist())
+            gage_file.write(u"".join([coord_format] * gage_indices.size)
+                            % tuple(value for coord in coord_values for value in coord))
+            # one time step at a time to keep memory flat
             for time_idx in range(self.data.dims['time']):
                 date_str = self._time_to_string(self.data.lsm.datetime[time_idx])
-                data_str = " ".join(self.data[gssha_data_var_name][time_idx].values.ravel().astype(str))
-                gage_file.write(u"{0} {1} {2}\n".format(precip_type, date_str, data_str))
+                time_values = np.asarray(self.data[gssha_data_var_name][time_idx].values).ravel()[gage_indices]
+                gage_file.write(u"{0} {1} ".format(precip_type, date_str))
+                gage_file.write(values_format % tuple(format_values(time_values)))
+                gage_file.write(u"\n")
 
+    @staticmethod
+    def _wait_for_writes(pending_writes, pending_variable=None):
+        """
+        This function waits for the pending ASCII file writes
+        and logs the variable they complete, if given
+        """
+        for result in pending_writes:
+            result.get()
+        del pending_writes[:]
+        if pending_variable is not None:
+            gssha_data_hmet_name, num_files, start_time = pending_variable
+            log.info("Wrote {0} {1} ASCII files in {2:.1f} seconds"
+                     .format(num_files, gssha_data_hmet_name, timer() - start_time))
 
     def _write_hmet_card_file(self, hmet_card_file_path, main_output_folder):
         """
@@ -1070,7 +1311,8 @@ class GRIDtoGSSHA(object):
 
 
     def lsm_data_to_arc_ascii(self, data_var_map_array,
-                                    main_output_folder=""):
+                                    main_output_folder="",
+                                    workers=None):
         """Writes extracted data to Arc ASCII file format into folder
         to be read in by GSSHA. Also generates the HMET_ASCII card file
         for GSSHA in the folder named 'hmet_file_list.txt'.
@@ -1088,6 +1330,12 @@ class GRIDtoGSSHA(object):
             main_output_folder(Optional[str]): This is the path to place the generated ASCII files.
                                         If not included, it defaults to
                                         os.path.join(self.gssha_project_folder, "hmet_ascii_data").
+            workers(Optional[int]): Number of processes writing the ASCII files.
+                                    While the files of one variable are written,
+                                    the next variable is loaded and reprojected.
+                                    Only one block of time steps (all of the time steps
+                                    of a variable without chunks) waits to be written at a time.
+                                    If not included, the files are written one by one.
 
         GRIDtoGSSHA Example:
 
@@ -1167,24 +1415,74 @@ class GRIDtoGSSHA(object):
         log.info("Outputting HMET data to {0}".format(main_output_folder))
 
         #PART 2: DATA
-        for data_var_map in data_var_map_array:
-            gssha_data_var, lsm_data_var = data_var_map
-            gssha_data_hmet_name = self.netcdf_attributes[gssha_data_var]['hmet_name']
-            gssha_data_var_name = self.netcdf_attributes[gssha_data_var]['gssha_name']
+        pool = None
+        if workers is not None and workers > 1:
+            pool = Pool(workers)
 
-            self._load_converted_gssha_data_from_lsm(gssha_data_var, lsm_data_var, 'ascii')
-            self._convert_data_to_hourly(gssha_data_var_name)
-            self.data = self.data.lsm.to_projection(gssha_data_var_name,
-                                                    projection=self.gssha_grid.projection)
+        # writes of the last time block queued and the variable they belong to
+        pending_writes = []
+        pending_variable = None
+        try:
+            for data_var_map in data_var_map_array:
+                gssha_data_var, lsm_data_var = data_var_map
+                gssha_data_hmet_name = self.netcdf_attributes[gssha_data_var]['hmet_name']
+                gssha_data_var_name = self.netcdf_attributes[gssha_data_var]['gssha_name']
 
-            for time_idx in range(self.data.dims['time']):
-                arr_grid = ArrayGrid(in_array=self.data[gssha_data_var_name][time_idx].values,
-                                     wkt_projection=self.data.lsm.projection.ExportToWkt(),
-                                     geotransform=self.data.lsm.geotransform,
-                                     nodata_value=-9999)
-                date_str = self._time_to_string(self.data.lsm.datetime[time_idx], "%Y%m%d%H")
-                ascii_file_path = path.join(main_output_folder, "{0}_{1}.asc".format(date_str, gssha_data_hmet_name))
-                arr_grid.to_arc_ascii(ascii_file_path)
+                start_time = timer()
+                self._load_converted_gssha_data_from_lsm(gssha_data_var, lsm_data_var, 'ascii')
+                self._convert_data_to_hourly(gssha_data_var_name)
+                if self.chunks:
+                    self._project_data_in_time_blocks(gssha_data_var_name)
+                else:
+                    self.data = self._project_data(self.data, gssha_data_var_name)
+
+                # the files of the previous variable were written while this one was loaded
+                self._wait_for_writes(pending_writes, pending_variable)
+                pending_variable = None
+
+                ascii_file_paths = []
+                for time_idx in range(self.data.dims['time']):
+                    date_str = self._time_to_string(self.data.lsm.datetime[time_idx], "%Y%m%d%H")
+                    ascii_file_paths.append(path.join(main_output_folder,
+                                                      "{0}_{1}.asc".format(date_str, gssha_data_hmet_name)))
+
+                geotransform = self.data.lsm.geotransform
+                time_block_size = self._time_block_size()
+
+                for block_start in range(0, len(ascii_file_paths), time_block_size):
+                    time_block = slice(block_start, block_start + time_block_size)
+                    grids = self.data[gssha_data_var_name][time_block].values
+                    block_file_paths = ascii_file_paths[time_block]
+
+                    if pool is None:
+                        write_arc_ascii_grids((grids, block_file_paths, geotransform))
+                        continue
+
+                    # only one time block of grids waits to be written at a time
+                    self._wait_for_writes(pending_writes)
+
+                    # split the time steps between the writers
+                    for time_indices in np.array_split(np.arange(len(block_file_paths)), workers):
+                        if time_indices.size > 0:
+                            job = (grids[time_indices],
+                                   [block_file_paths[time_idx] for time_idx in time_indices],
+                                   geotransform)
+                            pending_writes.append(pool.apply_async(write_arc_ascii_grids, (job,)))
+
+                if pool is None:
+                    log.info("Wrote {0} {1} ASCII files in {2:.1f} seconds"
+                             .format(len(ascii_file_paths), gssha_data_hmet_name, timer() - start_time))
+                    continue
+
+                log.info("Loaded {0} in {1:.1f} seconds. Writing {2} ASCII files ..."
+                         .format(gssha_data_hmet_name, timer() - start_time, len(ascii_file_paths)))
+                pending_variable = (gssha_data_hmet_name, len(ascii_file_paths), start_time)
+
+            self._wait_for_writes(pending_writes, pending_variable)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
         #PART 3: HMET_ASCII card input file with ASCII file list
         hmet_card_file_path = path.join(main_output_folder, 'hmet_file_list.txt')
@@ -1192,9 +1490,16 @@ class GRIDtoGSSHA(object):
 
     def lsm_data_to_subset_netcdf(self, netcdf_file_path,
                                         data_var_map_array,
-                                        resample_method=None):
+                                        resample_method=None,
+                                        complevel=None,
+                                        time_chunk_size=None):
         """Writes extracted data to the NetCDF file format
 
+        The file is created with the first variable and each following
+        variable is appended to it as soon as it is converted, so only
+        one variable is held in memory at a time. All of the variables
+        must have the same time steps and grid coordinates.
+
         .. todo:: NetCDF output data time is always in UTC time. Need to convert to local timezone for GSSHA.
 
         .. warning:: The NetCDF GSSHA file is only supported in GSSHA 7 or greater.
@@ -1209,6 +1514,8 @@ class GRIDtoGSSHA(object):
             data_var_map_array(list): Array to map the variables in the LSM file to the
                                       matching required GSSHA data.
             resample_method(Optional[gdalconst]): Resample input method to match hmet data to GSSHA grid for NetCDF output. Default is None.
+            complevel(Optional[int]): zlib compression level (1-9) of the variables in the NetCDF file. Default is None (no compression).
+            time_chunk_size(Optional[int]): Number of time steps in each NetCDF chunk of the variables (Ex. 1 for one chunk per hour, as GSSHA reads the file). Default is None (the default layout of the NetCDF library).
 
 
         GRIDtoGSSHA Example:
@@ -1279,7 +1586,8 @@ class GRIDtoGSSHA(object):
         """
         self._check_lsm_input(data_var_map_array)
 
-        output_datasets = []
+        write_mode = 'w'
+        netcdf_coords = None
         #DATA
         for gssha_var, lsm_var in data_var_map_array:
             if gssha_var in self.netcdf_attributes:
@@ -1287,21 +1595,60 @@ class GRIDtoGSSHA(object):
                 #previously just added data, but needs to be hourly
                 gssha_data_var_name = self.netcdf_attributes[gssha_var]['gssha_name']
                 self._convert_data_to_hourly(gssha_data_var_name)
-                if resample_method:
-                    self._resample_data(gssha_data_var_name)
+                if self.chunks:
+                    self._project_data_in_time_blocks(gssha_data_var_name, resample_method)
                 else:
-                    self.data = self.data.lsm.to_projection(gssha_data_var_name,
-                                                            projection=self.gssha_grid.projection)
-
-                output_datasets.append(self.data)
+                    self.data = self._project_data(self.data, gssha_data_var_name,
+                                                   resample_method)
+
+                # the variables are not aligned when appended to the file
+                data_coords = self.data[gssha_data_var_name].coords
+                if netcdf_coords is None:
+                    netcdf_coords = data_coords
+                for coord_name, coord in netcdf_coords.items():
+                    if coord_name not in data_coords or \
+                            not data_coords[coord_name].equals(coord):
+                        raise ValueError("The {0} coordinate of {1} does not match "
+                                         "the other variables in the NetCDF file ..."
+                                         .format(coord_name, gssha_var))
+
+                self._write_netcdf_variable(netcdf_file_path,
+                                            gssha_data_var_name,
+                                            write_mode,
+                                            complevel,
+                                            time_chunk_size)
+                write_mode = 'a'
             else:
                 raise ValueError("Invalid GSSHA variable name: {0} ...".format(gssha_var))
-        output_dataset = xr.merge(output_datasets)
-        #add global attributes
-        output_dataset.attrs['Convention'] = 'CF-1.6'
-        output_dataset.attrs['title'] = 'GSSHA LSM Input'
-        output_dataset.attrs['history'] = 'date_created: {0}'.format(datetime.utcnow())
-        output_dataset.attrs['proj4'] = self.data.attrs['proj4']
-        output_dataset.attrs['geotransform'] = self.data.attrs['geotransform']
 
-        output_dataset.to_netcdf(netcdf_file_path)
+    def _write_netcdf_variable(self, netcdf_file_path, gssha_data_var,
+                               mode, complevel=None, time_chunk_size=None):
+        """
+        This function writes the converted data of a variable
+        to the GSSHA NetCDF file. The file is created with mode 'w'
+        and the variable is added to the existing file with mode 'a'.
+        """
+        output_dataset = self.data.copy(deep=False)
+        #add global attributes
+        output_dataset.attrs = OrderedDict([
+            ('Convention', 'CF-1.6'),
+            ('title', 'GSSHA LSM Input'),
+            ('history', 'date_created: {0}'.format(datetime.utcnow())),
+            ('proj4', self.data.attrs['proj4']),
+            ('geotransform', self.data.attrs['geotransform']),
+        ])
+
+        encoding = {}
+        if time_chunk_size:
+            data_var = output_dataset[gssha_data_var]
+            chunksizes = list(data_var.shape)
+            time_axis = data_var.dims.index('time')
+            chunksizes[time_axis] = max(1, min(time_chunk_size, chunksizes[time_axis]))
+            encoding['chunksizes'] = tuple(chunksizes)
+        if complevel:
+            encoding['zlib'] = True
+            encoding['complevel'] = complevel
+
+        output_dataset.to_netcdf(netcdf_file_path,
+                                 mode=mode,
+                                 encoding={gssha_data_var: encoding})
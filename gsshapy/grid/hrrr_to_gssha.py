@@ -6,8 +6,11 @@
 ##  Created by Alan D Snow, 2016.
 ##  License BSD 3-Clause
 
+import hashlib
 import logging
-from os import mkdir, path, remove
+from multiprocessing.pool import ThreadPool
+from os import mkdir, path, remove, rename
+from time import sleep
 
 import numpy as np
 import pandas as pd
@@ -21,14 +24,157 @@ log = logging.getLogger(__name__)
 #------------------------------------------------------------------------------
 # HELPER FUNCTIONS
 #------------------------------------------------------------------------------
+HRRR_FILTER_URL = 'http://nomads.ncep.noaa.gov/cgi-bin/filter_hrrr_2d.pl'
+
+
+def _file_md5(file_path, chunk_size=1024*1024):
+    """
+    This function returns the md5 checksum of a file
+    """
+    file_hash = hashlib.md5()
+    with open(file_path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _request_md5(url, payload):
+    """
+    This function returns the md5 checksum of the
+    request used to download a file
+    """
+    request_hash = hashlib.md5(url.encode('utf-8'))
+    for key, value in sorted(payload.items()):
+        request_hash.update('&{0}={1}'.format(key, value).encode('utf-8'))
+    return request_hash.hexdigest()
+
+
+def _is_downloaded(out_file, request_md5):
+    """
+    This function checks if the file was downloaded completely
+    with the same request based on the checksums written after download
+    """
+    checksum_file = '{0}.md5'.format(out_file)
+    if not (path.exists(out_file) and path.exists(checksum_file)):
+        return False
+    with open(checksum_file) as fd:
+        checksums = fd.read().split()
+    return checksums == [request_md5, _file_md5(out_file)]
+
+
+def _expected_size(r):
+    """
+    This function returns the size of the complete file from the
+    headers of the response or None if the server did not send it
+    """
+    content_range = r.headers.get('Content-Range')
+    if r.status_code == requests.codes.partial_content and content_range:
+        total = content_range.rsplit('/', 1)[-1].strip()
+        return int(total) if total.isdigit() else None
+    content_length = r.headers.get('Content-Length')
+    if r.status_code == requests.codes.ok and content_length:
+        return int(content_length) if content_length.strip().isdigit() else None
+    return None
+
+
+def _download_file(job):
+    """
+    This function downloads a file with retries and resumes
+    from the partial file of previous attempts if the server allows it
+    """
+    url, payload, out_file, retries, backoff, chunk_size, timeout = job
+    request_md5 = _request_md5(url, payload)
+    if _is_downloaded(out_file, request_md5):
+        log.info("Skipping {0}. Already downloaded ...".format(out_file))
+        return True
+
+    # partial files are only resumed with the same request (Ex. same bounding box)
+    part_file = '{0}.part'.format(out_file)
+    part_checksum_file = '{0}.md5'.format(part_file)
+    if path.exists(part_file):
+        part_request_md5 = None
+        if path.exists(part_checksum_file):
+            with open(part_checksum_file) as fd:
+                part_request_md5 = fd.read().strip()
+        if part_request_md5 != request_md5:
+            remove(part_file)
+    with open(part_checksum_file, 'w') as fd:
+        fd.write(request_md5)
+
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            sleep(backoff * 2 ** (attempt - 1))
+        headers = {}
+        if path.exists(part_file) and path.getsize(part_file) > 0:
+            headers['Range'] = 'bytes={0}-'.format(path.getsize(part_file))
+        try:
+            r = requests.get(url, params=payload, headers=headers,
+                             stream=True, timeout=timeout)
+            try:
+                if r.status_code == requests.codes.requested_range_not_satisfiable:
+                    # the partial file cannot be resumed, so start over
+                    remove(part_file)
+                    continue
+                if r.status_code not in (requests.codes.ok, requests.codes.partial_content):
+                    log.warning("Problem downloading {0} (HTTP {1}). Attempt {2} of {3} ..."
+                                .format(path.basename(out_file), r.status_code,
+                                        attempt + 1, retries + 1))
+                    continue
+                expected_size = _expected_size(r)
+                # restart if the server sent the whole file
+                file_mode = 'ab' if r.status_code == requests.codes.partial_content else 'wb'
+                with open(part_file, file_mode) as fd:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        fd.write(chunk)
+            finally:
+                r.close()
+        except requests.exceptions.RequestException as ex:
+            log.warning("Problem downloading {0} ({1}). Attempt {2} of {3} ..."
+                        .format(path.basename(out_file), ex, attempt + 1, retries + 1))
+            continue
+
+        part_size = path.getsize(part_file)
+        if expected_size is not None and part_size != expected_size:
+            log.warning("Problem downloading {0} ({1} of {2} bytes). Attempt {3} of {4} ..."
+                        .format(path.basename(out_file), part_size, expected_size,
+                                attempt + 1, retries + 1))
+            if part_size > expected_size:
+                remove(part_file)
+            continue
+
+        if path.exists(out_file):
+            remove(out_file)
+        rename(part_file, out_file)
+        remove(part_checksum_file)
+        with open('{0}.md5'.format(out_file), 'w') as fd:
+            fd.write('{0} {1}'.format(request_md5, _file_md5(out_file)))
+        return True
+
+    log.error("Problem downloading {0}".format(path.basename(out_file)))
+    return False
+
+
 def download_hrrr_for_gssha(main_directory,
                             forecast_start_date_string, #EX. '20160913'
                             forecast_start_hour_string, #EX. '00' to '23'
                             leftlon=-180, rightlon=180,
-                            toplat=90,bottomlat=-90):
+                            toplat=90,bottomlat=-90,
+                            workers=4, retries=3, backoff=1,
+                            timeout=60, chunk_size=1024*1024,
+                            url=HRRR_FILTER_URL):
     """
     Function to download HRRR data for GSSHA
 
+    The forecast files are downloaded in parallel. Each file is written
+    to a temporary '.part' file first, so a failed download is resumed
+    on the next attempt when the server supports it. A file is only
+    complete when its size matches the size sent by the server. Complete
+    files are recorded with the md5 checksums of the request and of the
+    file and skipped when the function runs again with the same request.
+    Files from a different request (Ex. another bounding box) are downloaded
+    again. Files that fail to download after all of the retries are logged
+    and left out of the returned list.
+
     URL:
         http://nomads.ncep.noaa.gov/cgi-bin/filter_hrrr_2d.pl
 
@@ -40,9 +186,15 @@ def download_hrrr_for_gssha(main_directory,
         rightlon(Optional[double,int]): Right bound for longitude. Default is 180.
         toplat(Optional[double,int]): Top bound for latitude. Default is 90.
         bottomlat(Optional[double,int]): Bottom bound for latitude. Default is -90.
+        workers(Optional[int]): Number of files downloaded at the same time. Default is 4.
+        retries(Optional[int]): Number of times a failed download is retried. Default is 3.
+        backoff(Optional[double,int]): Seconds to wait before the first retry, doubled for each retry. Default is 1.
+        timeout(Optional[double,int]): Seconds to wait for the server to respond or send data. Default is 60.
+        chunk_size(Optional[int]): Size in bytes of the chunks written to the files. Default is 1 MB.
+        url(Optional[str]): URL of the HRRR filter service. Default is the NOMADS HRRR 2D filter.
 
     Returns:
-        downloaded_file_list(list): List of paths to downloaded files.
+        downloaded_file_list(list): List of paths to downloaded files. Files that failed to download are not included.
 
     Example::
 
@@ -68,7 +220,7 @@ def download_hrrr_for_gssha(main_directory,
                                            '05', '06', '07', '08', '09',
                                            '10', '11', '12', '13', '14',
                                            '15', '16', '17', '18']
-    downloaded_file_list = []
+    jobs = []
     for forecast_timestep_hour_string in forecast_timestep_hour_string_array:
         file_name = 'hrrr.t{0}z.wrfsfcf{1}.grib2'.format(forecast_start_hour_string, forecast_timestep_hour_string)
         payload = {
@@ -92,26 +244,25 @@ def download_hrrr_for_gssha(main_directory,
                    'bottomlat': str(bottomlat),
                    'dir': '/hrrr.{0}'.format(forecast_start_date_string),
                    }
+        jobs.append((url, payload, path.join(out_directory, file_name),
+                     retries, backoff, chunk_size, timeout))
+
+    pool = ThreadPool(max(1, min(workers, len(jobs))))
+    try:
+        download_success = pool.map(_download_file, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    failed_file_list = [path.basename(job[2]) for job, success
+                        in zip(jobs, download_success) if not success]
+    if failed_file_list:
+        # partial files are kept to resume the download
+        log.error("Problem downloading HRRR forecast {0} {1}z files: {2}"
+                  .format(forecast_start_date_string, forecast_start_hour_string,
+                          ", ".join(failed_file_list)))
 
-        r = requests.get('http://nomads.ncep.noaa.gov/cgi-bin/filter_hrrr_2d.pl', params=payload, stream=True)
-
-        if r.status_code == requests.codes.ok:
-            out_file = path.join(out_directory, file_name)
-            downloaded_file_list.append(out_file)
-            with open(out_file, 'wb') as fd:
-                for chunk in r.iter_content(chunk_size=1024):
-                    fd.write(chunk)
-        else:
-            log.error("Problem downloading {0}".format(file_name))
-            for filename in downloaded_file_list:
-                try:
-                    remove(filename)
-                except OSError:
-                    pass
-            downloaded_file_list = []
-            break
-
-    return downloaded_file_list
+    return [job[2] for job, success in zip(jobs, download_success) if success]
 
 #------------------------------------------------------------------------------
 # MAIN CLASS
@@ -132,6 +283,9 @@ class HRRRtoGSSHA(GRIDtoGSSHA):
         lsm_lon_dim(Optional[:obj:`str`]): Name of the longitude dimension in the LSM netCDF files. Defaults to 'lon'.
         lsm_time_dim(Optional[:obj:`str`]): Name of the time dimension in the LSM netCDF files. Defaults to 'time'.
         output_timezone(Optional[:obj:`tzinfo`]): This is the timezone to output the dates for the data. Default is the timezone of your GSSHA model. This option does NOT currently work for NetCDF output.
+        chunks(Optional[:obj:`dict`]): Chunk sizes along the dimensions of the LSM data (Ex. {'time': 24}). If given, the data is kept lazy (dask) and is processed one chunk of time steps at a time. Requires dask. Default is None.
+        cache_regrid_weights(Optional[bool]): If True, the data is regridded to the GSSHA grid with weights that are computed once and stored in the GSSHA project folder (see :func:`GRIDtoGSSHA`). The output is on the GSSHA grid instead of the grid at the LSM resolution in the GSSHA projection. Default is False.
+        lsm_dataset(Optional[:obj:`xarray.Dataset`]): LSM dataset already opened by another instance to use instead of opening the LSM files again. Default is None.
 
     Example::
 
@@ -168,6 +322,9 @@ class HRRRtoGSSHA(GRIDtoGSSHA):
                  lsm_lon_dim='xgrid_0',
                  lsm_time_dim='time',
                  output_timezone=None,
+                 chunks=None,
+                 cache_regrid_weights=False,
+                 lsm_dataset=None,
                  ):
         """
         Initializer function for the HRRRtoGSSHA class
@@ -183,4 +340,7 @@ class HRRRtoGSSHA(GRIDtoGSSHA):
                                           lsm_lon_dim,
                                           lsm_time_dim,
                                           output_timezone,
-                                          pangaea_loader='hrrr')
+                                          pangaea_loader='hrrr',
+                                          chunks=chunks,
+                                          cache_regrid_weights=cache_regrid_weights,
+                                          lsm_dataset=lsm_dataset)
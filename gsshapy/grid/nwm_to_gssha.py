@@ -35,6 +35,9 @@ class NWMtoGSSHA(GRIDtoGSSHA):
         lsm_lon_dim(Optional[:obj:`str`]): Name of the longitude dimension in the LSM netCDF files. Defaults to 'lon'.
         lsm_time_dim(Optional[:obj:`str`]): Name of the time dimension in the LSM netCDF files. Defaults to 'time'.
         output_timezone(Optional[:obj:`tzinfo`]): This is the timezone to output the dates for the data. Default is he GSSHA model timezone. This option does NOT currently work for NetCDF output.
+        chunks(Optional[:obj:`dict`]): Chunk sizes along the dimensions of the LSM data (Ex. {'time': 24}). If given, the data is kept lazy (dask) and is processed one chunk of time steps at a time. Requires dask. Default is None.
+        cache_regrid_weights(Optional[bool]): If True, the data is regridded to the GSSHA grid with weights that are computed once and stored in the GSSHA project folder (see :func:`GRIDtoGSSHA`). The output is on the GSSHA grid instead of the grid at the LSM resolution in the GSSHA projection. Default is False.
+        lsm_dataset(Optional[:obj:`xarray.Dataset`]): LSM dataset already opened by another instance to use instead of opening the LSM files again. Default is None.
 
     Example::
 
@@ -80,6 +83,9 @@ class NWMtoGSSHA(GRIDtoGSSHA):
                  lsm_lon_dim='x',
                  lsm_time_dim='time',
                  output_timezone=None,
+                 chunks=None,
+                 cache_regrid_weights=False,
+                 lsm_dataset=None,
                  ):
         """
         Initializer function for the NWMtoGSSHA class
@@ -94,7 +100,10 @@ class NWMtoGSSHA(GRIDtoGSSHA):
                                          lsm_lat_dim,
                                          lsm_lon_dim,
                                          lsm_time_dim,
-                                         output_timezone)
+                                         output_timezone,
+                                         chunks=chunks,
+                                         cache_regrid_weights=cache_regrid_weights,
+                                         lsm_dataset=lsm_dataset)
 
     @property
     def xd(self):
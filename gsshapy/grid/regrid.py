@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+#
+#  regrid.py
+#  GSSHApy
+#
+#  License BSD 3-Clause
+
+import hashlib
+import logging
+from os import path
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+def axis_fraction(axis_coords, coords):
+    """
+    This function returns the fractional index of
+    the coordinates along a regular axis
+    """
+    axis_coords = np.asarray(axis_coords, dtype=np.float64)
+    axis_index = np.arange(axis_coords.size, dtype=np.float64)
+    if axis_coords.size > 1 and axis_coords[0] > axis_coords[-1]:
+        axis_coords = axis_coords[::-1]
+        axis_index = axis_index[::-1]
+    return np.interp(coords, axis_coords, axis_index)
+
+
+def _axis_inside(axis_coords, coords):
+    """
+    This function returns the mask of the coordinates within
+    the extent of the cells along a regular axis
+    """
+    axis_coords = np.asarray(axis_coords, dtype=np.float64)
+    coords = np.asarray(coords, dtype=np.float64)
+    if axis_coords.size < 2:
+        return np.ones(coords.shape, dtype=bool)
+    if axis_coords[0] > axis_coords[-1]:
+        axis_coords = axis_coords[::-1]
+    min_coord = axis_coords[0] - (axis_coords[1] - axis_coords[0]) / 2.0
+    max_coord = axis_coords[-1] + (axis_coords[-1] - axis_coords[-2]) / 2.0
+    return (coords >= min_coord) & (coords <= max_coord)
+
+
+def _transform_points(x_coords, y_coords, src_wkt, dst_wkt):
+    """
+    This function transforms coordinates between projections
+    """
+    from osgeo import osr
+
+    src_proj = osr.SpatialReference()
+    src_proj.ImportFromWkt(src_wkt)
+    dst_proj = osr.SpatialReference()
+    dst_proj.ImportFromWkt(dst_wkt)
+    # keep (x, y) axis order with GDAL >= 3
+    if hasattr(osr, 'OAMS_TRADITIONAL_GIS_ORDER'):
+        src_proj.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        dst_proj.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+    transform = osr.CoordinateTransformation(src_proj, dst_proj)
+    points = np.array(transform.TransformPoints(
+        np.column_stack((x_coords, y_coords)).tolist()))
+    return points[:, 0], points[:, 1]
+
+
+# ------------------------------------------------------------------------------
+# MAIN CLASS
+# ------------------------------------------------------------------------------
+class RegridWeights(object):
+    """This class holds the weights to regrid data from a regular LSM grid
+    to the GSSHA grid.
+
+    The weights are stored as a sparse matrix with a fixed number of
+    source cells for each GSSHA cell, so regridding all variables and
+    time steps is a single gather and weighted sum. GSSHA cells outside
+    of the source grid have NaN weights, so they are regridded to NaN.
+
+    Attributes:
+        indices(:obj:`numpy.ndarray`): Flat source cell indices with shape (GSSHA cells, source cells per GSSHA cell).
+        weights(:obj:`numpy.ndarray`): Weights of the source cells with the same shape as the indices.
+        src_shape(:obj:`tuple`): Shape (y, x) of the source grid.
+        dst_shape(:obj:`tuple`): Shape (y, x) of the GSSHA grid.
+
+    Example::
+
+        from gsshapy.grid.regrid import RegridWeights
+
+        regrid_weights = RegridWeights.load_or_create('E:/GSSHA',
+                                                      lsm_y_coords, lsm_x_coords, lsm_wkt,
+                                                      gssha_geotransform, gssha_shape, gssha_wkt)
+        gssha_values = regrid_weights.apply(lsm_values)
+
+    """
+    METHODS = ('bilinear', 'nearest')
+    # number of gathered values held in memory at a time when regridding
+    BLOCK_VALUES = 2 ** 22
+    # version of the weights stored in the cache files
+    VERSION = 2
+
+    def __init__(self, indices, weights, src_shape, dst_shape):
+        """
+        Initializer function for the RegridWeights class
+        """
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.src_shape = tuple(int(size) for size in src_shape)
+        self.dst_shape = tuple(int(size) for size in dst_shape)
+
+    @staticmethod
+    def grid_hash(y_coords, x_coords, src_wkt,
+                  dst_geotransform, dst_shape, dst_wkt,
+                  method='bilinear'):
+        """Returns the hash of the source and GSSHA grids used as the cache key.
+
+        Parameters:
+            y_coords(:obj:`numpy.ndarray`): 2D y coordinates of the source cell centers in the source projection.
+            x_coords(:obj:`numpy.ndarray`): 2D x coordinates of the source cell centers in the source projection.
+            src_wkt(str): Projection of the source grid as WKT.
+            dst_geotransform(:obj:`tuple`): GDAL geotransform of the GSSHA grid.
+            dst_shape(:obj:`tuple`): Shape (y, x) of the GSSHA grid.
+            dst_wkt(str): Projection of the GSSHA grid as WKT.
+            method(Optional[str]): Regridding method ('bilinear' or 'nearest'). Default is 'bilinear'.
+
+        Returns:
+            str: Hexadecimal hash of the grids.
+        """
+        grid_hash = hashlib.sha1(repr(RegridWeights.VERSION).encode('utf-8'))
+        for coords in (y_coords, x_coords):
+            coords = np.ascontiguousarray(coords, dtype=np.float64)
+            grid_hash.update(repr(coords.shape).encode('utf-8'))
+            grid_hash.update(coords.tobytes())
+        grid_hash.update(src_wkt.encode('utf-8'))
+        grid_hash.update(repr(tuple(float(value) for value in dst_geotransform)).encode('utf-8'))
+        grid_hash.update(repr(tuple(int(size) for size in dst_shape)).encode('utf-8'))
+        grid_hash.update(dst_wkt.encode('utf-8'))
+        grid_hash.update(method.encode('utf-8'))
+        return grid_hash.hexdigest()
+
+    @classmethod
+    def from_grids(cls, y_coords, x_coords, src_wkt,
+                   dst_geotransform, dst_shape, dst_wkt,
+                   method='bilinear'):
+        """Computes the weights from the source and GSSHA grids.
+
+        The centers of the GSSHA cells are transformed to the source
+        projection and located on the regular source grid. GSSHA cells
+        with centers outside of the extent of the source cells are masked
+        with NaN weights. Cells within half of a source cell of the edge
+        use the edge cells.
+
+        Parameters:
+            y_coords(:obj:`numpy.ndarray`): 2D y coordinates of the source cell centers in the source projection.
+            x_coords(:obj:`numpy.ndarray`): 2D x coordinates of the source cell centers in the source projection.
+            src_wkt(str): Projection of the source grid as WKT.
+            dst_geotransform(:obj:`tuple`): GDAL geotransform of the GSSHA grid.
+            dst_shape(:obj:`tuple`): Shape (y, x) of the GSSHA grid.
+            dst_wkt(str): Projection of the GSSHA grid as WKT.
+            method(Optional[str]): Regridding method ('bilinear' or 'nearest'). Default is 'bilinear'.
+
+        Returns:
+            :func:`RegridWeights`
+        """
+        if method not in cls.METHODS:
+            raise ValueError("Invalid regridding method {0}. Valid methods are {1}."
+                             .format(method, cls.METHODS))
+
+        y_coords = np.asarray(y_coords)
+        x_coords = np.asarray(x_coords)
+        src_shape = y_coords.shape
+        dst_rows, dst_cols = dst_shape
+
+        # GSSHA cell centers
+        x_origin, dx, _, y_origin, _, dy = dst_geotransform
+        dst_x, dst_y = np.meshgrid(x_origin + (np.arange(dst_cols) + 0.5) * dx,
+                                   y_origin + (np.arange(dst_rows) + 0.5) * dy)
+        dst_x = dst_x.ravel()
+        dst_y = dst_y.ravel()
+        if src_wkt != dst_wkt:
+            dst_x, dst_y = _transform_points(dst_x, dst_y, dst_wkt, src_wkt)
+
+        # fractional location on the source grid
+        row = axis_fraction(y_coords[:, 0], dst_y)
+        col = axis_fraction(x_coords[0, :], dst_x)
+        outside = ~(_axis_inside(y_coords[:, 0], dst_y) &
+                    _axis_inside(x_coords[0, :], dst_x))
+        row[outside] = 0
+        col[outside] = 0
+
+        if method == 'nearest':
+            indices = np.ravel_multi_index((np.rint(row).astype(np.int64),
+                                            np.rint(col).astype(np.int64)),
+                                           src_shape)[:, np.newaxis]
+            weights = np.ones(indices.shape)
+        else:
+            row0 = np.floor(row).astype(np.int64)
+            col0 = np.floor(col).astype(np.int64)
+            row1 = np.minimum(row0 + 1, src_shape[0] - 1)
+            col1 = np.minimum(col0 + 1, src_shape[1] - 1)
+            row_weight = row - row0
+            col_weight = col - col0
+            indices = np.column_stack([np.ravel_multi_index((row0, col0), src_shape),
+                                       np.ravel_multi_index((row0, col1), src_shape),
+                                       np.ravel_multi_index((row1, col0), src_shape),
+                                       np.ravel_multi_index((row1, col1), src_shape)])
+            weights = np.column_stack([(1 - row_weight) * (1 - col_weight),
+                                       (1 - row_weight) * col_weight,
+                                       row_weight * (1 - col_weight),
+                                       row_weight * col_weight])
+        weights[outside] = np.nan
+
+        return cls(indices, weights, src_shape, dst_shape)
+
+    @classmethod
+    def load_or_create(cls, cache_directory, y_coords, x_coords, src_wkt,
+                       dst_geotransform, dst_shape, dst_wkt,
+                       method='bilinear'):
+        """Loads the weights from the cache directory or computes and stores them.
+
+        The weights are stored in a file named after the hash of the grids,
+        so a change to either grid creates new weights.
+
+        Parameters:
+            cache_directory(str): Directory the weights are stored in (Ex. the GSSHA project folder).
+            y_coords(:obj:`numpy.ndarray`): 2D y coordinates of the source cell centers in the source projection.
+            x_coords(:obj:`numpy.ndarray`): 2D x coordinates of the source cell centers in the source projection.
+            src_wkt(str): Projection of the source grid as WKT.
+            dst_geotransform(:obj:`tuple`): GDAL geotransform of the GSSHA grid.
+            dst_shape(:obj:`tuple`): Shape (y, x) of the GSSHA grid.
+            dst_wkt(str): Projection of the GSSHA grid as WKT.
+            method(Optional[str]): Regridding method ('bilinear' or 'nearest'). Default is 'bilinear'.
+
+        Returns:
+            :func:`RegridWeights`
+        """
+        grid_hash = cls.grid_hash(y_coords, x_coords, src_wkt,
+                                  dst_geotransform, dst_shape, dst_wkt,
+                                  method)
+        cache_file_path = path.join(cache_directory,
+                                    'regrid_weights_{0}.npz'.format(grid_hash))
+        if path.exists(cache_file_path):
+            log.debug("Loading regridding weights from {0}".format(cache_file_path))
+            with np.load(cache_file_path) as cache_file:
+                return cls(cache_file['indices'],
+                           cache_file['weights'],
+                           cache_file['src_shape'],
+                           cache_file['dst_shape'])
+
+        regrid_weights = cls.from_grids(y_coords, x_coords, src_wkt,
+                                        dst_geotransform, dst_shape, dst_wkt,
+                                        method)
+        log.debug("Writing regridding weights to {0}".format(cache_file_path))
+        regrid_weights.save(cache_file_path)
+        return regrid_weights
+
+    def save(self, out_file_path):
+        """Writes the weights to a numpy npz file.
+
+        Parameters:
+            out_file_path(str): Location of the file to generate.
+        """
+        with open(out_file_path, 'wb') as out_file:
+            np.savez(out_file,
+                     indices=self.indices,
+                     weights=self.weights,
+                     src_shape=np.array(self.src_shape),
+                     dst_shape=np.array(self.dst_shape))
+
+    def apply(self, values):
+        """Regrids the values to the GSSHA grid.
+
+        The values are regridded in blocks of time steps, so the gathered
+        source values held in memory are limited to BLOCK_VALUES.
+
+        Parameters:
+            values(:obj:`numpy.ndarray`): Values with the source grid as the last two dimensions (Ex. time, y, x).
+
+        Returns:
+            :obj:`numpy.ndarray`: Values with the GSSHA grid as the last two dimensions. Cells outside of the source grid are NaN.
+        """
+        values = np.asarray(values)
+        if values.shape[-2:] != self.src_shape:
+            raise ValueError("Grid shape {0} does not match the source grid shape {1}."
+                             .format(values.shape[-2:], self.src_shape))
+        leading_shape = values.shape[:-2]
+        flat_values = values.reshape((-1, values.shape[-2] * values.shape[-1]))
+        regridded = np.empty((flat_values.shape[0], self.indices.shape[0]),
+                             dtype=np.result_type(values.dtype, self.weights.dtype))
+        block_size = max(1, self.BLOCK_VALUES // max(1, self.indices.size))
+        for block_start in range(0, flat_values.shape[0], block_size):
+            block = slice(block_start, block_start + block_size)
+            regridded[block] = np.einsum('tnk,nk->tn',
+                                         np.take(flat_values[block], self.indices, axis=1),
+                                         self.weights)
+        return regridded.reshape(leading_shape + self.dst_shape)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+#  spatial_index.py
+#  GSSHApy
+#
+#  License BSD 3-Clause
+
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+
+# ------------------------------------------------------------------------------
+# MAIN CLASS
+# ------------------------------------------------------------------------------
+class LSMGridIndex(object):
+    """This class is a sorted index over the coordinates of an LSM grid
+    to find the rows and columns within a bounding box.
+
+    Each coordinate is sorted once, so a bounding box query only looks at
+    the pixels inside of the y and x bands of the box instead of comparing
+    against the entire grid. The indices of the most recently used LSM grids
+    are kept in memory (see CACHE_SIZE), so subsetting many watersheds
+    against the same LSM grid builds the index only once. The indices are
+    looked up by the source of the LSM grid (Ex. the path of the LSM files)
+    and the shape, first and last values of the coordinates.
+
+    Attributes:
+        shape(:obj:`tuple`): Shape (y, x) of the LSM grid.
+
+    Example::
+
+        from gsshapy.grid.spatial_index import LSMGridIndex
+
+        lsm_grid_index = LSMGridIndex.from_coords(y_coords, x_coords,
+                                                  source='E:/GSSHA/lsm-data/*.nc')
+        yslice, xslice = lsm_grid_index.subset_slices(y_min, y_max, x_min, x_max)
+
+    """
+    # number of LSM grid indices kept in memory
+    CACHE_SIZE = 4
+    _cache = OrderedDict()
+    _cache_lock = Lock()
+
+    def __init__(self, y_coords, x_coords):
+        """
+        Initializer function for the LSMGridIndex class
+        """
+        y_coords = np.asarray(y_coords)
+        x_coords = np.asarray(x_coords)
+        self.shape = y_coords.shape
+        self.y_order = np.argsort(y_coords, axis=None, kind='mergesort')
+        self.y_sorted = y_coords.ravel()[self.y_order]
+        self.x_order = np.argsort(x_coords, axis=None, kind='mergesort')
+        self.x_sorted = x_coords.ravel()[self.x_order]
+
+    @staticmethod
+    def grid_key(y_coords, x_coords, source=None):
+        """Returns the key of the LSM grid in the cache.
+
+        The key only uses the shape, first and last values of the
+        coordinates, so it is cheap to compute for large grids.
+        Grids from different sources need a different source.
+
+        Parameters:
+            y_coords(:obj:`numpy.ndarray`): 2D y coordinates of the LSM grid.
+            x_coords(:obj:`numpy.ndarray`): 2D x coordinates of the LSM grid.
+            source(Optional[str]): Source of the LSM grid (Ex. the path of the LSM files).
+
+        Returns:
+            tuple: Key of the LSM grid.
+        """
+        y_coords = np.asarray(y_coords)
+        x_coords = np.asarray(x_coords)
+        return (source, y_coords.shape, x_coords.shape,
+                float(y_coords.flat[0]), float(y_coords.flat[-1]),
+                float(x_coords.flat[0]), float(x_coords.flat[-1]))
+
+    @classmethod
+    def from_coords(cls, y_coords, x_coords, source=None):
+        """Returns the index of the LSM grid, building it if it is not cached.
+
+        Parameters:
+            y_coords(:obj:`numpy.ndarray`): 2D y coordinates of the LSM grid.
+            x_coords(:obj:`numpy.ndarray`): 2D x coordinates of the LSM grid.
+            source(Optional[str]): Source of the LSM grid (Ex. the path of the LSM files).
+
+        Returns:
+            :func:`LSMGridIndex`
+        """
+        key = cls.grid_key(y_coords, x_coords, source)
+        with cls._cache_lock:
+            lsm_grid_index = cls._cache.pop(key, None)
+            if lsm_grid_index is None:
+                lsm_grid_index = cls(y_coords, x_coords)
+            # most recently used last
+            cls._cache[key] = lsm_grid_index
+            while len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return lsm_grid_index
+
+    def _band_masks(self, sorted_coords, order, min_coord, max_coord):
+        """
+        This function returns the masks of the rows and
+        columns with pixels inside of the coordinate band
+        """
+        start = np.searchsorted(sorted_coords, min_coord, side='left')
+        end = np.searchsorted(sorted_coords, max_coord, side='right')
+        band_rows, band_cols = np.unravel_index(order[start:end], self.shape)
+        row_mask = np.zeros(self.shape[0], dtype=bool)
+        row_mask[band_rows] = True
+        col_mask = np.zeros(self.shape[1], dtype=bool)
+        col_mask[band_cols] = True
+        return row_mask, col_mask
+
+    def subset_slices(self, y_min, y_max, x_min, x_max):
+        """Returns the slices of the LSM grid within the bounding box.
+
+        The rows are the rows with pixels in both the y and x bands
+        of the bounding box and the same for the columns.
+
+        Parameters:
+            y_min(float): Minimum y coordinate of the bounding box.
+            y_max(float): Maximum y coordinate of the bounding box.
+            x_min(float): Minimum x coordinate of the bounding box.
+            x_max(float): Maximum x coordinate of the bounding box.
+
+        Returns:
+            tuple: The slices (y, x) of the LSM grid.
+        """
+        y_band_rows, y_band_cols = self._band_masks(self.y_sorted, self.y_order,
+                                                    y_min, y_max)
+        x_band_rows, x_band_cols = self._band_masks(self.x_sorted, self.x_order,
+                                                    x_min, x_max)
+        lsm_y_indices = np.flatnonzero(y_band_rows & x_band_rows)
+        lsm_x_indices = np.flatnonzero(y_band_cols & x_band_cols)
+
+        return (slice(np.amin(lsm_y_indices), np.amax(lsm_y_indices)+1),
+                slice(np.amin(lsm_x_indices), np.amax(lsm_x_indices)+1))
@@ -9,6 +9,9 @@
 NOTE: This script was found at code.activestate.com/recipes/334695
 """
 
+from collections import OrderedDict
+
+from future.utils import iteritems
 from past.builtins import xrange
 
 def pivot(table, left, top, value):
@@ -46,50 +49,40 @@ def pivot(table, left, top, value):
 
     newList = pivot(listOfDicts, ('Name',), ('Year',), 'Value')
 
+    The row and column headings are tracked with dictionaries instead of
+    lists, so the function runs in linear time with respect to the number of
+    records. Rows are ordered by their first appearance in the table.
     """
-    rs = {}
-    ysort = []
-    xsort = []
+    rs = OrderedDict()
+    xsort = OrderedDict()
     for row in table:
         yaxis = tuple([row[c] for c in left])       # e.g. yaxis = ('Simon',)
-        if yaxis not in ysort: ysort.append(yaxis)
         xaxis = tuple([row[c] for c in top])        # e.g. xaxis = ('2004',)
-        if xaxis not in xsort: xsort.append(xaxis)
+        xsort[xaxis] = None
+
         try:
-            rs[yaxis]
+            cells = rs[yaxis]
         except KeyError:
-            rs[yaxis] = {}
-        if xaxis not in rs[yaxis]:
-            rs[yaxis][xaxis] = 0
-        rs[yaxis][xaxis] += row[value]
+            cells = rs[yaxis] = {}
+
+        cells[xaxis] = cells.get(xaxis, 0) + row[value]
 
     """
-    In the following loop we take care of missing data,
-    e.g 'Eric' has a value in 2004 but not in 2005
+    The column headings are sorted once for all rows, so even if the field
+    'top' is unordered, data will be transposed correctly. Cells that are
+    missing from a row, e.g 'Eric' has a value in 2004 but not in 2005, are
+    filled with an empty string.
     """
-    for key in rs:
-        if len(rs[key]) - len(xsort):
-            for var in xsort:
-                if var not in rs[key].keys():
-                    rs[key][var] = ''
+    sortedkeys = sorted(xsort)
 
     headings = list(left)
-    headings.extend(xsort)
+    headings.extend(sortedkeys)
 
     t = []
-
-    """
-    The lists 'sortedkeys' and 'sortedvalues' make sure that
-     even if the field 'top' is unordered, data will be transposed correctly.
-    E.g. in the example above the table rows are not ordered by the year
-    """
-
-    for left in ysort:
+    for left, cells in iteritems(rs):
         row = list(left)
-        sortedkeys = sorted(rs[left].keys())
-        sortedvalues = map(rs[left].get, sortedkeys)
-        row.extend(sortedvalues)
-        t.append(dict(zip(headings,row)))
+        row.extend([cells.get(key, '') for key in sortedkeys])
+        t.append(dict(zip(headings, row)))
 
     return t
 
@@ -8,6 +8,7 @@
 ********************************************************************************
 """
 from future.utils import iteritems
+import numpy as np
 
 from . import parsetools as pt
 
@@ -68,7 +69,8 @@ def datasetHeaderChunk(key, lines):
 
 def datasetScalarTimeStepChunk(lines, numberColumns, numberCells):
     """
-    Process the time step chunks for scalar datasets
+    Process the time step chunks for scalar datasets. The cell values are returned as a 2-D numpy array
+    (cellArray) along with the original text of the values (rasterText).
     """
     END_DATASET_TAG = 'ENDDS'
 
@@ -79,48 +81,32 @@ def datasetScalarTimeStepChunk(lines, numberColumns, numberCells):
               'rasterText': None}
 
     # Split the chunks
-    timeStep = pt.splitLine(lines.pop(0))
+    timeStep = pt.splitLine(lines[0])
 
     # Extract cells, ignoring the status indicators
-    startCellsIndex = numberCells
+    startCellsIndex = numberCells + 1
 
     # Handle case when status cells are not included (istat = 0)
     iStatus = int(timeStep[1])
 
     if iStatus == 0:
-        startCellsIndex = 0
+        startCellsIndex = 1
 
     # Strip off ending dataset tag
-    if END_DATASET_TAG in lines[-1]:
-        lines.pop(-1)
-
-    # Assemble the array string
-    arrayString = '[['
-    columnCounter = 1
-    lenLines = len(lines) - 1
-
-    # Also assemble raster text field to preserve for spatial datasets
-    rasterText = ''
-
-    for index in range(startCellsIndex, len(lines)):
-        # Check columns condition
-        if columnCounter % numberColumns != 0 and index != lenLines:
-            arrayString += lines[index].strip() + ', '
-        elif columnCounter % numberColumns == 0 and index != lenLines:
-            arrayString += lines[index].strip() + '], ['
-        elif index == lenLines:
-            arrayString += lines[index].strip() + ']]'
+    endCellsIndex = len(lines)
 
-        # Advance counter
-        columnCounter += 1
+    if END_DATASET_TAG in lines[-1]:
+        endCellsIndex -= 1
 
-        rasterText += lines[index]
+    # Preserve raster text field for non-spatial datasets
+    rasterText = ''.join(lines[startCellsIndex:endCellsIndex])
 
-    # Get Value Array
-    result['cellArray'] = arrayString
-    result['rasterText'] = rasterText
+    # Parse all values at once and arrange them in rows
+    cellArray = np.fromstring(rasterText, dtype=np.float64, sep=' ')
 
     # Assign Result
+    result['cellArray'] = cellArray.reshape(-1, numberColumns)
+    result['rasterText'] = rasterText
     result['iStatus'] = iStatus
     result['timestamp'] = float(timeStep[2])
 
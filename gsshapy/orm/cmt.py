@@ -480,14 +480,24 @@ class MapTableFile(DeclarativeBase, GsshaPyFileObjectBase):
         required by the mapping table file. This function returns a list of strings that can be printed to the file
         directly.
         """
-        # Retrieve the indices for the current mapping table and mapping table file
-        indexes = session.query(MTIndex). \
+        # Retrieve all values for the current mapping table and mapping table file in a single query
+        valueRecords = session.query(MTIndex, MTValue). \
             join(MTValue.index). \
             filter(MTValue.mapTable == mapTable). \
             filter(MTValue.contaminant == contaminant). \
-            order_by(MTIndex.index). \
+            order_by(MTIndex.index, MTIndex.id, MTValue.id). \
             all()
 
+        # Pivot the values by index and layer
+        indexes = []
+        indexValues = {}
+        for idx, val in valueRecords:
+            if idx.id not in indexValues:
+                indexes.append(idx)
+                indexValues[idx.id] = {}
+
+            indexValues[idx.id].setdefault(val.layer_id, []).append(val)
+
         # determine number of layers
         layer_indices = [0]
         if mapTable.name in ('MULTI_LAYER_SOIL', 'RICHARDS_EQN_INFILTRATION_BROOKS'):
@@ -503,15 +513,9 @@ class MapTableFile(DeclarativeBase, GsshaPyFileObjectBase):
         for idx in indexes:
             for layer_index in layer_indices:
                 # Retrieve values for the current index
-                values = session.query(MTValue). \
-                         filter(MTValue.mapTable == mapTable). \
-                         filter(MTValue.contaminant == contaminant). \
-                         filter(MTValue.index == idx). \
-                         filter(MTValue.layer_id == layer_index). \
-                         order_by(MTValue.id). \
-                         all()
-
-                # NOTE: The second order_by modifier in the query above handles the special ordering of XSEDIMENT columns
+                values = indexValues[idx.id].get(layer_index, [])
+
+                # NOTE: Ordering the values by id in the query above handles the special ordering of XSEDIMENT columns
                 # in soil erosion properties table (i.e. these columns must be in the same order as the sediments in the
                 # sediments table. Accomplished by using the sedimentID field). Similarly, the contaminant filter is only
                 # used in the case of the contaminant transport table. Values that don't belong to a contaminant will have
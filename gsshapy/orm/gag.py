@@ -15,13 +15,16 @@ __all__ = ['PrecipFile',
            'PrecipGage']
 
 from future.utils import iteritems
+from io import BytesIO
+
+import numpy as np
 from sqlalchemy import ForeignKey, Column, Table
-from sqlalchemy.types import Integer, DateTime, String, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy.types import Integer, DateTime, String, Float, LargeBinary
+from sqlalchemy.orm import relationship, object_session
 
 from . import DeclarativeBase
 from ..base.file_base import GsshaPyFileObjectBase
-from ..lib import pivot, parsetools as pt, gag_chunk as gak
+from ..lib import parsetools as pt, gag_chunk as gak
 
 
 gag_assoc_event_gage = Table('gag_assoc_event_gage', DeclarativeBase.metadata,
@@ -37,6 +40,10 @@ class PrecipFile(DeclarativeBase, GsshaPyFileObjectBase):
     :class:`.PrecipValue`, and :class:`.PrecipGage`. One precipitation file can consist of multiple events and each event
     can have several gages and a time series of values for each gage.
 
+    The values of each event can optionally be stored as a ``(periods, gages)`` array on the :class:`.PrecipEvent`
+    instead of as :class:`.PrecipValue` objects by reading with ``storeArray=True``. This is much faster to read and
+    write for events with many gages, such as those generated from gridded data.
+
     See: http://www.gsshawiki.com/Precipitation:Spatially_and_Temporally_Varied_Precipitation
     """
     __tablename__ = 'gag_precipitation_files'
@@ -59,13 +66,11 @@ class PrecipFile(DeclarativeBase, GsshaPyFileObjectBase):
         """
         GsshaPyFileObjectBase.__init__(self)
 
-    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, replaceParamFile):
+    @staticmethod
+    def _parse(path):
         """
-        Precipitation Read from File Method
+        Precipitation Parse Method
         """
-        # Set file extension property
-        self.fileExtension = extension
-
         # Dictionary of keywords/cards and parse function names
         KEYWORDS = ('EVENT',)
 
@@ -74,11 +79,31 @@ class PrecipFile(DeclarativeBase, GsshaPyFileObjectBase):
             chunks = pt.chunk(KEYWORDS, f)
 
         # Parse chunks associated with each key
+        results = []
         for key, chunkList in iteritems(chunks):
             # Parse each chunk in the chunk list
             for chunk in chunkList:
-                result = gak.eventChunk(key, chunk)
-                self._createGsshaPyObjects(result)
+                results.append(gak.eventChunk(key, chunk))
+
+        return results
+
+    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, replaceParamFile,
+              parsed=None, storeArray=False):
+        """
+        Precipitation Read from File Method
+
+        When storeArray is True, the values of each event are stored as arrays in the valueArrays column of the event
+        instead of as PrecipValue objects.
+        """
+        # Set file extension property
+        self.fileExtension = extension
+
+        # Parse file unless it has been parsed ahead of time
+        if parsed is None:
+            parsed = self._parse(path)
+
+        for result in parsed:
+            self._createGsshaPyObjects(result, storeArray)
 
         # Add this PrecipFile to the database session
         session.add(self)
@@ -95,24 +120,8 @@ class PrecipFile(DeclarativeBase, GsshaPyFileObjectBase):
             openFile.write('EVENT "%s"\nNRGAG %s\nNRPDS %s\n' % (event.description, event.nrGag, event.nrPds))
 
             if event.nrGag > 0:
-                values = event.values
-
-                valList = []
-
-                # Convert PrecipValue objects into a list of dictionaries, valList,
-                # so that it is compatible with the pivot function.
-                for value in values:
-                    valList.append({'ValueType': value.valueType,
-                                    'DateTime': value.dateTime,
-                                    'Gage': value.gage.id,
-                                    'Value': value.value})
-
-                # Pivot using the function found at:
-                # code.activestate.com/recipes/334695
-                pivotedValues = pivot.pivot(valList, ('DateTime', 'ValueType'), ('Gage',), 'Value')
-
-                ## TODO: Create custom pivot function that can work with sqlalchemy
-                ## objects explicitly without the costly conversion.
+                # Retrieve the values of the event as a (periods, gages) array
+                arrays = event._getArrays()
 
                 # Create an empty set for obtaining a list of unique gages
                 gages = session.query(PrecipGage). \
@@ -124,30 +133,29 @@ class PrecipFile(DeclarativeBase, GsshaPyFileObjectBase):
                     openFile.write('COORD %s %s "%s"\n' % (gage.x, gage.y, gage.description))
 
                 # Write the value rows out to file
-                for row in pivotedValues:
-                    # Extract the PrecipValues
-                    valString = ''
-
-                    # Retreive a list of sorted keys. This assumes the values are
-                    # read into the database in order
-                    keys = sorted([key for key in row if key != 'DateTime' and key != 'ValueType'])
-
-                    # String all of the values together into valString
-                    for key in keys:
-                        if key != 'DateTime' and key != 'ValueType':
-                            valString = '%s %.3f' % (valString, row[key])
-
-                    # Write value line to file with appropriate formatting
-                    openFile.write('%s %.4d %.2d %.2d %.2d %.2d%s\n' % (
-                        row['ValueType'],
-                        row['DateTime'].year,
-                        row['DateTime'].month,
-                        row['DateTime'].day,
-                        row['DateTime'].hour,
-                        row['DateTime'].minute,
-                        valString))
-
-    def _createGsshaPyObjects(self, eventChunk):
+                self._writeValueRows(openFile, arrays)
+
+    def _writeValueRows(self, openFile, arrays):
+        """
+        Write the value rows of an event with a single format operation per row
+        """
+        values = arrays['value']
+        valueFormat = ' %.3f' * values.shape[1]
+
+        for valueType, dateTime, row in zip(arrays['valueType'].tolist(),
+                                            arrays['dateTime'].astype(object).tolist(),
+                                            values.tolist()):
+            # Write value line to file with appropriate formatting
+            openFile.write('%s %.4d %.2d %.2d %.2d %.2d%s\n' % (
+                valueType,
+                dateTime.year,
+                dateTime.month,
+                dateTime.day,
+                dateTime.hour,
+                dateTime.minute,
+                valueFormat % tuple(row)))
+
+    def _createGsshaPyObjects(self, eventChunk, storeArray=False):
         """
         Create GSSHAPY PrecipEvent, PrecipValue, and PrecipGage Objects Method
         """
@@ -174,6 +182,14 @@ class PrecipFile(DeclarativeBase, GsshaPyFileObjectBase):
             # Append to gages list for association with PrecipValues
             gages.append(gage)
 
+        if storeArray:
+            valLines = eventChunk['valLines']
+            event._setArrays(valueTypes=[valLine['type'] for valLine in valLines],
+                             dateTimes=[valLine['dateTime'] for valLine in valLines],
+                             values=[valLine['values'] for valLine in valLines],
+                             numGages=len(gages))
+            return
+
         for valLine in eventChunk['valLines']:
             for index, value in enumerate(valLine['values']):
                 # Create GSSHAPY PrecipValue object
@@ -202,6 +218,7 @@ class PrecipEvent(DeclarativeBase):
     description = Column(String)  #: STRING
     nrGag = Column(Integer)  #: INTEGER
     nrPds = Column(Integer)  #: INTEGER
+    valueArrays = Column(LargeBinary)  #: BINARY
 
     # Relationship Properties
     values = relationship('PrecipValue', back_populates='event')  #: RELATIONSHIP
@@ -220,6 +237,86 @@ class PrecipEvent(DeclarativeBase):
     def __repr__(self):
         return '<PrecipEvent: Description=%s, NumGages=%s, NumPeriods=%s>' % (self.description, self.nrGag, self.nrPds)
 
+    def as_array(self, field='value'):
+        """
+        Return the values of the event as a dense array with a row for each period and a column for each gage. The
+        gages are ordered as they appear in the precipitation file.
+
+        Args:
+            field (str, optional): Either 'value', 'dateTime', or 'valueType'. The 'dateTime' and 'valueType' fields
+                are one dimensional arrays with the date time and value type (e.g. 'GAGES' or 'RADAR') of each period.
+                Defaults to 'value'.
+
+        Returns:
+            numpy.ndarray: Array of shape (number of periods, number of gages) for the 'value' field.
+        """
+        if field not in ('value', 'dateTime', 'valueType'):
+            raise ValueError("Invalid field '{0}'. Must be 'value', 'dateTime', or 'valueType'.".format(field))
+
+        return self._getArrays()[field]
+
+    def _getArrays(self):
+        """
+        Retrieve the arrays of the event from the valueArrays column or from the PrecipValue objects of the event
+        """
+        if self.valueArrays is not None:
+            with np.load(BytesIO(self.valueArrays)) as npz:
+                return dict(npz)
+
+        session = object_session(self)
+
+        if session is not None and self.id is not None:
+            # Retrieve the columns needed without loading PrecipValue objects
+            records = session.query(PrecipValue.valueType,
+                                    PrecipValue.dateTime,
+                                    PrecipValue.coordID,
+                                    PrecipValue.value). \
+                filter(PrecipValue.eventID == self.id). \
+                order_by(PrecipValue.id). \
+                all()
+        else:
+            gagePositions = dict((id(gage), position) for position, gage in enumerate(self.gages))
+            records = [(value.valueType, value.dateTime, gagePositions[id(value.gage)], value.value)
+                       for value in self.values]
+
+        # Periods are ordered by first appearance and gages by id
+        periods = {}
+        gages = {}
+        for valueType, dateTime, gage, value in records:
+            periods.setdefault((dateTime, valueType), len(periods))
+            gages[gage] = None
+
+        gageColumns = dict((gage, column) for column, gage in enumerate(sorted(gages)))
+        values = np.full((len(periods), len(gageColumns)), np.nan)
+
+        for valueType, dateTime, gage, value in records:
+            values[periods[(dateTime, valueType)], gageColumns[gage]] = value
+
+        periodKeys = sorted(periods, key=periods.get)
+
+        return self._createArrays(valueTypes=[valueType for dateTime, valueType in periodKeys],
+                                  dateTimes=[dateTime for dateTime, valueType in periodKeys],
+                                  values=values,
+                                  numGages=len(gageColumns))
+
+    def _setArrays(self, valueTypes, dateTimes, values, numGages):
+        """
+        Serialize the arrays into the valueArrays column
+        """
+        arrays = self._createArrays(valueTypes, dateTimes, values, numGages)
+        buf = BytesIO()
+        np.savez(buf, **arrays)
+        self.valueArrays = buf.getvalue()
+
+    @staticmethod
+    def _createArrays(valueTypes, dateTimes, values, numGages):
+        """
+        Convert lists of value types, date times and values per period to arrays
+        """
+        return {'valueType': np.array(valueTypes, dtype='U'),
+                'dateTime': np.array(dateTimes, dtype='datetime64[m]'),
+                'value': np.array(values, dtype=np.float64).reshape(len(dateTimes), numGages)}
+
 
 class PrecipValue(DeclarativeBase):
     """
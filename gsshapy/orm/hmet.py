@@ -11,11 +11,11 @@ from __future__ import unicode_literals
 
 __all__ = ['HmetFile', 'HmetRecord']
 
-from datetime import datetime
-
+import numpy as np
+import pandas as pd
 from sqlalchemy import ForeignKey, Column
 from sqlalchemy.types import Integer, Float, DateTime, String
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, object_session
 
 from . import DeclarativeBase
 from ..base.file_base import GsshaPyFileObjectBase
@@ -28,6 +28,8 @@ class HmetFile(DeclarativeBase, GsshaPyFileObjectBase):
     An HMET file contains time series hydrometeorological parameters that are required to perform long term simulations.
     GSSHAPY currently only supports the HMET WES file format.
 
+    The records can be retrieved as a pandas DataFrame indexed by date time with :meth:`to_dataframe`.
+
     See: http://www.gsshawiki.com/Continuous:Hydrometeorological_Data
     """
     __tablename__ = 'hmet_files'
@@ -44,6 +46,10 @@ class HmetFile(DeclarativeBase, GsshaPyFileObjectBase):
     hmetRecords = relationship('HmetRecord', back_populates='hmetFile')  #: RELATIONSHIP
     projectFile = relationship('ProjectFile', uselist=False, back_populates='hmetFile')  #: RELATIONSHIP
 
+    # Value columns of the HMET WES format in the order they appear in the file
+    VALUE_COLUMNS = ('barometricPress', 'relHumidity', 'totalSkyCover', 'windSpeed', 'dryBulbTemp', 'directRad',
+                     'globalRad')
+
     def __init__(self):
         """
         Constructor
@@ -53,59 +59,112 @@ class HmetFile(DeclarativeBase, GsshaPyFileObjectBase):
     def __repr__(self):
         return '<HmetFile: NumRecords=%s>' % (len(self.hmetRecords))
 
-    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, replaceParamFile):
+    def to_dataframe(self):
+        """
+        Return the HMET records as a pandas DataFrame indexed by date time with a column for each value.
+
+        Returns:
+            pandas.DataFrame
+        """
+        session = object_session(self)
+
+        if session is not None and self.id is not None:
+            # Retrieve the columns needed without loading HmetRecord objects
+            records = session.query(HmetRecord.hmetDateTime,
+                                    *[getattr(HmetRecord, column) for column in self.VALUE_COLUMNS]). \
+                filter(HmetRecord.hmetConfigID == self.id). \
+                order_by(HmetRecord.id). \
+                all()
+        else:
+            records = [[record.hmetDateTime] + [getattr(record, column) for column in self.VALUE_COLUMNS]
+                       for record in self.hmetRecords]
+
+        df = pd.DataFrame.from_records(records, columns=('hmetDateTime',) + self.VALUE_COLUMNS)
+        df = df.set_index(pd.DatetimeIndex(df.pop('hmetDateTime'), name='hmetDateTime'))
+
+        return df.astype(np.float64)
+
+    @classmethod
+    def _parse(cls, path):
+        """
+        Parse the records of an HMET WES file into a DataFrame indexed by date time. Lines that are not valid records
+        are skipped.
+        """
+        dateColumns = ('year', 'month', 'day', 'hour')
+        names = dateColumns + cls.VALUE_COLUMNS
+
+        try:
+            df = pd.read_csv(path, sep=r'\s+', header=None, names=names, usecols=names, index_col=False, dtype=str)
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame(columns=names, dtype=str)
+
+        df = df.apply(pd.to_numeric, errors='coerce')
+        df['hmetDateTime'] = pd.to_datetime(df.loc[:, dateColumns], errors='coerce')
+        df = df.dropna()
+
+        return df.set_index(pd.DatetimeIndex(df['hmetDateTime'], name='hmetDateTime')).loc[:, cls.VALUE_COLUMNS]
+
+    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, replaceParamFile,
+              parsed=None, bulkInsert=True):
         """
         Read HMET WES from File Method
+
+        By default the records are inserted with an executemany statement and loaded through hmetRecords when they
+        are accessed. Pass bulkInsert=False to instantiate an HmetRecord object for every line instead, which is
+        several times slower on long files.
         """
         # Set file extension property
         self.fileExtension = extension
 
-        # Open file and parse into HmetRecords
-        with open(path, 'r') as hmetFile:
+        # Parse file unless it has been parsed ahead of time
+        df = parsed if parsed is not None else self._parse(path)
 
-            for line in hmetFile:
-                sline = line.strip().split()
+        dateTimes = df.index.to_pydatetime()
+        values = [df[column].tolist() for column in self.VALUE_COLUMNS]
 
-                try:
-                    # Extract data time from record
-                    dateTime = datetime(int(sline[0]), int(sline[1]), int(sline[2]), int(sline[3]))
+        if bulkInsert:
+            # Flush to obtain the id of this file
+            session.flush()
 
-                    # Intitialize GSSHAPY HmetRecord object
-                    hmetRecord = HmetRecord(hmetDateTime=dateTime,
-                                            barometricPress=sline[4],
-                                            relHumidity=sline[5],
-                                            totalSkyCover=sline[6],
-                                            windSpeed=sline[7],
-                                            dryBulbTemp=sline[8],
-                                            directRad=sline[9],
-                                            globalRad=sline[10])
+            rows = [dict(zip(self.VALUE_COLUMNS, recordValues), hmetDateTime=dateTime, hmetConfigID=self.id)
+                    for dateTime, recordValues in zip(dateTimes, zip(*values))]
+            session.bulk_insert_mappings(HmetRecord, rows)
 
-                    # Associate HmetRecord with HmetFile
-                    hmetRecord.hmetFile = self
+            # Relationships loaded before the insert are stale
+            session.expire(self, ['hmetRecords'])
+            return
 
-                except:
-                    pass
+        for dateTime, recordValues in zip(dateTimes, zip(*values)):
+            # Intitialize GSSHAPY HmetRecord object
+            hmetRecord = HmetRecord(dateTime, *recordValues)
+
+            # Associate HmetRecord with HmetFile
+            hmetRecord.hmetFile = self
 
     def _write(self, session, openFile, replaceParamFile):
         """
         Write HMET WES to File Method
         """
         ## TODO: Ensure Other HMET Formats are supported
-        hmetRecords = self.hmetRecords
-
-        for record in hmetRecords:
-            openFile.write('%s\t%s\t%s\t%s\t%.3f\t%s\t%s\t%s\t%s\t%.2f\t%.2f\n' % (
-                record.hmetDateTime.year,
-                record.hmetDateTime.month,
-                record.hmetDateTime.day,
-                record.hmetDateTime.hour,
-                record.barometricPress,
-                record.relHumidity,
-                record.totalSkyCover,
-                record.windSpeed,
-                record.dryBulbTemp,
-                record.directRad,
-                record.globalRad))
+        df = self.to_dataframe()
+
+        columns = [df.index.year.tolist(),
+                   df.index.month.tolist(),
+                   df.index.day.tolist(),
+                   df.index.hour.tolist()]
+
+        for column in self.VALUE_COLUMNS:
+            values = df[column].tolist()
+
+            # Whole numbers of the integer columns are written without a decimal point
+            if HmetRecord.__table__.c[column].type.python_type is int:
+                values = [int(value) if value.is_integer() else value for value in values]
+
+            columns.append(values)
+
+        lineFormat = '%s\t%s\t%s\t%s\t%.3f\t%s\t%s\t%s\t%s\t%.2f\t%.2f\n'
+
+        openFile.write(''.join(lineFormat % record for record in zip(*columns)))
 
 
 class HmetRecord(DeclarativeBase):
@@ -17,10 +17,15 @@ __all__ = ['LinkNodeDatasetFile',
 import xml.etree.ElementTree as ET
 from datetime import timedelta, datetime
 from future.utils import iteritems
+from io import BytesIO
 import logging
+import time
 
-from sqlalchemy import Column, ForeignKey, func
-from sqlalchemy.types import Integer, String, Float
+import numpy as np
+import pandas as pd
+import xarray as xr
+from sqlalchemy import Column, ForeignKey, func, text
+from sqlalchemy.types import Integer, String, Float, LargeBinary
 from sqlalchemy.orm import relationship
 
 from mapkit.GeometryConverter import GeometryConverter
@@ -42,6 +47,11 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
     supporting objects including: :class:`.LinkNodeTimeStep`, :class:`.LinkDataset`, and :class:`.NodeDataset`.
 
     Note: The link node dataset must be linked with the channel input file to generate spatial visualizations.
+
+    Alternatively, the values can be stored as dense ``(time step, node)`` arrays in a single binary column by reading
+    with ``storeArray=True``. In this mode no supporting objects are created and the values are accessed with
+    :meth:`as_array`, :meth:`as_xarray` and :meth:`as_dataframe`. The KML visualization requires the supporting
+    objects and is not available for files stored as arrays.
     """
     __tablename__ = 'lnd_link_node_dataset_files'
 
@@ -59,6 +69,7 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
     timeStepInterval = Column(Integer)  #: INTEGER
     numTimeSteps = Column(Integer)  #: INTEGER
     startTime = Column(String)  #: STRING
+    datasetArrays = Column(LargeBinary)  #: BINARY
 
     # Relationship Properties
     projectFile = relationship('ProjectFile', back_populates='linkNodeDatasets')  #: RELATIONSHIP
@@ -67,6 +78,9 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
     linkDatasets = relationship('LinkDataset', back_populates='linkNodeDatasetFile')  #: RELATIONSHIP
     nodeDatasets = relationship('NodeDataset', back_populates='linkNodeDatasetFile')  #: RELATIONSHIP
 
+    # File Properties
+    NO_STATUS = -1
+
     def __init__(self):
         """
         Constructor
@@ -353,13 +367,235 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
 
 
 
-    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, replaceParamFile):
+    def as_array(self, field='value'):
         """
-        Link Node Dataset File Read from File Method
+        Return the link node dataset as a dense array with a row for each time step and a column for each node.
+
+        Links without nodes (number of node datasets of 0 or -1) occupy a single column.
+
+        Args:
+            field (str, optional): Either 'value' or 'status'. Node datasets without a status are given a status of
+                NO_STATUS. Defaults to 'value'.
+
+        Returns:
+            numpy.ndarray: Array of shape (number of time steps, number of nodes).
         """
-        # Set file extension property
-        self.fileExtension = extension
+        if field not in ('value', 'status'):
+            raise ValueError("Invalid field '{0}'. Must be 'value' or 'status'.".format(field))
+
+        return self._getArrays()[field]
+
+    def as_xarray(self):
+        """
+        Return the link node dataset as an xarray Dataset with value and status variables on (time_step, node)
+        dimensions. The link number and node number of each column are included as coordinates.
+
+        Returns:
+            xarray.Dataset
+        """
+        arrays = self._getArrays()
+        links, nodes = self._nodeCoordinates(arrays['numNodeDatasets'])
+
+        return xr.Dataset({'value': (('time_step', 'node'), arrays['value']),
+                           'status': (('time_step', 'node'), arrays['status'])},
+                          coords={'time_step': arrays['timeStep'],
+                                  'link': ('node', links),
+                                  'link_node': ('node', nodes)},
+                          attrs={'name': self.name,
+                                 'time_step_interval': self.timeStepInterval,
+                                 'start_time': self.startTime})
+
+    def as_dataframe(self):
+        """
+        Return the link node dataset values as a pandas DataFrame indexed by time step with a (link, node) column for
+        each node.
+
+        Returns:
+            pandas.DataFrame
+        """
+        arrays = self._getArrays()
+        links, nodes = self._nodeCoordinates(arrays['numNodeDatasets'])
+
+        return pd.DataFrame(arrays['value'],
+                            index=pd.Index(arrays['timeStep'], name='time_step'),
+                            columns=pd.MultiIndex.from_arrays([links, nodes], names=['link', 'node']))
+
+    @classmethod
+    def iter_timesteps(cls, path, follow=False, poll_interval=1.0, timeout=None):
+        """
+        Read a link node dataset file one time step at a time without using the database.
+
+        Only the time step being parsed is held in memory, so this can be used to process very long outputs or to
+        tail the output of a running simulation with follow=True.
+
+        Args:
+            path (str): Path to the link node dataset file (e.g.: 'example.cdp').
+            follow (bool, optional): If True, wait for the file to grow when the end of the file is reached until all
+                NUM_TS time steps have been read. Defaults to False.
+            poll_interval (float, optional): Seconds to wait between checks for new output when following. Defaults
+                to 1.0.
+            timeout (float, optional): Stop following when no new output has been written for this many seconds.
+                Defaults to None (wait indefinitely).
+
+        Yields:
+            dict: Dictionary with the keys 'timeStep' (int), 'numNodeDatasets', 'value' and 'status' (numpy arrays
+            with an entry for each link or node, as in :meth:`as_array`).
+        """
+        with open(path, 'r') as f:
+            lines = cls._readLines(f, follow, poll_interval, timeout)
+
+            # The first line is the name of the dataset
+            if next(lines, None) is None:
+                return
+
+            header = {}
+            timeStep = None
+            linkLines = []
+            numTimeStepsRead = 0
+
+            for line in lines:
+                sline = line.split()
+
+                if not sline:
+                    continue
+
+                elif sline[0] == 'TS':
+                    timeStep = int(sline[1])
+                    linkLines = []
+
+                elif timeStep is None:
+                    header[sline[0]] = sline[1:]
+
+                else:
+                    linkLines.append(sline)
+
+                    # The time step is complete when there is a line for every link
+                    if len(linkLines) == int(header['NUM_LINKS'][0]):
+                        numNodeDatasets = []
+                        values = []
+                        statuses = []
+
+                        for spLinkLine in linkLines:
+                            numNodes, linkStatuses, linkValues = cls._parseLinkLine(spLinkLine)
+                            numNodeDatasets.append(numNodes)
+                            statuses.extend(linkStatuses)
+                            values.extend(linkValues)
+
+                        yield {'timeStep': timeStep,
+                               'numNodeDatasets': np.array(numNodeDatasets, dtype=np.int32),
+                               'value': np.array(values, dtype=np.float64),
+                               'status': np.array(statuses, dtype=np.int8)}
+
+                        timeStep = None
+                        numTimeStepsRead += 1
+
+                        if 'NUM_TS' in header and numTimeStepsRead >= int(header['NUM_TS'][0]):
+                            return
+
+    @staticmethod
+    def _readLines(openFile, follow, poll_interval, timeout):
+        """
+        Generate complete lines from an open file. When following, incomplete lines are left in the file until the
+        rest of the line has been written.
+        """
+        waited = 0.0
+
+        while True:
+            position = openFile.tell()
+            line = openFile.readline()
+
+            if line.endswith('\n') or (line and not follow):
+                waited = 0.0
+                yield line
+
+            elif not follow or (timeout is not None and waited >= timeout):
+                return
+
+            else:
+                # Wait for the rest of the output to be written
+                openFile.seek(position)
+                time.sleep(poll_interval)
+                waited += poll_interval
+
+    def _getArrays(self):
+        """
+        Retrieve the time steps, number of node datasets per link, values and statuses as arrays. Files that were not
+        read with storeArray=True are converted from the supporting objects.
+        """
+        if self.datasetArrays is not None:
+            with np.load(BytesIO(self.datasetArrays)) as npz:
+                return {key: npz[key] for key in npz.files}
+
+        timeSteps = []
+        numNodeDatasets = []
+        values = []
+        statuses = []
+
+        for timeStep in self.timeSteps:
+            timeSteps.append(timeStep.timeStep)
+            stepValues = []
+            stepStatuses = []
+
+            for linkDataset in timeStep.linkDatasets:
+                if len(timeSteps) == 1:
+                    numNodeDatasets.append(linkDataset.numNodeDatasets)
+
+                for nodeDataset in linkDataset.nodeDatasets:
+                    stepValues.append(nodeDataset.value)
+                    stepStatuses.append(self.NO_STATUS if nodeDataset.status is None else nodeDataset.status)
+
+            values.append(stepValues)
+            statuses.append(stepStatuses)
+
+        return self._createArrays(timeSteps, numNodeDatasets, values, statuses)
+
+    def _setArrays(self, timeSteps, numNodeDatasets, values, statuses):
+        """
+        Serialize the arrays into the datasetArrays column
+        """
+        arrays = self._createArrays(timeSteps, numNodeDatasets, values, statuses)
+        buf = BytesIO()
+        np.savez(buf, **arrays)
+        self.datasetArrays = buf.getvalue()
 
+    def _createArrays(self, timeSteps, numNodeDatasets, values, statuses):
+        """
+        Convert lists of time steps, number of node datasets per link, values and statuses to arrays
+        """
+        numColumns = sum(max(numNodes, 1) for numNodes in numNodeDatasets)
+
+        return {'timeStep': np.array(timeSteps, dtype=np.int32),
+                'numNodeDatasets': np.array(numNodeDatasets, dtype=np.int32),
+                'value': np.array(values, dtype=np.float64).reshape(len(timeSteps), numColumns),
+                'status': np.array(statuses, dtype=np.int8).reshape(len(timeSteps), numColumns)}
+
+    @staticmethod
+    def _nodeCoordinates(numNodeDatasets):
+        """
+        Derive the 1-based link number and node number of each column in the arrays. Links without nodes are given a
+        node number of 0.
+        """
+        links = []
+        nodes = []
+
+        for linkIndex, numNodes in enumerate(numNodeDatasets):
+            if numNodes > 0:
+                links.extend([linkIndex + 1] * numNodes)
+                nodes.extend(range(1, numNodes + 1))
+            else:
+                links.append(linkIndex + 1)
+                nodes.append(0)
+
+        return np.array(links), np.array(nodes)
+
+    @classmethod
+    def _parse(cls, path):
+        """
+        Link Node Dataset File Parse Method
+
+        The time steps are parsed into numbers here, so that the numeric parsing is done in the worker processes when
+        a project is read in parallel.
+        """
         # Dictionary of keywords/cards and parse function names
         KEYWORDS = ('NUM_LINKS',
                     'TIME_STEP',
@@ -369,9 +605,56 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
 
         # Parse file into chunks associated with keywords/cards
         with open(path, 'r') as f:
-            self.name = f.readline().strip()
+            name = f.readline().strip()
             chunks = pt.chunk(KEYWORDS, f)
 
+        timeSteps = [cls._parseTimeStep(chunk) for chunk in chunks.pop('TS', [])]
+
+        return name, chunks, timeSteps
+
+    @classmethod
+    def _parseTimeStep(cls, chunk):
+        """
+        Parse a time step chunk into the time step and a (number of node datasets, statuses, values) tuple for each
+        link. The status of links without node datasets is None.
+        """
+        links = []
+
+        for line in chunk[1:]:
+            spLinkLine = line.split()
+
+            if not spLinkLine:
+                continue
+
+            numNodes, linkStatuses, linkValues = cls._parseLinkLine(spLinkLine)
+
+            if numNodes > 0:
+                linkStatuses = [int(status) for status in linkStatuses]
+            else:
+                linkStatuses = [None]
+
+            links.append((numNodes, linkStatuses, [float(value) for value in linkValues]))
+
+        return int(chunk[0].split()[1]), links
+
+    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, replaceParamFile,
+              bulkInsert=False, storeArray=False, parsed=None):
+        """
+        Link Node Dataset File Read from File Method
+
+        When bulkInsert is True, the time steps are inserted with executemany statements instead of instantiating a
+        LinkNodeTimeStep, LinkDataset and NodeDataset object for every value. When storeArray is True, the time steps
+        are stored as arrays in the datasetArrays column instead.
+        """
+        # Set file extension property
+        self.fileExtension = extension
+
+        # Parse file unless it has been parsed ahead of time
+        if parsed is None:
+            parsed = self._parse(path)
+
+        self.name, chunks, timeSteps = parsed
+
         # Parse chunks associated with each key
         for card, chunkList in iteritems(chunks):
             # Parse each chunk in the chunk list
@@ -401,53 +684,151 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
                         schunk[5],
                         schunk[6])
 
-                elif card == 'TS':
-                    # TS handler
-                    for line in chunk:
-                        sline = line.strip().split()
-                        token = sline[0]
+        # Array storage and bulk insert handle all time steps at once
+        if storeArray:
+            self._readArrays(timeSteps)
+            return
 
-                        # Cases
-                        if token == 'TS':
-                            # Time Step line handler
-                            timeStep = LinkNodeTimeStep(timeStep=sline[1])
-                            timeStep.linkNodeDataset = self
+        elif bulkInsert:
+            self._bulkInsertTimeSteps(session, timeSteps)
+            return
 
-                        else:
-                            # Split the line
-                            spLinkLine = line.strip().split()
-
-                            # Create LinkDataset GSSHAPY object
-                            linkDataset = LinkDataset()
-                            linkDataset.numNodeDatasets = int(spLinkLine[0])
-                            linkDataset.timeStep = timeStep
-                            linkDataset.linkNodeDatasetFile = self
-
-                            # Parse line into NodeDatasets
-                            NODE_VALUE_INCREMENT = 2
-                            statusIndex = 1
-                            valueIndex = statusIndex + 1
-
-                            # Parse line into node datasets
-                            if linkDataset.numNodeDatasets > 0:
-                                for i in range(0, linkDataset.numNodeDatasets):
-                                    # Create NodeDataset GSSHAPY object
-                                    nodeDataset = NodeDataset()
-                                    nodeDataset.status = int(spLinkLine[statusIndex])
-                                    nodeDataset.value = float(spLinkLine[valueIndex])
-                                    nodeDataset.linkDataset = linkDataset
-                                    nodeDataset.linkNodeDatasetFile = self
-
-                                    # Increment to next status/value pair
-                                    statusIndex += NODE_VALUE_INCREMENT
-                                    valueIndex += NODE_VALUE_INCREMENT
-                            else:
-                                nodeDataset = NodeDataset()
-                                nodeDataset.value = float(spLinkLine[1])
-                                nodeDataset.linkDataset = linkDataset
-                                nodeDataset.linkNodeDatasetFile = self
+        for step, links in timeSteps:
+            # Time Step handler
+            timeStep = LinkNodeTimeStep(timeStep=step)
+            timeStep.linkNodeDataset = self
+
+            for numNodes, statuses, values in links:
+                # Create LinkDataset GSSHAPY object
+                linkDataset = LinkDataset()
+                linkDataset.numNodeDatasets = numNodes
+                linkDataset.timeStep = timeStep
+                linkDataset.linkNodeDatasetFile = self
+
+                # Create a NodeDataset GSSHAPY object for each status/value pair
+                for status, value in zip(statuses, values):
+                    nodeDataset = NodeDataset()
+                    nodeDataset.status = status
+                    nodeDataset.value = value
+                    nodeDataset.linkDataset = linkDataset
+                    nodeDataset.linkNodeDatasetFile = self
+
+    def _readArrays(self, timeSteps):
+        """
+        Store the parsed time steps of the file as arrays
+        """
+        steps = []
+        numNodeDatasets = None
+        values = []
+        statuses = []
+
+        for step, links in timeSteps:
+            steps.append(step)
+            stepNumNodeDatasets = []
+            stepValues = []
+            stepStatuses = []
+
+            for numNodes, linkStatuses, linkValues in links:
+                stepNumNodeDatasets.append(numNodes)
+                stepStatuses.extend(self.NO_STATUS if status is None else status for status in linkStatuses)
+                stepValues.extend(linkValues)
+
+            if numNodeDatasets is None:
+                numNodeDatasets = stepNumNodeDatasets
+            elif stepNumNodeDatasets != numNodeDatasets:
+                raise ValueError('The number of node datasets per link changes in time step {0}. The link node dataset '
+                                 'cannot be stored as an array.'.format(step))
+
+            values.append(stepValues)
+            statuses.append(stepStatuses)
+
+        self._setArrays(steps, numNodeDatasets or [], values, statuses)
+
+    @classmethod
+    def _parseLinkLine(cls, spLinkLine):
+        """
+        Parse a split link dataset line into the number of node datasets and lists of status and value strings
+        """
+        numNodes = int(spLinkLine[0])
+
+        if numNodes > 0:
+            # Status and value pairs follow the number of node datasets
+            return numNodes, spLinkLine[1:2 * numNodes + 1:2], spLinkLine[2:2 * numNodes + 2:2]
+
+        return numNodes, [cls.NO_STATUS], [spLinkLine[1]]
+
+    def _bulkInsertTimeSteps(self, session, timeSteps):
+        """
+        Insert the parsed time steps of the file using executemany statements. The time steps and link datasets need
+        their primary keys before their children are inserted. On PostgreSQL the keys are reserved from the sequences
+        up front, so the rows are inserted in bulk. On other databases each time step and link dataset is inserted on
+        its own, so that the database assigns its key and concurrent writers never share keys. The node datasets are
+        always inserted in bulk with keys assigned by the database.
+        """
+        # Flush to obtain the id of this file
+        session.flush()
+
+        timeStepIds = linkDatasetIds = None
+        if session.get_bind().dialect.name == 'postgresql':
+            numLinks = sum(len(links) for _, links in timeSteps)
+            timeStepIds = iter(self._reserveIds(session, LinkNodeTimeStep, len(timeSteps)))
+            linkDatasetIds = iter(self._reserveIds(session, LinkDataset, numLinks))
+
+        for step, links in timeSteps:
+            timeStepId, = self._insertParentRows(session, LinkNodeTimeStep, timeStepIds,
+                                                 [{'linkNodeDatasetFileID': self.id,
+                                                   'timeStep': step}])
+
+            linkDatasetIdList = self._insertParentRows(session, LinkDataset, linkDatasetIds,
+                                                       [{'timeStepID': timeStepId,
+                                                         'linkNodeDatasetFileID': self.id,
+                                                         'numNodeDatasets': numNodeDatasets}
+                                                        for numNodeDatasets, _, _ in links])
+
+            nodeDatasetRows = [{'linkDatasetID': linkDatasetId,
+                                'linkNodeDatasetFileID': self.id,
+                                'status': status,
+                                'value': value}
+                               for linkDatasetId, (_, statuses, values) in zip(linkDatasetIdList, links)
+                               for status, value in zip(statuses, values)]
+
+            # Parents are inserted before children to satisfy foreign key constraints
+            if nodeDatasetRows:
+                session.execute(NodeDataset.__table__.insert(), nodeDatasetRows)
+
+        # Relationships loaded before the insert are stale
+        session.expire(self, ['timeSteps', 'linkDatasets', 'nodeDatasets'])
+
+    @staticmethod
+    def _insertParentRows(session, table, reservedIds, rows):
+        """
+        Insert the rows and return their primary keys. With reserved keys the rows are inserted with a single
+        executemany statement, otherwise each row is inserted on its own to retrieve the key assigned by the database.
+        """
+        if reservedIds is None:
+            return [session.execute(table.__table__.insert(), row).inserted_primary_key[0] for row in rows]
+
+        for row in rows:
+            row['id'] = next(reservedIds)
+
+        if rows:
+            session.execute(table.__table__.insert(), rows)
+
+        return [row['id'] for row in rows]
 
+    @staticmethod
+    def _reserveIds(session, table, count):
+        """
+        Reserve count primary keys for the given table from its PostgreSQL sequence, so concurrent writers and later
+        inserts never reuse them.
+        """
+        if count == 0:
+            return []
 
+        result = session.execute(text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                                      "FROM generate_series(1, :count)"),
+                                 {'table': table.__tablename__, 'count': count})
+        return [row[0] for row in result]
 
     def _write(self, session, openFile, replaceParamFile):
         """
@@ -463,6 +844,10 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
         openFile.write('NUM_TS        %s\n' % self.numTimeSteps)
         openFile.write('START_TIME    %s\n' % self.startTime)
 
+        if self.datasetArrays is not None:
+            self._writeArrays(openFile)
+            return
+
         for timeStep in timeSteps:
             openFile.write('TS    %s\n' % timeStep.timeStep)
 
@@ -495,6 +880,44 @@ class LinkNodeDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
             # Insert empty line between time steps
             openFile.write('\n')
 
+    def _writeArrays(self, openFile):
+        """
+        Write the time steps from the datasetArrays column
+        """
+        arrays = self._getArrays()
+
+        # Build a line format and the column offset for each link once
+        linkFormats = []
+        offset = 0
+
+        for numNodes in arrays['numNodeDatasets']:
+            if numNodes > 0:
+                linkFormats.append((offset, numNodes, '%d   ' % numNodes + '%d  %.5f   ' * numNodes + '\n'))
+                offset += numNodes
+            elif numNodes < 0:
+                linkFormats.append((offset, numNodes, '%d   ' % numNodes + '%.5f\n'))
+                offset += 1
+            else:
+                linkFormats.append((offset, numNodes, '%d   ' % numNodes + '%.3f\n'))
+                offset += 1
+
+        for timeStep, values, statuses in zip(arrays['timeStep'], arrays['value'], arrays['status']):
+            openFile.write('TS    %s\n' % timeStep)
+
+            # Interleave status and value pairs
+            pairs = [None] * (2 * len(values))
+            pairs[0::2] = statuses.tolist()
+            pairs[1::2] = values.tolist()
+
+            for start, numNodes, lineFormat in linkFormats:
+                if numNodes > 0:
+                    openFile.write(lineFormat % tuple(pairs[2 * start:2 * (start + numNodes)]))
+                else:
+                    openFile.write(lineFormat % pairs[2 * start + 1])
+
+            # Insert empty line between time steps
+            openFile.write('\n')
+
 
 class LinkNodeTimeStep(DeclarativeBase):
     """
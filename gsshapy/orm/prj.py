@@ -14,6 +14,7 @@ __all__ = ['ProjectFile',
 
 import json
 import logging
+from multiprocessing import Pool
 import os
 import re
 import sys
@@ -29,7 +30,12 @@ from gazar.grid import GDALGrid
 from timezonefinder import TimezoneFinder
 import xml.etree.ElementTree as ET
 
-from sqlalchemy import ForeignKey, Column
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from sqlalchemy import ForeignKey, Column, event
 from sqlalchemy.types import Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
@@ -368,7 +374,7 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
 
                 new.write(rewriteLine)
 
-    def readProject(self, directory, projectFileName, session, spatial=False, spatialReferenceID=None):
+    def readProject(self, directory, projectFileName, session, spatial=False, spatialReferenceID=None, workers=None):
         """
         Read all files for a GSSHA project into the database.
 
@@ -386,6 +392,9 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             spatialReferenceID (int, optional): Integer id of spatial reference system for the model. If no id is
                 provided GsshaPy will attempt to automatically lookup the spatial reference ID. If this process fails,
                 default srid will be used (4326 for WGS 84).
+            workers (int, optional): Number of worker processes used to parse the input and output files before they are
+                read into the database. Only file types that support parsing ahead of reading are parsed by the
+                workers. Defaults to None, which reads all files sequentially.
         """
         self.project_directory = directory
         with tmp_chdir(directory):
@@ -405,11 +414,14 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             # Read in replace param file
             replaceParamFile = self._readReplacementFiles(directory, session, spatial, spatialReferenceID)
 
+            # Parse Input and Output Files in parallel
+            parsedFiles = self._parseXput(((self.INPUT_FILES, directory), (self.OUTPUT_FILES, batchDirectory)), workers)
+
             # Read Input Files
-            self._readXput(self.INPUT_FILES, directory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile)
+            self._readXput(self.INPUT_FILES, directory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile, parsedFiles=parsedFiles)
 
             # Read Output Files
-            self._readXput(self.OUTPUT_FILES, batchDirectory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile)
+            self._readXput(self.OUTPUT_FILES, batchDirectory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile, parsedFiles=parsedFiles)
 
             # Read Input Map Files
             self._readXputMaps(self.INPUT_MAPS, directory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile)
@@ -420,7 +432,7 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             # Commit to database
             self._commit(session, self.COMMIT_ERROR_MESSAGE)
 
-    def readInput(self, directory, projectFileName, session, spatial=False, spatialReferenceID=None):
+    def readInput(self, directory, projectFileName, session, spatial=False, spatialReferenceID=None, workers=None):
         """
         Read only input files for a GSSHA project into the database.
 
@@ -436,6 +448,9 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             spatialReferenceID (int, optional): Integer id of spatial reference system for the model. If no id is
                 provided GsshaPy will attempt to automatically lookup the spatial reference ID. If this process fails,
                 default srid will be used (4326 for WGS 84).
+            workers (int, optional): Number of worker processes used to parse the input files before they are
+                read into the database. Only file types that support parsing ahead of reading are parsed by the
+                workers. Defaults to None, which reads all files sequentially.
         """
         self.project_directory = directory
         with tmp_chdir(directory):
@@ -452,8 +467,11 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             # Read in replace param file
             replaceParamFile = self._readReplacementFiles(directory, session, spatial, spatialReferenceID)
 
+            # Parse Input Files in parallel
+            parsedFiles = self._parseXput(((self.INPUT_FILES, directory),), workers)
+
             # Read Input Files
-            self._readXput(self.INPUT_FILES, directory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile)
+            self._readXput(self.INPUT_FILES, directory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile, parsedFiles=parsedFiles)
 
             # Read Input Map Files
             self._readXputMaps(self.INPUT_MAPS, directory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, replaceParamFile=replaceParamFile)
@@ -461,7 +479,7 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             # Commit to database
             self._commit(session, self.COMMIT_ERROR_MESSAGE)
 
-    def readOutput(self, directory, projectFileName, session, spatial=False, spatialReferenceID=None):
+    def readOutput(self, directory, projectFileName, session, spatial=False, spatialReferenceID=None, workers=None):
         """
         Read only output files for a GSSHA project to the database.
 
@@ -477,6 +495,9 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             spatialReferenceID (int, optional): Integer id of spatial reference system for the model. If no id is
                 provided GsshaPy will attempt to automatically lookup the spatial reference ID. If this process fails,
                 default srid will be used (4326 for WGS 84).
+            workers (int, optional): Number of worker processes used to parse the output files before they are
+                read into the database. Only file types that support parsing ahead of reading are parsed by the
+                workers. Defaults to None, which reads all files sequentially.
         """
         self.project_directory = directory
         with tmp_chdir(directory):
@@ -499,8 +520,11 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
             if spatialReferenceID is None:
                 spatialReferenceID = self._automaticallyDeriveSpatialReferenceId(directory)
 
+            # Parse Output Files in parallel
+            parsedFiles = self._parseXput(((self.OUTPUT_FILES, batchDirectory),), workers)
+
             # Read Output Files
-            self._readXput(self.OUTPUT_FILES, batchDirectory, session, spatial=spatial, spatialReferenceID=spatialReferenceID)
+            self._readXput(self.OUTPUT_FILES, batchDirectory, session, spatial=spatial, spatialReferenceID=spatialReferenceID, parsedFiles=parsedFiles)
 
             # Read WMS Dataset Files
             self._readWMSDatasets(self.WMS_DATASETS, batchDirectory, session, spatial=spatial, spatialReferenceID=spatialReferenceID)
@@ -734,6 +758,14 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
 
         return files
 
+    @property
+    def cards(self):
+        """
+        Read-only mapping of the card names to the :class:`.ProjectCard` objects of the project file. Card names are
+        case-insensitive.
+        """
+        return ProjectCardView(self)
+
     def getCard(self, name):
         """
         Retrieve card object for given card name.
@@ -744,13 +776,7 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
         Returns:
             :class:`.ProjectCard` or None: Project card object. Will return None if the card is not available.
         """
-        cards = self.projectCards
-
-        for card in cards:
-            if card.name.upper() == name.upper():
-                return card
-
-        return None
+        return self._getCardIndex().get(name.upper())
 
     def setCard(self, name, value, add_quotes=False):
         """
@@ -782,6 +808,41 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
         if gssha_card is not None:
             db_session.delete(gssha_card)
             db_session.commit()
+            self._invalidateCardIndex()
+
+    def _getCardIndex(self):
+        """
+        Retrieve the index of the project cards by uppercase card name, building it if necessary
+        """
+        cardIndex = getattr(self, '_cardIndex', None)
+
+        if cardIndex is None:
+            cardIndex = {}
+
+            for card in self.projectCards:
+                # The first card with a given name takes precedence
+                cardIndex.setdefault(card.name.upper(), card)
+                card._indexProjectFile = self
+
+            self._cardIndex = cardIndex
+
+        return cardIndex
+
+    def _addToCardIndex(self, card):
+        """
+        Add a card to the index of the project cards if it has been built
+        """
+        cardIndex = getattr(self, '_cardIndex', None)
+
+        if cardIndex is not None and card.name is not None:
+            cardIndex.setdefault(card.name.upper(), card)
+            card._indexProjectFile = self
+
+    def _invalidateCardIndex(self):
+        """
+        Discard the index of the project cards so that it is rebuilt on the next access
+        """
+        self._cardIndex = None
 
     def getModelSummaryAsKml(self, session, path=None, documentName=None, withStreamNetwork=True, withNodes=False, styles={}):
         """
@@ -1445,25 +1506,73 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
 
         return batchDirectory
 
-    def _readXput(self, fileCards, directory, session, spatial=False, spatialReferenceID=4236, replaceParamFile=None):
+    def _readXput(self, fileCards, directory, session, spatial=False, spatialReferenceID=4236, replaceParamFile=None,
+                  parsedFiles=None):
         """
         GSSHAPY Project Read Files from File Method
         """
         ## NOTE: This function is dependent on the project file being read first
         # Read Input/Output Files
+        for fileIO, filename in self._getXputFiles(fileCards):
+            # Pass on the contents of files that have been parsed ahead of time
+            kwargs = {}
+            path = os.path.join(directory, filename)
+
+            if parsedFiles and path in parsedFiles:
+                kwargs['parsed'] = parsedFiles[path]
+
+            # Invoke read method on each file
+            self._invokeRead(fileIO=fileIO,
+                             directory=directory,
+                             filename=filename,
+                             session=session,
+                             spatial=spatial,
+                             spatialReferenceID=spatialReferenceID,
+                             replaceParamFile=replaceParamFile,
+                             **kwargs)
+
+    def _getXputFiles(self, fileCards):
+        """
+        Retrieve the file object class and filename of the files of the given cards in the project file
+        """
+        files = []
+
         for card in self.projectCards:
             if (card.name in fileCards) and self._noneOrNumValue(card.value) and fileCards[card.name]:
-                fileIO = fileCards[card.name]
-                filename = card.value.strip('"')
+                files.append((fileCards[card.name], card.value.strip('"')))
 
-                # Invoke read method on each file
-                self._invokeRead(fileIO=fileIO,
-                                 directory=directory,
-                                 filename=filename,
-                                 session=session,
-                                 spatial=spatial,
-                                 spatialReferenceID=spatialReferenceID,
-                                 replaceParamFile=replaceParamFile)
+        return files
+
+    def _parseXput(self, xputs, workers=None):
+        """
+        Parse the files of the given cards and directories that support it in a pool of worker processes
+
+        Returns:
+            dict: Parsed contents of the files by path or an empty dictionary if there are no workers.
+        """
+        if not workers or workers < 2:
+            return {}
+
+        jobs = []
+        for fileCards, directory in xputs:
+            for fileIO, filename in self._getXputFiles(fileCards):
+                path = os.path.join(directory, filename)
+
+                if fileIO._parse is not GsshaPyFileObjectBase._parse and os.path.isfile(path):
+                    jobs.append((fileIO, path))
+
+        if not jobs:
+            return {}
+
+        pool = Pool(min(workers, len(jobs)))
+
+        try:
+            parsed = pool.map(_parseFile, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        return dict((path, contents) for (fileIO, path), contents in zip(jobs, parsed))
 
     def _readXputMaps(self, mapCards, directory, session, spatial=False, spatialReferenceID=4236, replaceParamFile=None):
         """
@@ -1992,6 +2101,14 @@ class ProjectFile(DeclarativeBase, GsshaPyFileObjectBase):
         return {'name': cardName, 'value': cardValue}
 
 
+def _parseFile(job):
+    """
+    Parse a file in a worker process
+    """
+    fileIO, path = job
+    return fileIO._parse(path)
+
+
 class ProjectCard(DeclarativeBase):
     """
     Object containing data for a single card in the project file.
@@ -2049,3 +2166,55 @@ class ProjectCard(DeclarativeBase):
             else:
                 line = '%s%s%s\n' % (self.name, ' ' * numSpaces, self.value)
         return line
+
+
+class ProjectCardView(Mapping):
+    """
+    Read-only, case-insensitive mapping of card names to the :class:`.ProjectCard` objects of a project file.
+    """
+    def __init__(self, projectFile):
+        self._projectFile = projectFile
+
+    def __getitem__(self, name):
+        return self._projectFile._getCardIndex()[name.upper()]
+
+    def __contains__(self, name):
+        return name.upper() in self._projectFile._getCardIndex()
+
+    def __iter__(self):
+        return (card.name for card in self._projectFile._getCardIndex().values())
+
+    def __len__(self):
+        return len(self._projectFile._getCardIndex())
+
+    def __repr__(self):
+        return '<ProjectCardView: %s>' % ', '.join(iter(self))
+
+
+# Keep the card index of the project file in sync with its cards
+@event.listens_for(ProjectFile.projectCards, 'append')
+def _projectCardAppended(projectFile, card, initiator):
+    projectFile._addToCardIndex(card)
+
+
+@event.listens_for(ProjectFile.projectCards, 'remove')
+def _projectCardRemoved(projectFile, card, initiator):
+    projectFile._invalidateCardIndex()
+
+
+@event.listens_for(ProjectFile, 'expire')
+def _projectFileExpired(projectFile, attributes):
+    projectFile._invalidateCardIndex()
+
+
+@event.listens_for(ProjectFile, 'refresh')
+def _projectFileRefreshed(projectFile, context, attributes):
+    projectFile._invalidateCardIndex()
+
+
+@event.listens_for(ProjectCard.name, 'set')
+def _projectCardRenamed(card, value, oldValue, initiator):
+    projectFile = getattr(card, '_indexProjectFile', None)
+
+    if projectFile is not None:
+        projectFile._invalidateCardIndex()
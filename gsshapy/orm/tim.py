@@ -13,15 +13,18 @@ __all__ = ['TimeSeriesFile',
            'TimeSeries',
            'TimeSeriesValue']
 
+from io import BytesIO
 import logging
+import os
+
+import numpy as np
 import pandas as pd
-from sqlalchemy import ForeignKey, Column
-from sqlalchemy.types import Integer, Float, String
+from sqlalchemy import ForeignKey, Column, event
+from sqlalchemy.types import Integer, Float, String, LargeBinary
 from sqlalchemy.orm import relationship
 
 from . import DeclarativeBase
 from ..base.file_base import GsshaPyFileObjectBase
-from ..lib.pivot import pivot
 
 log = logging.getLogger(__name__)
 
@@ -33,6 +36,10 @@ class TimeSeriesFile(DeclarativeBase, GsshaPyFileObjectBase):
     This object stores information from several time series output files. There are two supporting objects that are used
     to store the contents of this file: :class:`.TimeSeries` and :class:`.TimeSeriesValue`.
 
+    Alternatively, the file can be stored as a single two dimensional array in a binary column by reading with
+    ``storeArray=True``, or loaded without the database at all with :meth:`read_array`. In these modes no supporting
+    objects are created and the values are accessed with :meth:`as_array` and :meth:`as_dataframe`.
+
     See:
     """
 
@@ -46,6 +53,7 @@ class TimeSeriesFile(DeclarativeBase, GsshaPyFileObjectBase):
 
     # Value Columns
     fileExtension = Column(String, default='txt')  #: STRING
+    valueArray = Column(LargeBinary)  #: BINARY
 
     # Relationship Properties
     projectFile = relationship('ProjectFile', back_populates='timeSeriesFiles')  #: RELATIONSHIP
@@ -57,13 +65,29 @@ class TimeSeriesFile(DeclarativeBase, GsshaPyFileObjectBase):
         """
         GsshaPyFileObjectBase.__init__(self)
 
-    def _read(self, directory, filename, session, path, name, extension, spatial=None, spatialReferenceID=None, replaceParamFile=None):
+    @classmethod
+    def read_array(cls, path):
         """
-        Generic Time Series Read from File Method
+        Load a time series file (e.g.: '.otl' or '.ohl' output files) into a TimeSeriesFile object without using the
+        database. The object is not added to a session and its values are only available through :meth:`as_array` and
+        :meth:`as_dataframe`.
+
+        Args:
+            path (str): Path to the time series file.
+
+        Returns:
+            TimeSeriesFile: File object with the values stored as an array.
         """
-        # Assign file extension attribute to file object
-        self.fileExtension = extension
+        timeSeriesFile = cls()
+        timeSeriesFile.fileExtension = os.path.basename(path).split('.')[-1]
+        timeSeriesFile._setArray(cls._loadArray(path))
+        return timeSeriesFile
 
+    @staticmethod
+    def _parse(path):
+        """
+        Generic Time Series Parse Method
+        """
         timeSeries = []
 
         # Open file and parse into a data structure
@@ -79,60 +103,118 @@ class TimeSeriesFile(DeclarativeBase, GsshaPyFileObjectBase):
 
                 timeSeries.append(record)
 
+        return timeSeries
+
+    @staticmethod
+    def _loadArray(path):
+        """
+        Load the contents of a time series file into a two dimensional array with the time in the first column
+        """
+        if os.path.getsize(path) == 0:
+            return np.empty((0, 0))
+
+        return np.loadtxt(path, dtype=np.float64, ndmin=2)
+
+    def _read(self, directory, filename, session, path, name, extension, spatial=None, spatialReferenceID=None,
+              replaceParamFile=None, parsed=None, storeArray=False):
+        """
+        Generic Time Series Read from File Method
+
+        When storeArray is True, the contents of the file are stored as an array in the valueArray column instead of
+        as TimeSeries and TimeSeriesValue objects.
+        """
+        # Assign file extension attribute to file object
+        self.fileExtension = extension
+
+        if storeArray:
+            if parsed is not None:
+                array = np.array([[record['time']] + record['values'] for record in parsed], dtype=np.float64)
+            else:
+                array = self._loadArray(path)
+
+            if array.size == 0:
+                log.warning(('%s was opened, but the contents of the file were empty.'
+                             'This file will not be read into the database.') % filename)
+            else:
+                self._setArray(array.reshape(len(array), -1))
+            return
+
+        # Parse file unless it has been parsed ahead of time
+        timeSeries = parsed if parsed is not None else self._parse(path)
+
         self._createTimeSeriesObjects(timeSeries, filename)
 
     def _write(self, session, openFile, replaceParamFile):
         """
         Generic Time Series Write to File Method
         """
-        # Retrieve all time series
-        timeSeries = self.timeSeries
+        array = self._getArray()
 
-        # Num TimeSeries
-        numTS = len(timeSeries)
+        if array.size == 0:
+            return
 
-        # Transform into list of dictionaries for pivot tool
-        valList = []
+        # Time followed by the value of each time series, right aligned in columns of 13 characters
+        lineFormat = '   %.8f' + '%13.6f' * (array.shape[1] - 1) + '\n'
 
-        for tsNum, ts in enumerate(timeSeries):
-            values = ts.values
-            for value in values:
-                valDict = {'time': value.simTime,
-                           'tsNum': tsNum,
-                           'value': value.value}
-                valList.append(valDict)
+        openFile.write(''.join(lineFormat % tuple(row) for row in array.tolist()))
 
-        # Use pivot function (from lib) to pivot the values into
-        # a format that is easy to write.
-        result = pivot(valList, ('time',), ('tsNum',), 'value')
+    def as_array(self):
+        """
+        Return the time series file as a two dimensional array with a row for each time. The first column is the
+        simulation time and the remaining columns are the values of each time series.
 
-        # Write lines
-        for line in result:
+        Returns:
+            numpy.ndarray: Array of shape (number of times, number of time series + 1).
+        """
+        return self._getArray().copy()
 
-            valString = ''
-            # Compile value string
-            for n in range(0, numTS):
-                val = '%.6f' % line[(n,)]
-                valString = '%s%s%s' % (
-                    valString,
-                    ' ' * (13 - len(str(val))),  # Fancy spacing trick
-                    val)
+    def as_dataframe(self):
+        """
+        Return time series as pandas dataframe.
+        """
+        array = self._getArray()
 
-            openFile.write('   %.8f%s\n' % (line['time'], valString))
+        if array.size == 0:
+            return pd.DataFrame()
 
-    def as_dataframe(self):
+        return pd.DataFrame(array[:, 1:], index=array[:, 0], copy=True)
+
+    def _getArray(self):
         """
-        Return time series as pandas dataframe
+        Retrieve the time series as an array from the valueArray column or from the supporting objects
         """
-        time_series = {}
-        for ts_index, ts in enumerate(self.timeSeries):
-            index = []
-            data = []
+        array = getattr(self, '_array', None)
+
+        if array is not None:
+            return array
+
+        if self.valueArray is not None:
+            array = np.load(BytesIO(self.valueArray))
+            self._array = array
+            return array
+
+        # Pivot the values of the time series into rows ordered by time
+        rows = {}
+        for tsNum, ts in enumerate(self.timeSeries):
             for value in ts.values:
-                index.append(value.simTime)
-                data.append(value.value)
-            time_series[ts_index] = pd.Series(data, index=index)
-        return pd.DataFrame(time_series)
+                rows.setdefault(value.simTime, [np.nan] * len(self.timeSeries))[tsNum] = value.value
+
+        return np.array([[time] + rows[time] for time in sorted(rows)], dtype=np.float64)
+
+    def _setArray(self, array):
+        """
+        Serialize the array into the valueArray column
+        """
+        buf = BytesIO()
+        np.save(buf, array)
+        self.valueArray = buf.getvalue()
+        self._array = array
+
+    def _invalidateArray(self):
+        """
+        Discard the array deserialized from the valueArray column
+        """
+        self._array = None
 
     def _createTimeSeriesObjects(self, timeSeries, filename):
         """
@@ -214,3 +296,19 @@ class TimeSeriesValue(DeclarativeBase):
 
     def __repr__(self):
         return '<TimeSeriesValue: Time=%s, Value=%s>' % (self.simTime, self.value)
+
+
+# Discard the cached array of the time series file when its valueArray changes
+@event.listens_for(TimeSeriesFile.valueArray, 'set')
+def _valueArraySet(timeSeriesFile, value, oldValue, initiator):
+    timeSeriesFile._invalidateArray()
+
+
+@event.listens_for(TimeSeriesFile, 'expire')
+def _timeSeriesFileExpired(timeSeriesFile, attributes):
+    timeSeriesFile._invalidateArray()
+
+
+@event.listens_for(TimeSeriesFile, 'refresh')
+def _timeSeriesFileRefreshed(timeSeriesFile, context, attributes):
+    timeSeriesFile._invalidateArray()
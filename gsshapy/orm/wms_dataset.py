@@ -12,13 +12,17 @@ from __future__ import unicode_literals
 __all__ = ['WMSDatasetFile', 'WMSDatasetRaster']
 
 from datetime import datetime, timedelta
+from io import StringIO
 import logging
 import os
 from zipfile import ZipFile
 
+import netCDF4
+import numpy as np
 from sqlalchemy import Column, ForeignKey
 from sqlalchemy.types import Integer, String, Float
 from sqlalchemy.orm import relationship
+import xarray as xr
 from mapkit.RasterLoader import RasterLoader
 from mapkit.RasterConverter import RasterConverter
 from mapkit.sqlatypes import Raster
@@ -42,6 +46,10 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
 
     Note: only the scalar form of the WMS dataset file is supported.
 
+    The values of the time steps can optionally be stored in a single ``(time step, row, column)`` NumPy array file
+    next to the dataset file by reading with ``storeCube=True``. In this case, the rasters only store the index of their
+    time step in the cube, and the values are accessed through a memory map (see :meth:`getCube`).
+
     See: http://www.xmswiki.com/xms/WMS:ASCII_Dataset_Files
     """
     __tablename__ = 'wms_dataset_files'
@@ -61,6 +69,7 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
     numberData = Column(Integer)  #: INTEGER
     numberCells = Column(Integer)  #: INTEGER
     name = Column(String)  #: STRING
+    cubePath = Column(String)  #: STRING
 
     # Relationship Properties
     projectFile = relationship('ProjectFile', back_populates='wmsDatasets')  #: RELATIONSHIP
@@ -108,9 +117,13 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
                 self.numberCells,
                 self.fileExtension)
 
-    def read(self, directory, filename, session, maskMap, spatial=False, spatialReferenceID=4236):
+    def read(self, directory, filename, session, maskMap, spatial=False, spatialReferenceID=4236, storeCube=False):
         """
         Read file into the database.
+
+        *storeCube* = if True, store the values of the time steps in a NumPy array file named after the dataset file
+        with a '.npy' extension appended (e.g.: 'my_project.dep.npy') instead of the database. Ignored if spatial is
+        True.\n
         """
 
         # Read parameter derivatives
@@ -129,7 +142,8 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
             session.add(self)
 
             # Read
-            self._read(directory, filename, session, path, name, extension, spatial, spatialReferenceID, maskMap)
+            self._read(directory, filename, session, path, name, extension, spatial, spatialReferenceID, maskMap,
+                       storeCube)
 
             # Commit to database
             self._commit(session, self.COMMIT_ERROR_MESSAGE)
@@ -305,7 +319,122 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
 
         return kmlString, binaryPngStrings
 
-    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, maskMap):
+    def getCube(self):
+        """
+        Retrieve the values of all time steps of a dataset read with storeCube=True. The cube is memory mapped, so only
+        the time steps that are accessed are read from disk.
+
+        Returns:
+            numpy.memmap: Read-only array of shape (time steps, rows, columns) or None if the dataset was not read with
+            storeCube=True.
+        """
+        if self.cubePath is None:
+            return None
+
+        return np.load(self.cubePath, mmap_mode='r')
+
+    def to_xarray(self, maskMap, projectFile=None):
+        """
+        Retrieve the dataset as a ``(time, y, x)`` cube georeferenced using the mask map. The time coordinate is
+        calculated from the START_DATE and START_TIME cards of the project file. Datasets read with storeCube=True are
+        not loaded into memory.
+
+        Args:
+            maskMap (:class:`gsshapy.orm.RasterMapFile`): Mask map of the project.
+            projectFile (:class:`gsshapy.orm.ProjectFile`, optional): Project file of the dataset. Defaults to the
+                project file the dataset is associated with.
+
+        Returns:
+            xarray.Dataset: Dataset with the values of the time steps and the time, y, and x coordinates.
+        """
+        if projectFile is None:
+            projectFile = self.projectFile
+
+        rasters = sorted(self.rasters, key=lambda raster: raster.timeStep)
+        startDateTime = self._getStartDateTime(projectFile)
+        x, y, geotransform = self._getGridCoordinates(maskMap)
+
+        if self.cubePath is not None:
+            cube = self.getCube()
+            cubeIndices = [raster.cubeIndex for raster in rasters]
+
+            # The memory map can only be used as is if it is in time step order
+            values = cube if cubeIndices == list(range(cube.shape[0])) else cube[cubeIndices]
+        else:
+            values = np.stack([self._getRasterArray(raster, maskMap) for raster in rasters]) if rasters \
+                else np.empty((0, maskMap.rows, maskMap.columns))
+
+        time = [startDateTime + timedelta(minutes=raster.timestamp) for raster in rasters]
+        variableName = self.name or 'value'
+
+        dataset = xr.Dataset({variableName: (('time', 'y', 'x'), values)},
+                             coords={'time': time, 'y': y, 'x': x},
+                             attrs=self._getGridAttributes(projectFile, geotransform))
+        dataset['time_step'] = ('time', np.array([raster.timeStep for raster in rasters], dtype=np.int32))
+
+        return dataset
+
+    def to_netcdf(self, path, maskMap, projectFile=None, chunks=None, complevel=4):
+        """
+        Write the dataset to a NetCDF file as a ``(time, y, x)`` cube georeferenced using the mask map. The time steps
+        are written one at a time, so only a single time step is held in memory.
+
+        Args:
+            path (str): Path to the NetCDF file that will be created.
+            maskMap (:class:`gsshapy.orm.RasterMapFile`): Mask map of the project.
+            projectFile (:class:`gsshapy.orm.ProjectFile`, optional): Project file of the dataset. Defaults to the
+                project file the dataset is associated with.
+            chunks (dict, optional): Chunk sizes of the values keyed by the 'time', 'y', and 'x' dimensions. Defaults
+                to one time step per chunk.
+            complevel (int, optional): Level of the zlib compression of the values. Defaults to 4.
+        """
+        if projectFile is None:
+            projectFile = self.projectFile
+
+        rasters = sorted(self.rasters, key=lambda raster: raster.timeStep)
+        startDateTime = self._getStartDateTime(projectFile)
+        x, y, geotransform = self._getGridCoordinates(maskMap)
+
+        chunkSizes = {'time': 1, 'y': maskMap.rows, 'x': maskMap.columns}
+        chunkSizes.update(chunks or {})
+
+        with netCDF4.Dataset(path, 'w') as ncFile:
+            ncFile.setncatts(self._getGridAttributes(projectFile, geotransform))
+
+            ncFile.createDimension('time', None)
+            ncFile.createDimension('y', maskMap.rows)
+            ncFile.createDimension('x', maskMap.columns)
+
+            timeVariable = ncFile.createVariable('time', 'f8', ('time',))
+            timeVariable.units = 'minutes since {0:%Y-%m-%d %H:%M:%S}'.format(startDateTime)
+            timeStepVariable = ncFile.createVariable('time_step', 'i4', ('time',))
+            ncFile.createVariable('y', 'f8', ('y',))[:] = y
+            ncFile.createVariable('x', 'f8', ('x',))[:] = x
+
+            values = ncFile.createVariable(self.name or 'value', 'f4', ('time', 'y', 'x'),
+                                           zlib=True, complevel=complevel,
+                                           chunksizes=(min(chunkSizes['time'], max(len(rasters), 1)),
+                                                       min(chunkSizes['y'], maskMap.rows),
+                                                       min(chunkSizes['x'], maskMap.columns)))
+
+            for index, raster in enumerate(rasters):
+                timeVariable[index] = raster.timestamp
+                timeStepVariable[index] = raster.timeStep
+                values[index] = self._getRasterArray(raster, maskMap)
+
+    def _getRasterArray(self, raster, maskMap):
+        """
+        Retrieve the values of a raster as an array or raise an error for rasters stored as PostGIS rasters
+        """
+        values = raster.getAsArray(maskMap)
+
+        if values is None:
+            raise ValueError('Datasets read with spatial=True cannot be converted to a cube.')
+
+        return values
+
+    def _read(self, directory, filename, session, path, name, extension, spatial, spatialReferenceID, maskMap,
+              storeCube=False):
         """
         WMS Dataset File Read from File Method
         """
@@ -354,6 +483,20 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
                 self.vectorType = header['objectType']
                 self.type = self.VECTOR_TYPE
 
+            # Write the values to the cube file, if enabled
+            if storeCube and not spatial and len(timeStepRasters) > 0:
+                self.cubePath = os.path.abspath('{0}.npy'.format(path))
+                # Double precision, so the values are written back as they were read
+                cube = np.lib.format.open_memmap(self.cubePath, mode='w+', dtype=np.float64,
+                                                 shape=(len(timeStepRasters),) +
+                                                       timeStepRasters[0]['cellArray'].shape)
+
+                for timeStep, timeStepRaster in enumerate(timeStepRasters):
+                    cube[timeStep] = timeStepRaster['cellArray']
+
+                cube.flush()
+                del cube
+
             # Create WMS raster dataset files for each raster
             for timeStep, timeStepRaster in enumerate(timeStepRasters):
                 # Create new WMS raster dataset file object
@@ -376,7 +519,11 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
                                                                                        cellSizeX, cellSizeY,
                                                                                        0, 0,
                                                                                        spatialReferenceID,
-                                                                                       timeStepRaster['cellArray'])
+                                                                                       timeStepRaster['cellArray'].tolist())
+
+                # Reference the time step in the cube file
+                elif self.cubePath is not None:
+                    wmsRasterDatasetFile.cubeIndex = timeStep
 
                 # Otherwise, set the raster text properties
                 else:
@@ -428,6 +575,9 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
             for i in range(FIRST_VALUE_INDEX, len(statusValues)):
                 statusString += statusValues[i] + '\r\n'
 
+        # Open the cube file once for all time steps
+        cube = self.getCube()
+
         # Write time steps
         for timeStepRaster in self.rasters:
             # Write time step header
@@ -437,6 +587,11 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
             if timeStepRaster.iStatus == 1:
                 openFile.write(statusString)
 
+            # Write value raster directly from the cube
+            if cube is not None and timeStepRaster.cubeIndex is not None:
+                timeStepRaster._writeCubeValues(cube, openFile)
+                continue
+
             # Write value raster
             valueString = timeStepRaster.getAsWmsDatasetString(session)
 
@@ -452,6 +607,29 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
     def _assembleRasterParams(self, projectFile, rasters):
         # Assemble input for converter method
         timeStampedRasters = []
+        startDateTime = self._getStartDateTime(projectFile)
+
+        for raster in rasters:
+            # Create dictionary and populate
+            timeStampedRaster = dict()
+            timeStampedRaster['rasterId'] = raster.id
+
+            # Calculate the delta times
+            timestamp = raster.timestamp
+            timestampDelta = timedelta(minutes=timestamp)
+
+            # Create datetime objects
+            timeStampedRaster['dateTime'] = startDateTime + timestampDelta
+
+            # Add to the list
+            timeStampedRasters.append(timeStampedRaster)
+
+        return timeStampedRasters
+
+    def _getStartDateTime(self, projectFile):
+        """
+        Retrieve the start date and time of the simulation from the project file
+        """
         startDateTime = datetime(1970, 1, 1)
 
         if projectFile is not None:
@@ -471,22 +649,29 @@ class WMSDatasetFile(DeclarativeBase, GsshaPyFileObjectBase):
                     minute = int(startTimeParts[1])
                     startDateTime = datetime(year, month, day, hour, minute)
 
-        for raster in rasters:
-            # Create dictionary and populate
-            timeStampedRaster = dict()
-            timeStampedRaster['rasterId'] = raster.id
+        return startDateTime
 
-            # Calculate the delta times
-            timestamp = raster.timestamp
-            timestampDelta = timedelta(minutes=timestamp)
+    def _getGridCoordinates(self, maskMap):
+        """
+        Calculate the coordinates of the cell centers from the mask map
+        """
+        cellSize = float(abs(maskMap.east - maskMap.west)) / maskMap.columns
+        x = maskMap.west + (np.arange(maskMap.columns) + 0.5) * cellSize
+        y = maskMap.north - (np.arange(maskMap.rows) + 0.5) * cellSize
+        geotransform = [maskMap.west, cellSize, 0.0, maskMap.north, 0.0, -cellSize]
 
-            # Create datetime objects
-            timeStampedRaster['dateTime'] = startDateTime + timestampDelta
+        return x, y, geotransform
 
-            # Add to the list
-            timeStampedRasters.append(timeStampedRaster)
+    def _getGridAttributes(self, projectFile, geotransform):
+        """
+        Assemble the attributes describing the grid
+        """
+        attributes = {'geotransform': geotransform}
 
-        return timeStampedRasters
+        if projectFile is not None and projectFile.projectionFile is not None:
+            attributes['crs_wkt'] = projectFile.projectionFile.projection
+
+        return attributes
 
 
 class WMSDatasetRaster(DeclarativeBase, RasterObjectBase):
@@ -512,6 +697,7 @@ class WMSDatasetRaster(DeclarativeBase, RasterObjectBase):
     timestamp = Column(Float)  #: FLOAT
     iStatus = Column(Integer)  #: INTEGER
     rasterText = Column(String)  #: STRING
+    cubeIndex = Column(Integer)  #: INTEGER
     raster = Column(Raster)  #: RASTER
 
     # Relationship Properties
@@ -549,5 +735,41 @@ class WMSDatasetRaster(DeclarativeBase, RasterObjectBase):
 
             return wmsDatasetString
 
+        elif self.cubeIndex is not None:
+            # Format the time step from the cube file
+            wmsDatasetString = StringIO()
+            self._writeCubeValues(self.wmsDataset.getCube(), wmsDatasetString)
+
+            return wmsDatasetString.getvalue()
+
         else:
             wmsDatasetString = self.rasterText
+
+    def getAsArray(self, maskMap=None):
+        """
+        Retrieve the values of the WMS Raster as a 2-D array. Only the time step of this raster is read from the cube
+        file for datasets read with storeCube=True.
+
+        Args:
+            maskMap (:class:`gsshapy.orm.RasterMapFile`, optional): Mask map of the project. Required to determine the
+                number of columns when the values are stored as raster text.
+
+        Returns:
+            numpy.ndarray: Array of shape (rows, columns) or None if the values are stored as a PostGIS raster.
+        """
+        if self.cubeIndex is not None:
+            return np.array(self.wmsDataset.getCube()[self.cubeIndex])
+
+        elif self.rasterText is not None:
+            if not isinstance(maskMap, RasterMapFile):
+                raise ValueError('A mask map is required to retrieve the raster text of a WMS Raster as an array.')
+
+            values = np.fromstring(self.rasterText, dtype=np.float64, sep=' ')
+            return values.reshape(-1, maskMap.columns)
+
+    def _writeCubeValues(self, cube, openFile):
+        """
+        Write the values of this time step from the cube in the WMS Dataset format. The shortest text that reads back
+        as the same double is written, so the values keep the precision they were read with.
+        """
+        openFile.write(''.join('{0!r}\r\n'.format(value) for value in cube[self.cubeIndex].ravel().tolist()))
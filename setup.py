@@ -43,8 +43,12 @@ setup(name='gsshapy',
                 ],
       install_requires=requires,
       extras_require={
+        'dask': [
+            'dask',
+        ],
         'tests': [
             'coveralls',
+            'dask',
             'pytest',
             'pytest-cov',
         ],
@@ -0,0 +1,76 @@
+"""
+********************************************************************************
+* Name: Arc ASCII Writer Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+from glob import glob
+import numpy as np
+import os
+import unittest
+
+from .template import TestGridTemplate
+
+from gsshapy.grid.arc_ascii import ArcAsciiWriter
+
+
+class TestArcAsciiWriter(TestGridTemplate):
+    def setUp(self):
+        self.compare_files = sorted(glob(os.path.join(self.readDirectory,
+                                                      'wrf_hmet_data',
+                                                      '*_Temp.asc')))
+        self.out_file = os.path.join(self.writeDirectory, 'arc_ascii_test.asc')
+
+    def _read_arc_ascii(self, ascii_file_path):
+        """
+        Read the header and values of an Arc ASCII file
+        """
+        header = {}
+        with open(ascii_file_path) as ascii_file:
+            for _ in range(6):
+                key, value = ascii_file.readline().split()
+                header[key.lower()] = float(value)
+            grid = np.loadtxt(ascii_file, ndmin=2)
+        return header, grid
+
+    def test_write(self):
+        """
+        Test ArcAsciiWriter write method
+        """
+        header, grid = self._read_arc_ascii(self.compare_files[0])
+        nrows, ncols = grid.shape
+        geotransform = (header['xllcorner'], header['cellsize'], 0,
+                        header['yllcorner'] + nrows * header['cellsize'], 0, -header['cellsize'])
+
+        writer = ArcAsciiWriter(geotransform, (nrows, ncols))
+
+        for compare_file in self.compare_files:
+            header, grid = self._read_arc_ascii(compare_file)
+            writer.write(self.out_file, grid)
+            self._compare_files(compare_file, self.out_file, precision=5)
+
+    def test_write_south_up_nodata(self):
+        """
+        Test ArcAsciiWriter write method with grid stored from south to north
+        """
+        grid = np.array([[1.0, np.nan], [3.5, 4.0]])
+        writer = ArcAsciiWriter((10.0, 2.0, 0, 20.0, 0, 2.0), grid.shape)
+        writer.write(self.out_file, grid)
+
+        header, written_grid = self._read_arc_ascii(self.out_file)
+        self.assertEqual(header['yllcorner'], 20.0)
+        self.assertEqual(header['cellsize'], 2.0)
+        self.assertEqual(header['nodata_value'], -9999)
+        np.testing.assert_array_equal(written_grid, [[3.5, 4.0], [1.0, -9999]])
+
+        self.assertRaises(ValueError, writer.write, self.out_file, np.zeros((3, 2)))
+
+    def tearDown(self):
+        try:
+            os.remove(self.out_file)
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+********************************************************************************
+* Name: Batch LSM to GSSHA Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+import numpy as np
+import os
+import unittest
+from shutil import copy, copytree
+
+from .template import TestGridTemplate
+from gsshapy.grid import GRIDtoGSSHA, GRIDtoGSSHABatch
+from gsshapy.grid.batch import _cluster_windows
+
+
+class TestClusterWindows(unittest.TestCase):
+    def test_cluster_windows(self):
+        """
+        Test _cluster_windows groups nearby projects only
+        """
+        windows = [(slice(0, 10), slice(0, 10)),
+                   (slice(0, 10), slice(5, 15)),
+                   (slice(500, 510), slice(800, 810)),
+                   (slice(0, 10), slice(10, 20))]
+        clusters = _cluster_windows(windows)
+
+        self.assertEqual(sorted(sorted(indices) for _, indices in clusters),
+                         [[0, 1, 3], [2]])
+        for window, indices in clusters:
+            for index in indices:
+                self.assertTrue(window[0].start <= windows[index][0].start and
+                                windows[index][0].stop <= window[0].stop)
+                self.assertTrue(window[1].start <= windows[index][1].start and
+                                windows[index][1].stop <= window[1].stop)
+
+    def test_cluster_windows_axes(self):
+        """
+        Test _cluster_windows splits windows apart along either axis
+        """
+        windows = [(slice(0, 10), slice(0, 10)),
+                   (slice(5, 15), slice(100, 110)),
+                   (slice(100, 110), slice(5, 15)),
+                   (slice(8, 20), slice(8, 20)),
+                   (slice(12, 18), slice(105, 120))]
+        clusters = _cluster_windows(windows)
+
+        self.assertEqual(sorted(indices for _, indices in clusters),
+                         [[0, 3], [1, 4], [2]])
+        self.assertIn(((slice(0, 20), slice(0, 20)), [0, 3]), clusters)
+        self.assertEqual(_cluster_windows([]), [])
+
+    def test_cluster_windows_many(self):
+        """
+        Test _cluster_windows with many projects in rows of touching windows
+        """
+        windows = [(slice(row * 100, row * 100 + 10), slice(col * 10, col * 10 + 10))
+                   for row in range(50) for col in range(100)]
+        clusters = _cluster_windows(windows)
+
+        self.assertEqual(len(clusters), 50)
+        for window, indices in clusters:
+            self.assertEqual(len(indices), 100)
+            self.assertEqual(window[1], slice(0, 1000))
+
+
+class TestGRIDtoGSSHABatchWorkers(unittest.TestCase):
+    def test_project_workers_lazy_data(self):
+        """
+        Test GRIDtoGSSHABatch only converts projects in parallel with data loaded by the caches
+        """
+        self.assertRaises(ValueError, GRIDtoGSSHABatch, [], project_workers=2,
+                          cache_lsm_data=False)
+        self.assertRaises(ValueError, GRIDtoGSSHABatch, [], project_workers=2,
+                          chunks={'time': 4})
+
+
+class TestGRIDtoGSSHABatch(TestGridTemplate):
+    def setUp(self):
+        # copy gssha project twice & WRF data
+        self.gssha_project_folders = [os.path.join(self.writeDirectory,
+                                                   "gssha_project_{0}".format(project_id))
+                                      for project_id in range(2)]
+        for gssha_project_folder in self.gssha_project_folders:
+            try:
+                copytree(os.path.join(self.readDirectory, "gssha_project"),
+                         gssha_project_folder)
+            except OSError:
+                pass
+        try:
+            copytree(os.path.join(self.readDirectory, "wrf_raw_data", "gssha_d03_nc"),
+                     os.path.join(self.writeDirectory, "wrf_raw_data"))
+        except OSError:
+            pass
+
+        self.data_var_map_array = [
+                                   ['precipitation_acc', ['RAINC', 'RAINNC']],
+                                   ['pressure', 'PSFC'],
+                                   ['relative_humidity', ['Q2', 'PSFC', 'T2']],
+                                   ['wind_speed', ['U10', 'V10']],
+                                   ['direct_radiation', ['SWDOWN', 'DIFFUSE_FRAC']],
+                                   ['diffusive_radiation', ['SWDOWN', 'DIFFUSE_FRAC']],
+                                   ['temperature', 'T2'],
+                                   ['cloud_cover', 'CLDFRA'],
+                                  ]
+
+        self.g2g_batch = GRIDtoGSSHABatch([(gssha_project_folder, 'grid_standard.prj')
+                                           for gssha_project_folder in self.gssha_project_folders],
+                                          lsm_input_folder_path=os.path.join(self.writeDirectory,
+                                                                             'wrf_raw_data'),
+                                          lsm_search_card="gssha_d03_*.nc",
+                                          lsm_lat_var='XLAT',
+                                          lsm_lon_var='XLONG',
+                                          lsm_time_var='Times',
+                                          lsm_lat_dim='south_north',
+                                          lsm_lon_dim='west_east',
+                                          lsm_time_dim='Time',
+                                          project_workers=2,
+                                          )
+
+    def _before_teardown(self):
+        self.g2g_batch.close()
+        self.g2g_batch = None
+
+    def test_batch_shared_dataset(self):
+        """
+        Test GRIDtoGSSHABatch opens the LSM data once
+        """
+        converters = self.g2g_batch.converters
+        self.assertEqual(len(converters), 2)
+        assert converters[0].xd is converters[1].xd
+        assert converters[0].lsm_data_cache is converters[1].lsm_data_cache
+
+    def test_batch_cache_subset(self):
+        """
+        Test GRIDtoGSSHABatch cache returns the same data as GRIDtoGSSHA for each project
+        """
+        for converter in self.g2g_batch.converters:
+            g2g = GRIDtoGSSHA(gssha_project_folder=converter.gssha_project_folder,
+                              gssha_project_file_name='grid_standard.prj',
+                              lsm_input_folder_path=os.path.join(self.writeDirectory,
+                                                                 'wrf_raw_data'),
+                              lsm_search_card="gssha_d03_*.nc",
+                              lsm_lat_var='XLAT',
+                              lsm_lon_var='XLONG',
+                              lsm_time_var='Times',
+                              lsm_lat_dim='south_north',
+                              lsm_lon_dim='west_east',
+                              lsm_time_dim='Time',
+                              )
+            try:
+                self.assertEqual((g2g.yslice, g2g.xslice),
+                                 (converter.yslice, converter.xslice))
+                for data_var in ('T2', ['RAINC', 'RAINNC']):
+                    expected = g2g._load_lsm_data(data_var)
+                    data = converter._load_lsm_data(data_var)
+                    for var_name in expected.data_vars:
+                        np.testing.assert_array_equal(data[var_name].values,
+                                                      expected[var_name].values)
+            finally:
+                g2g.xd.close()
+
+    def test_batch_gage_file_write(self):
+        """
+        Test GRIDtoGSSHABatch lsm_precip_to_gssha_precip_gage write method
+        """
+        self.g2g_batch.lsm_precip_to_gssha_precip_gage('gage_test_wrf.gag',
+                                                       lsm_data_var=['RAINC', 'RAINNC'],
+                                                       precip_type='ACCUM')
+
+        # Test
+        compare_gag_file = os.path.join(self.readDirectory, 'gage_test_wrf.gag')
+        for gssha_project_folder in self.gssha_project_folders:
+            self._compare_files(os.path.join(gssha_project_folder, 'gage_test_wrf.gag'),
+                                compare_gag_file,
+                                precision=5)
+
+    def test_batch_netcdf_file_write(self):
+        """
+        Test GRIDtoGSSHABatch lsm_data_to_subset_netcdf write method
+        """
+        self.g2g_batch.lsm_data_to_subset_netcdf('gssha_dynamic_wrf.nc',
+                                                 self.data_var_map_array)
+
+        # compare netcdf files
+        for gssha_project_folder in self.gssha_project_folders:
+            netcdf_file_path = os.path.join(self.writeDirectory, 'gssha_dynamic_wrf.nc')
+            copy(os.path.join(gssha_project_folder, 'gssha_dynamic_wrf.nc'),
+                 netcdf_file_path)
+            self._compare_netcdf_files("gssha_dynamic_wrf", "gssha_dynamic_wrf")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+********************************************************************************
+* Name: HRRR Download Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+from glob import glob
+import os
+from threading import Lock, Thread
+from time import sleep
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+from .template import TestGridTemplate
+from gsshapy.grid.hrrr_to_gssha import download_hrrr_for_gssha
+
+
+def hrrr_file_content(file_name, leftlon='-180'):
+    """
+    Content served for an HRRR file
+    """
+    return '{0} {1}'.format(file_name, leftlon).encode('utf-8') * 1000
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server handling each request in a thread
+    """
+    daemon_threads = True
+
+
+class HRRRFilterHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the HRRR filter service
+    """
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        file_name = query['file'][0]
+        server = self.server
+        with server.lock:
+            server.requests.append((file_name, self.headers.get('Range')))
+            fail = server.fail_counts.get(file_name, 0) > 0
+            if fail:
+                server.fail_counts[file_name] -= 1
+            short = server.short_counts.get(file_name, 0) > 0
+            if short:
+                server.short_counts[file_name] -= 1
+            slow = server.slow_counts.get(file_name, 0) > 0
+            if slow:
+                server.slow_counts[file_name] -= 1
+
+        if slow:
+            # the server does not respond before the client times out
+            sleep(1)
+
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        content = hrrr_file_content(file_name, query['leftlon'][0])
+        range_header = self.headers.get('Range')
+        if range_header:
+            start = int(range_header.split('=')[1].split('-')[0])
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'
+                             .format(start, len(content) - 1, len(content)))
+            content = content[start:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if short:
+            # the connection is closed before the end of the body
+            content = content[:len(content) // 2]
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        return
+
+
+class TestHRRRDownload(TestGridTemplate):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), HRRRFilterHandler)
+        self.server.lock = Lock()
+        self.server.requests = []
+        self.server.fail_counts = {}
+        self.server.short_counts = {}
+        self.server.slow_counts = {}
+        self.server_thread = Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.url = 'http://127.0.0.1:{0}/cgi-bin/filter_hrrr_2d.pl'.format(self.server.server_port)
+        self.hrrr_folder = os.path.join(self.writeDirectory, 'hrrr_download')
+        self.forecast_folder = os.path.join(self.hrrr_folder, '20160914')
+        try:
+            os.mkdir(self.hrrr_folder)
+        except OSError:
+            pass
+
+    def _before_teardown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _download(self, **kwargs):
+        return download_hrrr_for_gssha(self.hrrr_folder, '20160914', '01',
+                                       url=self.url, backoff=0, **kwargs)
+
+    def _check_files(self, downloaded_file_list, leftlon='-180', num_files=19):
+        self.assertEqual(len(downloaded_file_list), num_files)
+        for downloaded_file in downloaded_file_list:
+            with open(downloaded_file, 'rb') as fd:
+                self.assertEqual(fd.read(),
+                                 hrrr_file_content(os.path.basename(downloaded_file),
+                                                   leftlon))
+        self.assertEqual(glob(os.path.join(self.forecast_folder, '*.part')), [])
+
+    def test_download(self):
+        """
+        Test download_hrrr_for_gssha downloads all forecast files
+        """
+        downloaded_file_list = self._download()
+        self._check_files(downloaded_file_list)
+        self.assertEqual(os.path.basename(downloaded_file_list[0]),
+                         'hrrr.t01z.wrfsfcf00.grib2')
+
+        # downloaded files are skipped
+        self.server.requests = []
+        downloaded_file_list = self._download()
+        self._check_files(downloaded_file_list)
+        self.assertEqual(self.server.requests, [])
+
+    def test_download_retry(self):
+        """
+        Test download_hrrr_for_gssha retries failed downloads
+        """
+        self.server.fail_counts['hrrr.t01z.wrfsfcf05.grib2'] = 2
+        self._check_files(self._download(retries=2))
+
+        file_name = 'hrrr.t01z.wrfsfcf06.grib2'
+        self.server.fail_counts[file_name] = 3
+        os.remove(os.path.join(self.forecast_folder, file_name))
+        # the files downloaded are returned without the failed file
+        downloaded_file_list = self._download(retries=2)
+        self._check_files(downloaded_file_list, num_files=18)
+        self.assertNotIn(os.path.join(self.forecast_folder, file_name), downloaded_file_list)
+        self.assertEqual(len(glob(os.path.join(self.forecast_folder, '*.grib2'))), 18)
+
+    def test_download_timeout(self):
+        """
+        Test download_hrrr_for_gssha retries downloads that time out
+        """
+        file_name = 'hrrr.t01z.wrfsfcf03.grib2'
+        self.server.slow_counts[file_name] = 1
+        self._check_files(self._download(timeout=0.2, retries=1))
+        self.assertEqual(self.server.requests.count((file_name, None)), 2)
+
+        self.server.slow_counts[file_name] = 1
+        os.remove(os.path.join(self.forecast_folder, file_name))
+        self._check_files(self._download(timeout=0.2, retries=0), num_files=18)
+
+    def test_download_resume(self):
+        """
+        Test download_hrrr_for_gssha resumes files that ended short
+        """
+        file_name = 'hrrr.t01z.wrfsfcf10.grib2'
+        self.server.short_counts[file_name] = 1
+        self._check_files(self._download(chunk_size=1000))
+        self.assertIn((file_name, 'bytes=15000-'), self.server.requests)
+
+        # a short file is never recorded as downloaded
+        self.server.short_counts[file_name] = 2
+        os.remove(os.path.join(self.forecast_folder, file_name))
+        self.assertEqual(len(self._download(retries=1)), 18)
+        self.assertFalse(os.path.exists(os.path.join(self.forecast_folder, file_name)))
+
+    def test_download_bbox_change(self):
+        """
+        Test download_hrrr_for_gssha downloads the files again for another bounding box
+        """
+        self._check_files(self._download())
+
+        # partial file of the previous bounding box
+        file_name = 'hrrr.t01z.wrfsfcf10.grib2'
+        self.server.short_counts[file_name] = 1
+        os.remove(os.path.join(self.forecast_folder, file_name))
+        self.assertEqual(len(self._download(retries=0)), 18)
+        self.assertTrue(os.path.exists(os.path.join(self.forecast_folder, file_name + '.part')))
+
+        self.server.requests = []
+        self._check_files(self._download(leftlon=-95), leftlon='-95')
+        self.assertEqual(len(self.server.requests), 19)
+        self.assertIn((file_name, None), self.server.requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+********************************************************************************
+* Name: Pivot Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+import unittest
+
+from gsshapy.lib.pivot import pivot
+
+
+class TestPivot(unittest.TestCase):
+    def test_pivot_example(self):
+        """
+        Test pivot with the example of the docstring
+        """
+        table = [{'Name': 'Simon', 'Year': 2004, 'Value': 32},
+                 {'Name': 'Simon', 'Year': 2005, 'Value': 128},
+                 {'Name': 'Russel', 'Year': 2004, 'Value': 64},
+                 {'Name': 'Eric', 'Year': 2004, 'Value': 52},
+                 {'Name': 'Russel', 'Year': 2005, 'Value': 32}]
+
+        self.assertEqual(pivot(table, ('Name',), ('Year',), 'Value'),
+                         [{'Name': 'Simon', (2004,): 32, (2005,): 128},
+                          {'Name': 'Russel', (2004,): 64, (2005,): 32},
+                          {'Name': 'Eric', (2004,): 52, (2005,): ''}])
+
+    def test_pivot_unordered_top(self):
+        """
+        Test pivot with top keys that are not in order and duplicate cells
+        """
+        table = [{'time': 0.5, 'tsNum': 3, 'value': 3.0},
+                 {'time': 0.5, 'tsNum': 1, 'value': 1.0},
+                 {'time': 0.0, 'tsNum': 2, 'value': 20.0},
+                 {'time': 0.5, 'tsNum': 2, 'value': 2.0},
+                 {'time': 0.0, 'tsNum': 3, 'value': 30.0},
+                 {'time': 0.0, 'tsNum': 3, 'value': 5.0},
+                 {'time': 1.5, 'tsNum': 1, 'value': 100.0}]
+
+        self.assertEqual(pivot(table, ('time',), ('tsNum',), 'value'),
+                         [{'time': 0.5, (1,): 1.0, (2,): 2.0, (3,): 3.0},
+                          {'time': 0.0, (1,): '', (2,): 20.0, (3,): 35.0},
+                          {'time': 1.5, (1,): 100.0, (2,): '', (3,): ''}])
+
+    def test_pivot_multiple_keys(self):
+        """
+        Test pivot with multiple left and top keys that are not in order
+        """
+        table = [{'DateTime': 2, 'ValueType': 'ACCUM', 'Gage': 'b', 'Band': 2, 'Value': 4},
+                 {'DateTime': 2, 'ValueType': 'ACCUM', 'Gage': 'a', 'Band': 1, 'Value': 1},
+                 {'DateTime': 1, 'ValueType': 'ACCUM', 'Gage': 'b', 'Band': 1, 'Value': 3},
+                 {'DateTime': 1, 'ValueType': 'ACCUM', 'Gage': 'a', 'Band': 2, 'Value': 2}]
+
+        self.assertEqual(pivot(table, ('DateTime', 'ValueType'), ('Gage', 'Band'), 'Value'),
+                         [{'DateTime': 2, 'ValueType': 'ACCUM',
+                           ('a', 1): 1, ('a', 2): '', ('b', 1): '', ('b', 2): 4},
+                          {'DateTime': 1, 'ValueType': 'ACCUM',
+                           ('a', 1): '', ('a', 2): 2, ('b', 1): 3, ('b', 2): ''}])
+
+
+if __name__ == '__main__':
+    unittest.main()
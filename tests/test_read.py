@@ -8,11 +8,15 @@
 ********************************************************************************
 """
 from builtins import zip
+from datetime import datetime
+from io import BytesIO
 import unittest
+import numpy as np
 import os
 
 from gsshapy.orm.file_io import *
 from gsshapy.orm import ProjectFile
+from gsshapy.orm.lnd import NodeDataset
 from gsshapy.lib import db_tools as dbt
 
 
@@ -53,6 +57,31 @@ class TestReadMethods(unittest.TestCase):
             self.assertEqual(cardR.name, cardQ.name)
             self.assertEqual(cardR.value, cardQ.value)
 
+    def test_project_file_cards(self):
+        """
+        Test ProjectFile card index and cards mapping
+        """
+        prjR, prjQ = self._read_n_query(fileIO=ProjectFile,
+                                        directory=self.directory,
+                                        filename='standard.prj')
+
+        # Tests
+        self.assertEqual(len(prjQ.cards), len(set(card.name.upper() for card in prjQ.projectCards)))
+        self.assertIs(prjQ.getCard('map_type'), prjQ.cards['MAP_TYPE'])
+        self.assertIn('Map_Type', prjQ.cards)
+
+        # Cards added and renamed after the index was built
+        prjQ.setCard('NEW_CARD', '1')
+        self.assertEqual(prjQ.getCard('new_card').value, '1')
+
+        prjQ.getCard('MAP_TYPE').name = 'RENAMED_CARD'
+        self.assertIsNone(prjQ.getCard('MAP_TYPE'))
+        self.assertEqual(prjQ.cards['RENAMED_CARD'].value, '1')
+
+        # Removed cards
+        prjQ.projectCards.remove(prjQ.getCard('RENAMED_CARD'))
+        self.assertNotIn('RENAMED_CARD', prjQ.cards)
+
     def test_channel_input_read(self):
         """
         Test ChannelInputFile read method
@@ -190,6 +219,28 @@ class TestReadMethods(unittest.TestCase):
 
         # Tests
 
+    def test_precip_file_read_array(self):
+        """
+        Test PrecipFile read method with array storage
+        """
+        precipR, precipQ = self._read_n_query(fileIO=PrecipFile,
+                                              directory=self.directory,
+                                              filename='standard.gag')
+
+        precipA = PrecipFile()
+        precipA.read(directory=self.directory,
+                     filename='standard.gag',
+                     session=self.readSession,
+                     storeArray=True)
+
+        # Tests
+        for eventQ, eventA in zip(precipQ.precipEvents, precipA.precipEvents):
+            self.assertEqual(len(eventA.values), 0)
+            self.assertEqual(eventA.as_array().shape, (eventA.nrPds, eventA.nrGag))
+            assert (eventQ.as_array() == eventA.as_array()).all()
+            assert (eventQ.as_array('dateTime') == eventA.as_array('dateTime')).all()
+            self.assertEqual(eventA.as_array('valueType').tolist(), eventQ.as_array('valueType').tolist())
+
     def test_grid_pipe_file_read(self):
         """
         Test GridPipeFile read method
@@ -219,6 +270,31 @@ class TestReadMethods(unittest.TestCase):
                                           filename='hmet_wes.hmt')
 
         # Tests
+        dfR = hmetR.to_dataframe()
+        dfQ = hmetQ.to_dataframe()
+        assert dfR.equals(dfQ)
+        self.assertEqual(len(dfQ.index), 10)
+        self.assertEqual(dfQ.index[1], datetime(2001, 8, 23, 1))
+        self.assertAlmostEqual(dfQ['relHumidity'].iloc[1], 61)
+
+    def test_hmet_file_read_objects(self):
+        """
+        Test HmetFile read method without bulk insert
+        """
+        hmetR, hmetQ = self._read_n_query(fileIO=HmetFile,
+                                          directory=self.directory,
+                                          filename='hmet_wes.hmt')
+
+        hmetO = HmetFile()
+        hmetO.read(directory=self.directory,
+                   filename='hmet_wes.hmt',
+                   session=self.readSession,
+                   bulkInsert=False)
+
+        # Tests
+        self.assertEqual(len(hmetO.hmetRecords), len(hmetQ.hmetRecords))
+        self.assertEqual(len(hmetR.hmetRecords), 10)
+        assert hmetO.to_dataframe().equals(hmetQ.to_dataframe())
 
     def test_output_location_file_read(self):
         """
@@ -240,6 +316,104 @@ class TestReadMethods(unittest.TestCase):
 
         # Tests
 
+    def test_link_node_dataset_file_read_bulk(self):
+        """
+        Test LinkNodeDatasetFile read method with bulk insert
+        """
+        lndR = LinkNodeDatasetFile()
+        lndR.read(directory=self.directory,
+                  filename='standard.cdp',
+                  session=self.readSession)
+
+        lndB = LinkNodeDatasetFile()
+        lndB.read(directory=self.directory,
+                  filename='standard.cdp',
+                  session=self.readSession,
+                  bulkInsert=True)
+
+        # Tests
+        self.assertEqual(lndR.name, lndB.name)
+        self.assertEqual(len(lndR.timeSteps), len(lndB.timeSteps))
+
+        for timeStepR, timeStepB in zip(lndR.timeSteps, lndB.timeSteps):
+            self.assertEqual(timeStepR.timeStep, timeStepB.timeStep)
+            self.assertEqual(len(timeStepR.linkDatasets), len(timeStepB.linkDatasets))
+
+            for linkR, linkB in zip(timeStepR.linkDatasets, timeStepB.linkDatasets):
+                self.assertEqual(linkR.numNodeDatasets, linkB.numNodeDatasets)
+                self.assertEqual([(n.status, n.value) for n in linkR.nodeDatasets],
+                                 [(n.status, n.value) for n in linkB.nodeDatasets])
+
+        # Objects read after the bulk insert get new primary keys
+        lndO = LinkNodeDatasetFile()
+        lndO.read(directory=self.directory,
+                  filename='standard.cdp',
+                  session=self.readSession)
+        self.readSession.commit()
+
+        self.assertEqual(len(lndO.timeSteps), len(lndB.timeSteps))
+        self.assertEqual(len(lndO.nodeDatasets), len(lndB.nodeDatasets))
+        self.assertEqual(self.readSession.query(NodeDataset).count(), 3 * len(lndB.nodeDatasets))
+
+    def test_link_node_dataset_file_read_array(self):
+        """
+        Test LinkNodeDatasetFile read method with array storage
+        """
+        lndR = LinkNodeDatasetFile()
+        lndR.read(directory=self.directory,
+                  filename='standard.cdp',
+                  session=self.readSession)
+
+        lndA = LinkNodeDatasetFile()
+        lndA.read(directory=self.directory,
+                  filename='standard.cdp',
+                  session=self.readSession,
+                  storeArray=True)
+
+        # Tests
+        self.assertEqual(len(lndA.timeSteps), 0)
+        self.assertEqual(lndA.as_array().shape, (10, 122))
+        assert (lndR.as_array() == lndA.as_array()).all()
+        assert (lndR.as_array('status') == lndA.as_array('status')).all()
+        assert lndR.as_dataframe().equals(lndA.as_dataframe())
+
+        ds = lndA.as_xarray()
+        self.assertEqual(ds['value'].dims, ('time_step', 'node'))
+        self.assertEqual(int(ds['link'][-1]), 5)
+
+    def test_link_node_dataset_file_iter_timesteps(self):
+        """
+        Test LinkNodeDatasetFile iter_timesteps method
+        """
+        lndA = LinkNodeDatasetFile()
+        lndA.read(directory=self.directory,
+                  filename='standard.cdp',
+                  session=self.readSession,
+                  storeArray=True)
+
+        timeSteps = list(LinkNodeDatasetFile.iter_timesteps(os.path.join(self.directory, 'standard.cdp')))
+
+        # Tests
+        self.assertEqual([ts['timeStep'] for ts in timeSteps], list(range(10)))
+        assert (lndA.as_array() == [ts['value'] for ts in timeSteps]).all()
+        assert (lndA.as_array('status') == [ts['status'] for ts in timeSteps]).all()
+
+        # Incomplete time steps of a running simulation are not yielded
+        with open(os.path.join(self.directory, 'standard.cdp')) as f:
+            lines = f.readlines()
+
+        partialPath = os.path.join(os.path.dirname(self.directory), 'out', 'partial.cdp')
+
+        with open(partialPath, 'w') as f:
+            f.writelines(lines[:16])
+
+        try:
+            timeSteps = list(LinkNodeDatasetFile.iter_timesteps(partialPath, follow=True,
+                                                                poll_interval=0.01, timeout=0.05))
+            self.assertEqual([ts['timeStep'] for ts in timeSteps], [0])
+        finally:
+            os.remove(partialPath)
+
     def test_raster_map_file_read(self):
         """
         Test RasterMapFile read method
@@ -326,6 +500,62 @@ class TestReadMethods(unittest.TestCase):
         self.assertAlmostEqual(dfR.iloc[7, 1], 0.016869)
         self.assertAlmostEqual(dfR.index[7], 2002.42440068)
 
+    def test_time_series_file_read_array(self):
+        """
+        Test TimeSeriesFile read method with array storage and read_array
+        """
+        timR, timQ = self._read_n_query(fileIO=TimeSeriesFile,
+                                        directory=self.directory,
+                                        filename='standard.ohl')
+
+        timA = TimeSeriesFile()
+        timA.read(directory=self.directory,
+                  filename='standard.ohl',
+                  session=self.readSession,
+                  storeArray=True)
+
+        timL = TimeSeriesFile.read_array(os.path.join(self.directory, 'standard.ohl'))
+
+        # Tests
+        self.assertEqual(len(timA.timeSeries), 0)
+        self.assertEqual(timL.as_array().shape, (10, 4))
+        assert (timA.as_array() == timQ.as_array()).all()
+        assert (timL.as_array() == timQ.as_array()).all()
+        assert timL.as_dataframe().equals(timQ.as_dataframe())
+        assert not np.shares_memory(timL.as_dataframe().values, timL.as_array())
+
+    def test_time_series_file_read_array_changed(self):
+        """
+        Test TimeSeriesFile array after the valueArray column changes
+        """
+        timA = TimeSeriesFile()
+        timA.read(directory=self.directory,
+                  filename='standard.ohl',
+                  session=self.readSession,
+                  storeArray=True)
+
+        array = timA.as_array()
+
+        # Changes to the returned dataframe are not seen by the file
+        df = timA.as_dataframe()
+        df.iloc[0, 0] = -1.0
+        assert (timA.as_array() == array).all()
+
+        # Setting valueArray discards the cached array
+        buf = BytesIO()
+        np.save(buf, array[:5])
+        timA.valueArray = buf.getvalue()
+        self.assertEqual(timA.as_array().shape, (5, 4))
+        self.assertEqual(timA.as_dataframe().shape, (5, 3))
+
+        # Changes in the database are seen after a refresh
+        self.readSession.commit()
+        self.readSession.query(TimeSeriesFile). \
+            filter(TimeSeriesFile.id == timA.id). \
+            update({'valueArray': None}, synchronize_session=False)
+        self.readSession.refresh(timA)
+        self.assertEqual(timA.as_array().shape, (0,))
+
     def test_evt_yml_file_read(self):
         """
         Test ProjectFileEventManager read method
@@ -425,6 +655,32 @@ class TestReadMethods(unittest.TestCase):
 
         # Tests
 
+    def test_project_file_read_all_workers(self):
+        """
+        Test ProjectFile read all method with worker processes
+        """
+        # Instantiate GSSHAPY ProjectFile object
+        prjR = ProjectFile()
+
+        # Invoke read all method
+        prjR.readProject(directory=self.directory,
+                         projectFileName='standard.prj',
+                         session=self.readSession,
+                         workers=2)
+
+        # Query Project File
+        prjQ = self.querySession.query(ProjectFile).one()
+
+        # Tests
+        lndQ = self.querySession.query(LinkNodeDatasetFile).one()
+        self.assertEqual(lndQ.name, 'GSSHA_LINKNODE_STREAM_DEPTH')
+        self.assertEqual(len(lndQ.timeSteps), 10)
+
+        precipQ = self.querySession.query(PrecipFile).one()
+        self.assertEqual(len(precipQ.precipEvents), 2)
+
+        self.assertEqual(len(prjQ.timeSeriesFiles), 2)
+
     def test_project_file_read_input(self):
         """
         Test ProjectFile read input method
@@ -0,0 +1,121 @@
+"""
+********************************************************************************
+* Name: Regridding Weights Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+from glob import glob
+import numpy as np
+import os
+import unittest
+
+from .template import TestGridTemplate
+
+from gsshapy.grid.regrid import RegridWeights
+
+
+class TestRegridWeights(TestGridTemplate):
+    def setUp(self):
+        # source cell centers from north to south
+        x_coords, y_coords = np.meshgrid(np.arange(4) + 0.5,
+                                         np.arange(3)[::-1] + 0.5)
+        self.y_coords = y_coords
+        self.x_coords = x_coords
+        self.wkt = 'LOCAL_CS["grid"]'
+        self.values = np.arange(2 * 3 * 4, dtype=np.float64).reshape(2, 3, 4)
+        self.cache_directory = os.path.join(self.writeDirectory, 'regrid_cache')
+        try:
+            os.mkdir(self.cache_directory)
+        except OSError:
+            pass
+
+    def test_apply_same_grid(self):
+        """
+        Test RegridWeights apply method with matching grids
+        """
+        for method in RegridWeights.METHODS:
+            regrid_weights = RegridWeights.from_grids(self.y_coords, self.x_coords, self.wkt,
+                                                      (0, 1, 0, 3, 0, -1), (3, 4), self.wkt,
+                                                      method=method)
+            np.testing.assert_allclose(regrid_weights.apply(self.values), self.values)
+
+    def test_apply_bilinear(self):
+        """
+        Test RegridWeights apply method with bilinear weights
+        """
+        # GSSHA cells centered between the source cells
+        regrid_weights = RegridWeights.from_grids(self.y_coords, self.x_coords, self.wkt,
+                                                  (0.5, 1, 0, 2.5, 0, -1), (2, 3), self.wkt)
+        expected = (self.values[:, :-1, :-1] + self.values[:, :-1, 1:] +
+                    self.values[:, 1:, :-1] + self.values[:, 1:, 1:]) / 4
+        np.testing.assert_allclose(regrid_weights.apply(self.values), expected)
+
+        self.assertRaises(ValueError, regrid_weights.apply, np.zeros((2, 4, 4)))
+
+    def test_apply_time_blocks(self):
+        """
+        Test RegridWeights apply method in blocks of time steps
+        """
+        values = np.random.RandomState(0).rand(7, 2, 3, 4)
+        regrid_weights = RegridWeights.from_grids(self.y_coords, self.x_coords, self.wkt,
+                                                  (0.5, 1, 0, 2.5, 0, -1), (2, 3), self.wkt)
+        expected = regrid_weights.apply(values)
+        self.assertEqual(expected.shape, (7, 2, 2, 3))
+
+        # three time steps of the 6 GSSHA cells with 4 source cells each in a block
+        regrid_weights.BLOCK_VALUES = 3 * 6 * 4
+        np.testing.assert_array_equal(regrid_weights.apply(values), expected)
+        regrid_weights.BLOCK_VALUES = 1
+        np.testing.assert_array_equal(regrid_weights.apply(values), expected)
+        np.testing.assert_array_equal(regrid_weights.apply(values[0, 0]), expected[0, 0])
+
+    def test_apply_outside(self):
+        """
+        Test RegridWeights apply method masks GSSHA cells outside of the source grid
+        """
+        # GSSHA grid extends one cell west and half of a cell east of the source grid
+        for method in RegridWeights.METHODS:
+            regrid_weights = RegridWeights.from_grids(self.y_coords, self.x_coords, self.wkt,
+                                                      (-1, 1, 0, 3, 0, -1), (3, 5), self.wkt,
+                                                      method=method)
+            regridded = regrid_weights.apply(self.values)
+            self.assertTrue(np.isnan(regridded[..., 0]).all())
+            np.testing.assert_allclose(regridded[..., 1:], self.values)
+
+        regrid_weights = RegridWeights.from_grids(self.y_coords, self.x_coords, self.wkt,
+                                                  (0.5, 1, 0, 3, 0, -1), (3, 4), self.wkt)
+        regridded = regrid_weights.apply(self.values)
+        self.assertFalse(np.isnan(regridded[..., :-1]).any())
+        # center of the last GSSHA cell is on the east edge of the source grid
+        np.testing.assert_allclose(regridded[..., -1], self.values[..., -1])
+
+    def test_load_or_create(self):
+        """
+        Test RegridWeights load_or_create method caches the weights
+        """
+        regrid_args = (self.y_coords, self.x_coords, self.wkt,
+                       (0.5, 1, 0, 2.5, 0, -1), (2, 3), self.wkt)
+        regrid_weights = RegridWeights.load_or_create(self.cache_directory, *regrid_args)
+        cache_files = glob(os.path.join(self.cache_directory, 'regrid_weights_*.npz'))
+        self.assertEqual(len(cache_files), 1)
+
+        cached_weights = RegridWeights.load_or_create(self.cache_directory, *regrid_args)
+        self.assertEqual(cached_weights.dst_shape, (2, 3))
+        np.testing.assert_array_equal(cached_weights.indices, regrid_weights.indices)
+        np.testing.assert_allclose(cached_weights.apply(self.values),
+                                   regrid_weights.apply(self.values))
+
+        # a different GSSHA grid creates new weights
+        RegridWeights.load_or_create(self.cache_directory, self.y_coords, self.x_coords, self.wkt,
+                                     (0, 1, 0, 3, 0, -1), (3, 4), self.wkt)
+        cache_files = glob(os.path.join(self.cache_directory, 'regrid_weights_*.npz'))
+        self.assertEqual(len(cache_files), 2)
+
+    def tearDown(self):
+        for cache_file in glob(os.path.join(self.cache_directory, '*')):
+            os.remove(cache_file)
+        os.rmdir(self.cache_directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+********************************************************************************
+* Name: LSM Grid Index Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+import numpy as np
+from timeit import default_timer as timer
+import unittest
+
+from gsshapy.grid.spatial_index import LSMGridIndex
+
+
+def subset_slices_full_grid(y_coords, x_coords, y_min, y_max, x_min, x_max):
+    """
+    Subset slices from comparisons over the full grid
+    """
+    lsm_y_indices_from_y, lsm_x_indices_from_y = \
+        np.where((y_coords >= y_min) & (y_coords <= y_max))
+    lsm_y_indices_from_x, lsm_x_indices_from_x = \
+        np.where((x_coords >= x_min) & (x_coords <= x_max))
+
+    lsm_y_indices = np.intersect1d(lsm_y_indices_from_y, lsm_y_indices_from_x)
+    lsm_x_indices = np.intersect1d(lsm_x_indices_from_y, lsm_x_indices_from_x)
+
+    return (slice(np.amin(lsm_y_indices), np.amax(lsm_y_indices)+1),
+            slice(np.amin(lsm_x_indices), np.amax(lsm_x_indices)+1))
+
+
+class TestLSMGridIndex(unittest.TestCase):
+    def setUp(self):
+        # curvilinear grid from north to south
+        rows, cols = np.mgrid[0:60, 0:80]
+        self.y_coords = 50.0 - 0.25 * rows + 0.01 * cols
+        self.x_coords = -110.0 + 0.25 * cols + 0.02 * rows
+
+    def test_subset_slices(self):
+        """
+        Test LSMGridIndex subset_slices method
+        """
+        lsm_grid_index = LSMGridIndex.from_coords(self.y_coords, self.x_coords)
+        for bounds in ((40.1, 42.3, -105.2, -101.7),
+                       (36.0, 50.5, -110.0, -90.0),
+                       (45.0, 45.3, -100.0, -99.7),
+                       (49.5, 52.0, -112.0, -109.0)):
+            self.assertEqual(lsm_grid_index.subset_slices(*bounds),
+                             subset_slices_full_grid(self.y_coords, self.x_coords, *bounds))
+
+        self.assertRaises(ValueError, lsm_grid_index.subset_slices, 60.0, 61.0, -105.0, -100.0)
+
+    def test_from_coords_cache(self):
+        """
+        Test LSMGridIndex from_coords method reuses the index of the same grid
+        """
+        lsm_grid_index = LSMGridIndex.from_coords(self.y_coords, self.x_coords)
+        self.assertIs(LSMGridIndex.from_coords(self.y_coords.copy(), self.x_coords.copy()),
+                      lsm_grid_index)
+        self.assertIsNot(LSMGridIndex.from_coords(self.y_coords + 1, self.x_coords),
+                         lsm_grid_index)
+
+        # grids of another source are different grids
+        x_coords = self.x_coords.copy()
+        x_coords[31, 17] += 0.001
+        lsm_grid_index_other = LSMGridIndex.from_coords(self.y_coords, x_coords,
+                                                        source='other/*.nc')
+        self.assertIsNot(lsm_grid_index_other, lsm_grid_index)
+        self.assertIs(LSMGridIndex.from_coords(self.y_coords, x_coords, source='other/*.nc'),
+                      lsm_grid_index_other)
+
+    def test_from_coords_cache_time(self):
+        """
+        Test LSMGridIndex cached lookup and subset is faster than comparisons over the full grid
+        """
+        rows, cols = np.mgrid[0:1059, 0:1799]
+        y_coords = 21.0 + 0.027 * rows + 0.001 * cols
+        x_coords = -134.0 + 0.03 * cols + 0.002 * rows
+        bounds = (40.1, 40.6, -105.2, -104.7)
+        LSMGridIndex.from_coords(y_coords, x_coords, source='conus/*.nc')
+
+        def best_time(function):
+            times = []
+            for _ in range(5):
+                start = timer()
+                result = function()
+                times.append(timer() - start)
+            return min(times), result
+
+        cached_time, cached_slices = \
+            best_time(lambda: LSMGridIndex.from_coords(y_coords, x_coords, source='conus/*.nc')
+                                          .subset_slices(*bounds))
+        full_grid_time, full_grid_slices = \
+            best_time(lambda: subset_slices_full_grid(y_coords, x_coords, *bounds))
+
+        self.assertEqual(cached_slices, full_grid_slices)
+        self.assertLess(cached_time, full_grid_time / 5)
+
+    def test_from_coords_cache_size(self):
+        """
+        Test LSMGridIndex from_coords method keeps the most recently used indices
+        """
+        lsm_grid_index = LSMGridIndex.from_coords(self.y_coords, self.x_coords)
+        for offset in range(1, LSMGridIndex.CACHE_SIZE):
+            LSMGridIndex.from_coords(self.y_coords + offset, self.x_coords)
+        self.assertEqual(len(LSMGridIndex._cache), LSMGridIndex.CACHE_SIZE)
+
+        # using the index keeps it in the cache and the least recently used index is dropped
+        self.assertIs(LSMGridIndex.from_coords(self.y_coords, self.x_coords),
+                      lsm_grid_index)
+        LSMGridIndex.from_coords(self.y_coords + LSMGridIndex.CACHE_SIZE, self.x_coords)
+        self.assertEqual(len(LSMGridIndex._cache), LSMGridIndex.CACHE_SIZE)
+        self.assertNotIn(LSMGridIndex.grid_key(self.y_coords + 1, self.x_coords),
+                         LSMGridIndex._cache)
+        self.assertIs(LSMGridIndex.from_coords(self.y_coords, self.x_coords),
+                      lsm_grid_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+"""
+********************************************************************************
+* Name: WMS Dataset Tests
+* License: BSD 3-Clause
+********************************************************************************
+"""
+from ast import literal_eval
+from datetime import datetime
+import os
+import shutil
+import unittest
+
+import netCDF4
+import numpy as np
+
+from gsshapy.orm.file_io import *
+from gsshapy.lib import db_tools as dbt, parsetools as pt, wms_dataset_chunk as wdc
+
+
+def datasetScalarTimeStepChunkStrings(lines, numberColumns, numberCells):
+    """
+    Time step chunk parser that assembles the values into an array string
+    """
+    END_DATASET_TAG = 'ENDDS'
+
+    result = {'iStatus': None,
+              'timestamp': None,
+              'cellArray': None,
+              'rasterText': None}
+
+    lines = list(lines)
+    timeStep = pt.splitLine(lines.pop(0))
+    startCellsIndex = numberCells
+    iStatus = int(timeStep[1])
+
+    if iStatus == 0:
+        startCellsIndex = 0
+
+    if END_DATASET_TAG in lines[-1]:
+        lines.pop(-1)
+
+    arrayString = '[['
+    columnCounter = 1
+    lenLines = len(lines) - 1
+    rasterText = ''
+
+    for index in range(startCellsIndex, len(lines)):
+        if columnCounter % numberColumns != 0 and index != lenLines:
+            arrayString += lines[index].strip() + ', '
+        elif columnCounter % numberColumns == 0 and index != lenLines:
+            arrayString += lines[index].strip() + '], ['
+        elif index == lenLines:
+            arrayString += lines[index].strip() + ']]'
+
+        columnCounter += 1
+        rasterText += lines[index]
+
+    result['cellArray'] = arrayString
+    result['rasterText'] = rasterText
+    result['iStatus'] = iStatus
+    result['timestamp'] = float(timeStep[2])
+
+    return result
+
+
+class TestWMSDataset(unittest.TestCase):
+    def setUp(self):
+        # Find db directory path
+        here = os.path.abspath(os.path.dirname(__file__))
+
+        # Create Test DB
+        sqlalchemy_url, sql_engine = dbt.init_sqlite_memory()
+
+        # Create DB Sessions
+        session_maker = dbt.get_sessionmaker(sqlalchemy_url, sql_engine)
+        self.readSession = session_maker()
+        self.querySession = session_maker()
+
+        # Define workspace (the dataset is copied, so the cube file is written to the output directory)
+        self.readDirectory = os.path.join(here, 'wms_dataset')
+        self.writeDirectory = os.path.join(here, 'out')
+        self.directory = os.path.join(self.writeDirectory, 'wms_dataset_read')
+        shutil.copytree(self.readDirectory, self.directory)
+
+        # Read the mask map
+        self.maskMap = RasterMapFile()
+        self.maskMap.read(directory=self.directory,
+                          filename='wms_dataset.msk',
+                          session=self.readSession)
+
+    def test_dataset_scalar_time_step_chunk(self):
+        """
+        Test datasetScalarTimeStepChunk against the array string parser
+        """
+        with open(os.path.join(self.directory, 'wms_dataset.dep')) as f:
+            chunks = pt.chunk({'DATASET': None, 'TS': None}, f)
+
+        self.assertEqual(len(chunks['TS']), 3)
+
+        for chunk in chunks['TS']:
+            result = wdc.datasetScalarTimeStepChunk(chunk, 4, 12)
+            expected = datasetScalarTimeStepChunkStrings(chunk, 4, 12)
+
+            self.assertEqual(result['iStatus'], expected['iStatus'])
+            self.assertEqual(result['timestamp'], expected['timestamp'])
+            self.assertEqual(result['rasterText'], expected['rasterText'])
+            self.assertEqual(result['cellArray'].shape, (3, 4))
+            np.testing.assert_array_equal(result['cellArray'],
+                                          np.array(literal_eval(expected['cellArray'])))
+
+        self.assertEqual([wdc.datasetScalarTimeStepChunk(chunk, 4, 12)['iStatus'] for chunk in chunks['TS']],
+                         [1, 0, 1])
+
+    def test_wms_dataset_write_cube(self):
+        """
+        Test WMSDatasetFile write method for datasets read with storeCube=True
+        """
+        for filename in ('wms_dataset.dep', 'wms_dataset_precision.dep'):
+            name = os.path.splitext(filename)[0]
+            self._read_n_write('{0}_text'.format(name), filename)
+            self._read_n_write('{0}_cube'.format(name), filename, storeCube=True)
+
+            # The text is written back as it was read
+            self.assertEqual(self._read_lines(self.writeDirectory, '{0}_text.dep'.format(name))[7:],
+                             self._read_lines(self.directory, filename)[7:])
+
+            # The values are written back with the precision they were read with
+            valuesT = self._read_tokens(self.writeDirectory, '{0}_text.dep'.format(name))
+            valuesC = self._read_tokens(self.writeDirectory, '{0}_cube.dep'.format(name))
+            self.assertEqual(valuesC[:13], valuesT[:13])
+            self.assertEqual(len(valuesC), len(valuesT))
+            for valueC, valueT in zip(valuesC[13:], valuesT[13:]):
+                if valueT in ('TS', 'ENDDS'):
+                    self.assertEqual(valueC, valueT)
+                else:
+                    self.assertEqual(float(valueC), float(valueT))
+
+        valuesC = self._read_lines(self.writeDirectory, 'wms_dataset_precision_cube.dep')
+        self.assertIn('1097.627008123456', valuesC)
+        self.assertIn('0.333333333333', valuesC)
+        self.assertIn('2.5e-05', valuesC)
+
+    def test_wms_dataset_to_xarray(self):
+        """
+        Test WMSDatasetFile to_xarray method
+        """
+        for storeCube in (False, True):
+            wmsR = WMSDatasetFile()
+            wmsR.read(directory=self.directory,
+                      filename='wms_dataset.dep',
+                      session=self.readSession,
+                      maskMap=self.maskMap,
+                      storeCube=storeCube)
+
+            dataset = wmsR.to_xarray(self.maskMap)
+            values = dataset['depth']
+
+            self.assertEqual(values.dims, ('time', 'y', 'x'))
+            np.testing.assert_allclose(dataset['x'].values, 454318.288604 + np.array([15, 45, 75, 105]))
+            np.testing.assert_allclose(dataset['y'].values, 4501028.97214 - np.array([15, 45, 75]))
+            self.assertEqual(dataset.attrs['geotransform'], [454318.288604, 30.0, 0.0, 4501028.97214, 0.0, -30.0])
+            self.assertEqual(list(dataset['time_step'].values), [1, 2, 3])
+            self.assertEqual(list(dataset['time'].values.astype('datetime64[m]').astype(datetime)),
+                             [datetime(1970, 1, 1, 0, 0), datetime(1970, 1, 1, 0, 15), datetime(1970, 1, 1, 0, 30)])
+            self.assertEqual(values.values[0, 0, 1], 1097.627008)
+            self.assertEqual(values.values[1, 2, 2], 1094.700009)
+            np.testing.assert_array_equal(values.values[:, [0, 0, 2, 2], [0, 3, 0, 3]], 0)
+
+    def test_wms_dataset_to_netcdf(self):
+        """
+        Test WMSDatasetFile to_netcdf method
+        """
+        wmsR = WMSDatasetFile()
+        wmsR.read(directory=self.directory,
+                  filename='wms_dataset.dep',
+                  session=self.readSession,
+                  maskMap=self.maskMap)
+
+        netcdfPath = os.path.join(self.writeDirectory, 'wms_dataset.nc')
+        wmsR.to_netcdf(netcdfPath, self.maskMap)
+        dataset = wmsR.to_xarray(self.maskMap)
+
+        with netCDF4.Dataset(netcdfPath) as ncFile:
+            self.assertEqual(ncFile.variables['depth'].dimensions, ('time', 'y', 'x'))
+            self.assertEqual(list(ncFile.getncattr('geotransform')), dataset.attrs['geotransform'])
+            self.assertEqual(ncFile.variables['time'].units, 'minutes since 1970-01-01 00:00:00')
+            np.testing.assert_array_equal(ncFile.variables['time'][:], [0, 15, 30])
+            np.testing.assert_array_equal(ncFile.variables['time_step'][:], [1, 2, 3])
+            np.testing.assert_allclose(ncFile.variables['x'][:], dataset['x'].values)
+            np.testing.assert_allclose(ncFile.variables['y'][:], dataset['y'].values)
+            # values are stored in single precision
+            np.testing.assert_allclose(ncFile.variables['depth'][:], dataset['depth'].values, rtol=1e-7)
+
+    def _read_n_write(self, name, filename='wms_dataset.dep', **kwargs):
+        """
+        Read the dataset to the database and write it from the database
+        """
+        wmsR = WMSDatasetFile()
+        wmsR.read(directory=self.directory,
+                  filename=filename,
+                  session=self.readSession,
+                  maskMap=self.maskMap,
+                  **kwargs)
+
+        wmsR.write(session=self.readSession,
+                   directory=self.writeDirectory,
+                   name='{0}.dep'.format(name),
+                   maskMap=self.maskMap)
+
+        return wmsR
+
+    def _read_lines(self, directory, filename):
+        """
+        Read the stripped lines of a file
+        """
+        with open(os.path.join(directory, filename)) as f:
+            return [line.strip() for line in f.read().strip().splitlines()]
+
+    def _read_tokens(self, directory, filename):
+        """
+        Read the whitespace separated contents of a file
+        """
+        with open(os.path.join(directory, filename)) as f:
+            return f.read().strip().split()
+
+    def tearDown(self):
+        self.readSession.close()
+        self.querySession.close()
+
+        # Clear the output directory
+        for fileName in os.listdir(self.writeDirectory):
+            path = os.path.join(self.writeDirectory, fileName)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif not fileName.startswith('.'):
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
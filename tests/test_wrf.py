@@ -8,6 +8,8 @@
 """
 from datetime import datetime
 from glob import glob
+from netCDF4 import Dataset
+import numpy as np
 import os
 from osgeo import gdalconst
 import unittest
@@ -107,6 +109,86 @@ class TestLSMtoGSSHA(TestGridTemplate):
         compare_gag_file = os.path.join(self.readDirectory, 'gage_test_wrf.gag')
         self._compare_files(out_gage_file, compare_gag_file, precision=5)
 
+    def test_wrf_gage_file_write_decimals(self):
+        """
+        Test WRF lsm_precip_to_gssha_precip_gage write method with fixed precision
+        """
+        out_gage_file = os.path.join(self.writeDirectory, 'gage_test_wrf.gag')
+        self.l2g.lsm_precip_to_gssha_precip_gage(out_gage_file,
+                                                 lsm_data_var=['RAINC', 'RAINNC'],
+                                                 precip_type='ACCUM',
+                                                 decimals=6)
+
+        # Test
+        compare_gag_file = os.path.join(self.readDirectory, 'gage_test_wrf.gag')
+        self._compare_files(out_gage_file, compare_gag_file, precision=5)
+
+    def test_wrf_gage_file_write_default_text(self):
+        """
+        Test WRF lsm_precip_to_gssha_precip_gage writes the shortest text of the values by default
+        """
+        out_gage_file = os.path.join(self.writeDirectory, 'gage_test_wrf.gag')
+        self.l2g.lsm_precip_to_gssha_precip_gage(out_gage_file,
+                                                 lsm_data_var=['RAINC', 'RAINNC'],
+                                                 precip_type='ACCUM')
+
+        with open(out_gage_file) as gage_file:
+            gage_lines = gage_file.read().splitlines()
+
+        value_lines = [line for line in gage_lines if line.startswith('ACCUM')]
+        self.assertEqual(len(value_lines), int(gage_lines[1].split()[1]))
+        for line in value_lines:
+            for value in line.split()[6:]:
+                # float32 values need at most 9 significant digits
+                # (Ex. 0.1 instead of 0.10000000149011612)
+                digits = value.lower().split('e')[0].replace('-', '').replace('.', '').lstrip('0')
+                assert len(digits) <= 9, value
+
+    def test_wrf_gage_file_write_watershed(self):
+        """
+        Test WRF lsm_precip_to_gssha_precip_gage write method with watershed gages
+        """
+        out_gage_file = os.path.join(self.writeDirectory, 'gage_test_wrf.gag')
+        self.l2g.lsm_precip_to_gssha_precip_gage(out_gage_file,
+                                                 lsm_data_var=['RAINC', 'RAINNC'],
+                                                 precip_type='ACCUM',
+                                                 gage_filter='watershed')
+
+        with open(out_gage_file) as gage_file:
+            gage_lines = gage_file.read().splitlines()
+
+        num_gages = int(gage_lines[2].split()[1])
+        assert 0 < num_gages < 36
+        coord_lines = [line for line in gage_lines if line.startswith('COORD')]
+        self.assertEqual(len(coord_lines), num_gages)
+        for line in gage_lines[3 + num_gages:]:
+            self.assertEqual(len(line.split()), 6 + num_gages)
+
+    def test_wrf_gage_file_write_thiessen(self):
+        """
+        Test WRF lsm_precip_to_gssha_precip_gage write method with Thiessen gages
+        """
+        def read_gage_ids(gage_file_path):
+            with open(gage_file_path) as gage_file:
+                return [line.split('#')[-1].strip('"') for line in gage_file.read().splitlines()
+                        if line.startswith('COORD')]
+
+        out_gage_file = os.path.join(self.writeDirectory, 'gage_test_wrf.gag')
+        self.l2g.lsm_precip_to_gssha_precip_gage(out_gage_file,
+                                                 lsm_data_var=['RAINC', 'RAINNC'],
+                                                 precip_type='ACCUM',
+                                                 gage_filter='watershed')
+        watershed_gage_ids = read_gage_ids(out_gage_file)
+
+        self.l2g.lsm_precip_to_gssha_precip_gage(out_gage_file,
+                                                 lsm_data_var=['RAINC', 'RAINNC'],
+                                                 precip_type='ACCUM',
+                                                 gage_filter='thiessen')
+        thiessen_gage_ids = read_gage_ids(out_gage_file)
+
+        assert len(watershed_gage_ids) <= len(thiessen_gage_ids) < 36
+        assert set(watershed_gage_ids).issubset(thiessen_gage_ids)
+
     def test_wrf_netcdf_file_write(self):
         """
         Test WRF lsm_data_to_subset_netcdf write method
@@ -119,6 +201,155 @@ class TestLSMtoGSSHA(TestGridTemplate):
         # compare netcdf files
         self._compare_netcdf_files("gssha_dynamic_wrf", "gssha_dynamic_wrf")
 
+        # default layout of the NetCDF library
+        with Dataset(netcdf_file_path) as nc_file:
+            self.assertEqual(nc_file.variables['precipitation'].chunking(), 'contiguous')
+
+    def test_wrf_netcdf_file_write_time_mismatch(self):
+        """
+        Test WRF lsm_data_to_subset_netcdf write method with variables of different time steps
+        """
+        load_converted_data = self.l2g._load_converted_gssha_data_from_lsm
+
+        def load_converted_data_short(gssha_var, lsm_var, load_type, time_step=None):
+            load_converted_data(gssha_var, lsm_var, load_type, time_step)
+            if gssha_var == 'pressure':
+                self.l2g.data = self.l2g.data.isel(time=slice(1, None))
+
+        self.l2g._load_converted_gssha_data_from_lsm = load_converted_data_short
+        netcdf_file_path = os.path.join(self.writeDirectory,
+                                        'gssha_dynamic_wrf.nc')
+        with self.assertRaises(ValueError):
+            self.l2g.lsm_data_to_subset_netcdf(netcdf_file_path,
+                                               self.data_var_map_array)
+
+    def test_wrf_netcdf_file_write_compressed(self):
+        """
+        Test WRF lsm_data_to_subset_netcdf write method with compression
+        """
+        netcdf_file_path = os.path.join(self.writeDirectory,
+                                        'gssha_dynamic_wrf.nc')
+        self.l2g.lsm_data_to_subset_netcdf(netcdf_file_path,
+                                           self.data_var_map_array,
+                                           complevel=4,
+                                           time_chunk_size=1)
+
+        # compare netcdf files
+        self._compare_netcdf_files("gssha_dynamic_wrf", "gssha_dynamic_wrf")
+
+        with Dataset(netcdf_file_path) as nc_file:
+            filters = nc_file.variables['precipitation'].filters()
+            assert filters['zlib']
+            self.assertEqual(filters['complevel'], 4)
+            self.assertEqual(nc_file.variables['precipitation'].chunking()[0], 1)
+
+    def test_wrf_netcdf_file_write_chunks(self):
+        """
+        Test WRF lsm_data_to_subset_netcdf write method with chunked data
+        """
+        l2g = GRIDtoGSSHA(gssha_project_folder=self.gssha_project_folder,
+                          gssha_project_file_name='grid_standard.prj',
+                          lsm_input_folder_path=os.path.join(self.writeDirectory, 'wrf_raw_data'),
+                          lsm_search_card="gssha_d03_*.nc",
+                          lsm_lat_var='XLAT',
+                          lsm_lon_var='XLONG',
+                          lsm_time_var='Times',
+                          lsm_lat_dim='south_north',
+                          lsm_lon_dim='west_east',
+                          lsm_time_dim='Time',
+                          chunks={'time': 4},
+                          )
+        netcdf_file_path = os.path.join(self.writeDirectory,
+                                        'gssha_dynamic_wrf.nc')
+        try:
+            l2g.lsm_data_to_subset_netcdf(netcdf_file_path,
+                                          self.data_var_map_array)
+        finally:
+            l2g.xd.close()
+
+        # compare netcdf files
+        self._compare_netcdf_files("gssha_dynamic_wrf", "gssha_dynamic_wrf")
+
+    def test_wrf_netcdf_file_write_regrid_cache(self):
+        """
+        Test WRF lsm_data_to_subset_netcdf write method with cached regridding weights
+        """
+        l2g = GRIDtoGSSHA(gssha_project_folder=self.gssha_project_folder,
+                          gssha_project_file_name='grid_standard.prj',
+                          lsm_input_folder_path=os.path.join(self.writeDirectory, 'wrf_raw_data'),
+                          lsm_search_card="gssha_d03_*.nc",
+                          lsm_lat_var='XLAT',
+                          lsm_lon_var='XLONG',
+                          lsm_time_var='Times',
+                          lsm_lat_dim='south_north',
+                          lsm_lon_dim='west_east',
+                          lsm_time_dim='Time',
+                          cache_regrid_weights=True,
+                          )
+        netcdf_file_path = os.path.join(self.writeDirectory,
+                                        'gssha_dynamic_wrf_regrid.nc')
+        try:
+            l2g.lsm_data_to_subset_netcdf(netcdf_file_path,
+                                          self.data_var_map_array)
+        finally:
+            l2g.xd.close()
+
+        # weights are computed once for all variables
+        cache_files = glob(os.path.join(self.gssha_project_folder,
+                                        'regrid_weights_*.npz'))
+        self.assertEqual(len(cache_files), 1)
+
+        with Dataset(netcdf_file_path) as nc_file:
+            self.assertEqual(nc_file.variables['precipitation'].shape[1:],
+                             (l2g.gssha_grid.y_size, l2g.gssha_grid.x_size))
+
+    def test_wrf_netcdf_file_write_regrid_cache_gdal(self):
+        """
+        Test WRF lsm_data_to_subset_netcdf with cached regridding weights against GDAL resampling
+        """
+        def write_temperature(l2g, file_name, resample_method):
+            netcdf_file_path = os.path.join(self.writeDirectory, file_name)
+            l2g.lsm_data_to_subset_netcdf(netcdf_file_path,
+                                          [['temperature', 'T2']],
+                                          resample_method=resample_method)
+            with Dataset(netcdf_file_path) as nc_file:
+                return nc_file.variables['temperature'][:]
+
+        gdal_values = write_temperature(self.l2g, 'gssha_dynamic_wrf_gdal.nc',
+                                        gdalconst.GRA_Average)
+
+        l2g = GRIDtoGSSHA(gssha_project_folder=self.gssha_project_folder,
+                          gssha_project_file_name='grid_standard.prj',
+                          lsm_input_folder_path=os.path.join(self.writeDirectory, 'wrf_raw_data'),
+                          lsm_search_card="gssha_d03_*.nc",
+                          lsm_lat_var='XLAT',
+                          lsm_lon_var='XLONG',
+                          lsm_time_var='Times',
+                          lsm_lat_dim='south_north',
+                          lsm_lon_dim='west_east',
+                          lsm_time_dim='Time',
+                          cache_regrid_weights=True,
+                          )
+        try:
+            nearest_values = write_temperature(l2g, 'gssha_dynamic_wrf_nearest.nc',
+                                               gdalconst.GRA_NearestNeighbour)
+            bilinear_values = write_temperature(l2g, 'gssha_dynamic_wrf_bilinear.nc',
+                                                gdalconst.GRA_Bilinear)
+        finally:
+            l2g.xd.close()
+
+        # both use the GSSHA grid
+        self.assertEqual(nearest_values.shape, gdal_values.shape)
+        self.assertEqual(bilinear_values.shape, gdal_values.shape)
+        self.assertEqual(len(glob(os.path.join(self.gssha_project_folder,
+                                               'regrid_weights_*.npz'))), 2)
+
+        # the GSSHA cells are smaller than the WRF cells, so the average
+        # is the value of the WRF cell the GSSHA cell is in
+        close_cells = np.isclose(nearest_values, gdal_values, rtol=1e-5)
+        assert close_cells.mean() > 0.95
+        np.testing.assert_allclose(bilinear_values, gdal_values, rtol=1e-2)
+
     def test_wrf_netcdf_file_write_resample(self):
         """
         Test WRF lsm_data_to_subset_netcdf resample write method
@@ -148,6 +379,22 @@ class TestLSMtoGSSHA(TestGridTemplate):
                                   raster=True,
                                   precision=4)
 
+    def test_wrf_ascii_file_write_workers(self):
+        """
+        Test WRF lsm_data_to_arc_ascii write method with worker processes
+        """
+        self.l2g.lsm_data_to_arc_ascii(self.data_var_map_array,
+                                       self.hmet_write_directory,
+                                       workers=2)
+
+        # Compare all files
+        compare_directory = os.path.join(self.readDirectory, "wrf_hmet_data")
+        self._compare_directories(self.hmet_write_directory,
+                                  compare_directory,
+                                  ignore_file="hmet_file_list.txt",
+                                  raster=True,
+                                  precision=4)
+
     def test_wrf_ascii_file_write_pre(self):
         """
         Test WRF lsm_data_to_arc_ascii write method pre-computed
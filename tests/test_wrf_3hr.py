@@ -7,6 +7,8 @@
 ********************************************************************************
 """
 from glob import glob
+import numpy as np
+from numpy.testing import assert_almost_equal
 import os
 import unittest
 from shutil import copy, copytree
@@ -15,6 +17,29 @@ from .template import TestGridTemplate
 from gsshapy.grid import GRIDtoGSSHA
 
 
+def interpolate_to_hourly_loop(data, data_var):
+    """
+    Reference implementation of the hourly interpolation that
+    assigns the hours between each pair of time steps in a loop
+    """
+    one_hour = np.timedelta64(1, 'h')
+    hourly_data = data.reindex(time=np.arange(data.time.values[0],
+                                              data.time.values[-1] + one_hour,
+                                              one_hour))
+    for time_idx in range(data.dims['time'] - 1):
+        start_time = data.time[time_idx].values
+        end_time = data.time[time_idx+1].values
+        slice_size = hourly_data.sel(time=slice(start_time, end_time)).dims['time'] - 1
+        first_timestep = hourly_data.sel(time=start_time)[data_var]
+        slope = (hourly_data.sel(time=end_time)[data_var] - first_timestep)/float(slice_size)
+
+        data_subset = hourly_data.sel(time=slice(start_time + np.timedelta64(1, 'm'),
+                                                 end_time - np.timedelta64(1, 'm')))
+        for xidx in range(data_subset.dims['time']):
+            hourly_data[data_var].loc[{'time': data_subset.time[xidx]}] = first_timestep + slope * (xidx+1)
+    return hourly_data
+
+
 class TestWRF3toGSSHA(TestGridTemplate):
     def setUp(self):
         # define global variables
@@ -114,6 +139,33 @@ class TestWRF3toGSSHA(TestGridTemplate):
         # compare netcdf files
         self._compare_netcdf_files("gssha_dynamic_wrf_3hr", "gssha_dynamic_wrf_3hr")
 
+    def test_wrf_convert_data_to_hourly(self):
+        """
+        Test WRF _convert_data_to_hourly against interpolating in a loop
+        """
+        for gssha_data_var, lsm_data_var in self.data_var_map_array:
+            gssha_data_var_name = self.l2g.netcdf_attributes[gssha_data_var]['gssha_name']
+            self.l2g._load_converted_gssha_data_from_lsm(gssha_data_var, lsm_data_var, 'ascii')
+            compare_data = interpolate_to_hourly_loop(self.l2g.data, gssha_data_var_name)
+
+            self.l2g._convert_data_to_hourly(gssha_data_var_name)
+
+            assert (self.l2g.data.time.values == compare_data.time.values).all()
+            assert_almost_equal(self.l2g.data[gssha_data_var_name].values,
+                                compare_data[gssha_data_var_name].values)
+
+    def test_wrf_convert_data_to_hourly_single_time_step(self):
+        """
+        Test WRF _convert_data_to_hourly keeps data with a single time step
+        """
+        self.l2g._load_converted_gssha_data_from_lsm('temperature', 'T2', 'ascii', time_step=0)
+        compare_data = self.l2g.data
+
+        self.l2g._convert_data_to_hourly('temperature')
+
+        assert self.l2g.data is compare_data
+        self.assertEqual(self.l2g.data.time.size, 1)
+
     def test_wrf_ascii_file_write(self):
         """
         Test WRF lsm_data_to_arc_ascii write method
@@ -10,6 +10,8 @@
 import sys
 import unittest, itertools, os, uuid
 
+from sqlalchemy import event
+
 from gsshapy.orm.file_io import *
 from gsshapy.orm import ProjectFile
 from gsshapy.lib import db_tools as dbt
@@ -89,6 +91,39 @@ class TestWriteMethods(unittest.TestCase):
         # Test
         self._compare_files(self.original, self.name, 'cmt')
 
+    def test_map_table_file_write_query_count(self):
+        """
+        Test MapTableFile write method retrieves the values of each map table in a single query
+        """
+        statements = []
+
+        def count_value_queries(conn, cursor, statement, *args):
+            if 'FROM cmt_map_table_values' in statement:
+                statements.append(statement)
+
+        engine = self.writeSession.get_bind()
+        event.listen(engine, 'before_cursor_execute', count_value_queries)
+
+        try:
+            mapTableFile = self.writeSession.query(MapTableFile).one()
+            mapTableFile.write(session=self.writeSession,
+                               directory=self.writeDirectory,
+                               name=self.name)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_value_queries)
+
+        # Test
+        # One query per map table and one to load the values of the map table file
+        self.assertLessEqual(len(statements), len(mapTableFile.mapTables) + 1)
+
+        with open(os.path.join(self.readDirectory, 'standard_compare.cmt')) as fileO:
+            linesO = [line.rstrip() for line in fileO]
+
+        with open(os.path.join(self.writeDirectory, 'standard.cmt')) as fileN:
+            linesN = [line.rstrip() for line in fileN]
+
+        self.assertEqual(linesO, linesN)
+
     def test_precip_file_write(self):
         """
         Test PrecipFile write method
@@ -100,6 +135,25 @@ class TestWriteMethods(unittest.TestCase):
         self._compare_files(self.original, self.name, 'gag')
 
 
+    def test_precip_file_write_array(self):
+        """
+        Test PrecipFile write method with array storage
+        """
+        # Read with array storage
+        precip = PrecipFile()
+        precip.read(directory=self.readDirectory,
+                    filename='standard.gag',
+                    session=self.writeSession,
+                    storeArray=True)
+
+        # Invoke write method
+        precip.write(session=self.writeSession,
+                     directory=self.writeDirectory,
+                     name=self.name)
+
+        # Test
+        self._compare_files(self.original, self.name, 'gag')
+
     def test_grid_pipe_file_write(self):
         """
         Test GridPipeFile write method
@@ -150,6 +204,25 @@ class TestWriteMethods(unittest.TestCase):
         # Test
         self._compare_files(self.original, self.name, 'cdp')
 
+    def test_link_node_dataset_file_write_array(self):
+        """
+        Test LinkNodeDatasetFile write method with array storage
+        """
+        # Read with array storage
+        lnd = LinkNodeDatasetFile()
+        lnd.read(directory=self.readDirectory,
+                 filename='standard.cdp',
+                 session=self.writeSession,
+                 storeArray=True)
+
+        # Invoke write method
+        lnd.write(session=self.writeSession,
+                  directory=self.writeDirectory,
+                  name=self.name)
+
+        # Test
+        self._compare_files(self.original, self.name, 'cdp')
+
     def test_raster_map_file_write(self):
         """
         Test RasterMapFile write method